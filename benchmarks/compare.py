@@ -0,0 +1,65 @@
+"""
+Compares two sets of results from benchmarks.hot_path, e.g from before and
+after a change.
+
+Usage, from the root of the repository:
+    python -m benchmarks.compare before.json after.json --threshold 1.1
+
+Exits with a non-zero status if any benchmark's mean latency grew by more
+than the threshold ratio.
+"""
+import argparse
+import json
+import sys
+
+
+def _key(result):
+    return result['name'], json.dumps(result['params'], sort_keys=True)
+
+
+def compare(before, after):
+    """
+    Yields (name, params, mean before, mean after, ratio) for each benchmark
+    present in both results
+    """
+    previous = {_key(result): result for result in before['results']}
+    for result in after['results']:
+        old = previous.get(_key(result))
+        if old is None:
+            continue
+        yield (
+            result['name'],
+            result['params'],
+            old['mean_us'],
+            result['mean_us'],
+            result['mean_us'] / old['mean_us'],
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, help='fail if a mean grew by more than this ratio')
+    args = parser.parse_args(argv)
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    print(f"{before['meta'].get('commit')} -> {after['meta'].get('commit')}")
+    regressions = 0
+    for name, params, old, new, ratio in compare(before, after):
+        flag = ''
+        if args.threshold and ratio > args.threshold:
+            flag = ' REGRESSION'
+            regressions += 1
+        params = ' '.join(f'{key}={value}' for key, value in params.items())
+        print(f'{name:<25} {params:<90} {old:>10.2f}us {new:>10.2f}us {ratio:>6.2f}x{flag}')
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
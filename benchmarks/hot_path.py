@@ -0,0 +1,326 @@
+"""
+Measures the throughput and latency of evaluating features.
+
+Each benchmark is swept over one parameter at a time, holding the others at
+their baseline values, so the cost of each parameter can be seen in
+isolation. Results are written as JSON, which can be compared across commits
+with benchmarks/compare.py.
+
+Usage, from the root of the repository:
+    python -m benchmarks.hot_path --output results.json
+    python -m benchmarks.hot_path --redis redis://localhost:6379/0 --quick
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import uuid
+from collections import namedtuple
+from itertools import chain
+from time import perf_counter
+
+from feats.app import App
+from feats.persister import MemoryExperimentPersister
+from feats.selector import Experiment, Rollout, Static
+from feats.state import FeatureState
+from feats.storage import Memory
+
+Params = namedtuple('Params', ['storage', 'segments', 'selector', 'mapping_size', 'history', 'features'])
+
+BASELINE = Params(
+    storage='memory',
+    segments=1,
+    selector='static',
+    mapping_size=1,
+    history=1,
+    features=1,
+)
+
+SWEEPS = {
+    'storage': ['memory', 'redis'],
+    'segments': [0, 1, 4, 16],
+    'selector': ['static', 'rollout', 'experiment'],
+    'mapping_size': [1, 16, 256],
+    'history': [1, 100, 1000],
+    'features': [1, 100, 1000],
+}
+
+QUICK_SWEEPS = {
+    'storage': ['memory', 'redis'],
+    'segments': [0, 4],
+    'selector': ['static', 'rollout', 'experiment'],
+    'mapping_size': [1, 256],
+    'history': [1, 100],
+    'features': [1, 100],
+}
+
+# The value every generated segment returns for the benchmarked input
+MATCH = 'match'
+
+
+def make_segment(app, index):
+    cls = type(f'Segment{index}', (), {
+        '__module__': 'benchmarks',
+        'string': lambda self, value: MATCH,
+    })
+    cls.string.__annotations__ = {'value': str, 'return': str}
+    return app.segment(cls)
+
+
+def make_feature(app, index):
+    def default(self, value: str) -> str:
+        return 'default'
+
+    def alternative(self, value: str) -> str:
+        return 'alternative'
+
+    cls = type(f'Feature{index}', (), {
+        '__module__': 'benchmarks',
+        'default': app.default(default),
+        'alternative': alternative,
+    })
+    return app.feature(cls)
+
+
+def make_boolean(app):
+    def Enabled(value: str) -> bool:
+        return True
+    Enabled.__module__ = 'benchmarks'
+    return app.boolean(Enabled)
+
+
+def make_selector(kind, segments, persister, default, alternative):
+    weights = {default: 50, alternative: 50}
+    if kind == 'static':
+        return Static('static', alternative)
+    if kind == 'rollout':
+        return Rollout('rollout', segments[0], weights)
+    if kind == 'experiment':
+        # Each feature buckets subjects separately
+        return Experiment('experiment', persister, weights, key=uuid.uuid4().hex)
+    raise ValueError(f'Unknown selector {kind}')
+
+
+def make_state(params, segments, selector):
+    """
+    Maps the benchmarked input's segment values to the selector, alongside
+    mapping_size - 1 mappings which don't match
+    """
+    segments = segments[:params.segments]
+    if not segments:
+        mapping = {(): selector}
+    else:
+        mapping = {
+            tuple([f'other-{i}'] * len(segments)): selector
+            for i in range(params.mapping_size - 1)
+        }
+        mapping[tuple([MATCH] * len(segments))] = selector
+    return FeatureState(
+        segments=segments,
+        selectors=[selector],
+        selector_mapping=mapping,
+        created_by='benchmark',
+    )
+
+
+def make_storage(params, redis_url):
+    if params.storage == 'memory':
+        return Memory(), lambda: None
+    if params.storage == 'redis':
+        from redis import Redis
+        from feats.redis import RedisStorage
+        redis = Redis.from_url(redis_url, decode_responses=True)
+        prefix = f'feats-benchmark-{uuid.uuid4().hex}'
+
+        def cleanup():
+            keys = list(redis.scan_iter(f'{prefix}:*'))
+            if keys:
+                redis.delete(*keys)
+        return RedisStorage(redis=redis, key_prefix=prefix), cleanup
+    raise ValueError(f'Unknown storage {params.storage}')
+
+
+def build(params, redis_url):
+    """
+    Builds an app with the parameters, returning it along with the feature
+    and boolean feature to benchmark, and a function to clean up its storage
+    """
+    storage, cleanup = make_storage(params, redis_url)
+    app = App(storage=storage)
+    persister = app.persister(MemoryExperimentPersister(key=lambda value: value))
+    segments = [make_segment(app, i) for i in range(max(params.segments, 1))]
+    features = [make_feature(app, i) for i in range(params.features)]
+    boolean = make_boolean(app)
+
+    implementations = [(features[0], 'default', 'alternative'), (boolean, 'Default', 'Enabled')]
+    for handle, default, alternative in implementations:
+        selector = make_selector(params.selector, segments, persister, default, alternative)
+        state = make_state(params, segments, selector)
+        for _ in range(params.history):
+            handle.state = state
+    return app, features[0], boolean, cleanup
+
+
+def measure(fn, min_time, samples):
+    """
+    Calls fn repeatedly for at least min_time seconds to measure throughput,
+    then times samples individual calls for latency percentiles.
+    """
+    fn()
+    iterations = 0
+    batch = 1
+    start = perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time:
+        for _ in range(batch):
+            fn()
+        iterations += batch
+        batch *= 2
+        elapsed = perf_counter() - start
+
+    latencies = []
+    for _ in range(samples):
+        call_start = perf_counter()
+        fn()
+        latencies.append(perf_counter() - call_start)
+    latencies.sort()
+    return {
+        'iterations': iterations,
+        'ops_per_sec': iterations / elapsed,
+        'mean_us': elapsed / iterations * 1e6,
+        'p50_us': latencies[len(latencies) // 2] * 1e6,
+        'p99_us': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1e6,
+    }
+
+
+def hot_path_benchmarks(params, redis_url, min_time, samples):
+    app, feature, boolean, cleanup = build(params, redis_url)
+    try:
+        benchmarks = {
+            'create': lambda: feature.create('subject'),
+            'is_enabled': lambda: boolean.is_enabled('subject'),
+            'find_implementation': lambda: feature.find_implementation('subject'),
+        }
+        for name, fn in benchmarks.items():
+            yield name, params._asdict(), lambda: measure(fn, min_time, samples)
+    finally:
+        cleanup()
+
+
+def isolated_benchmarks(sweeps, min_time, samples):
+    """
+    Benchmarks serializing and deserializing states, and Rollout.select,
+    without storage or the rest of the evaluation
+    """
+    for mapping_size in sweeps['mapping_size']:
+        params = BASELINE._replace(mapping_size=mapping_size, segments=4)
+        app = App(storage=Memory())
+        segments = [make_segment(app, i) for i in range(params.segments)]
+        state = make_state(params, segments, Static('static', 'alternative'))
+        data = state.serialize(app)
+        param_dict = {'segments': params.segments, 'mapping_size': mapping_size}
+        yield 'FeatureState.serialize', param_dict, lambda: measure(
+            lambda: state.serialize(app), min_time, samples
+        )
+        yield 'FeatureState.deserialize', param_dict, lambda: measure(
+            lambda: FeatureState.deserialize(app, data), min_time, samples
+        )
+
+    app = App(storage=Memory())
+    segment = make_segment(app, 0)
+    for implementations in [2, 10]:
+        weights = {f'impl-{i}': 1 for i in range(implementations)}
+        rollout = Rollout('rollout', segment, weights)
+        yield 'Rollout.select', {'implementations': implementations}, lambda: measure(
+            lambda: rollout.select('subject'), min_time, samples
+        )
+
+
+def redis_available(redis_url):
+    if not redis_url:
+        return False
+    try:
+        from redis import Redis
+        Redis.from_url(redis_url).ping()
+    except Exception as e:
+        print(f'Skipping redis benchmarks: {e}', file=sys.stderr)
+        return False
+    return True
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sweeps, redis_url, min_time, samples, only=None):
+    if not redis_available(redis_url):
+        sweeps = dict(sweeps, storage=[s for s in sweeps['storage'] if s != 'redis'])
+
+    # Each sweep varies a single parameter from the baseline, so the baseline
+    # itself is only measured once
+    configurations = [BASELINE]
+    for field, values in sweeps.items():
+        for value in values:
+            params = BASELINE._replace(**{field: value})
+            if params not in configurations:
+                configurations.append(params)
+
+    # Benchmarks are generated lazily and run as soon as they are yielded,
+    # so only one app is built at a time
+    benchmarks = chain(
+        chain.from_iterable(
+            hot_path_benchmarks(params, redis_url, min_time, samples)
+            for params in configurations
+        ),
+        isolated_benchmarks(sweeps, min_time, samples),
+    )
+    results = []
+    for name, param_dict, run_benchmark in benchmarks:
+        if only and only not in name:
+            continue
+        result = run_benchmark()
+        results.append(dict(name=name, params=param_dict, **result))
+        print(f'{name} {param_dict}: {result["mean_us"]:.2f}us', file=sys.stderr)
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'timestamp': time.time(),
+            'min_time': min_time,
+            'samples': samples,
+        },
+        'results': results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', help='file to write JSON results to, defaults to stdout')
+    parser.add_argument('--redis', help='URL of a redis-server to benchmark RedisStorage against')
+    parser.add_argument('--quick', action='store_true', help='sweep fewer values')
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds to run each benchmark for')
+    parser.add_argument('--samples', type=int, default=1000, help='individually timed calls for percentiles')
+    parser.add_argument('--only', help='only run benchmarks whose name contains this')
+    args = parser.parse_args(argv)
+
+    sweeps = QUICK_SWEEPS if args.quick else SWEEPS
+    results = run(sweeps, args.redis, args.min_time, args.samples, args.only)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+Measures the memory held by the registry of features, and the time taken to
+register them, as every process serving requests carries the registry.
+
+Each count of features is registered in a fresh interpreter, so the
+measurements of one count don't include allocations left over from another.
+Half of the features are classes with two implementations, and the other
+half are boolean features.
+
+Usage, from the root of the repository:
+    python -m benchmarks.memory --output memory.json
+    python -m benchmarks.memory --features 1000 10000 50000
+    python -m benchmarks.memory --lazy
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from time import perf_counter
+
+from benchmarks.hot_path import git_commit, make_feature, make_segment
+from feats.app import App
+from feats.storage import Memory
+
+SEGMENTS = 10
+
+
+def make_boolean(app, index):
+    def boolean(value: str) -> bool:
+        """
+        Enables a generated feature
+        """
+        return True
+    boolean.__module__ = 'benchmarks'
+    boolean.__name__ = boolean.__qualname__ = f'Boolean{index}'
+    return app.boolean(boolean)
+
+
+def register(features, lazy=False):
+    """
+    Returns an app with the number of features registered against it
+    """
+    app = App(storage=Memory(), lazy=lazy)
+    for i in range(SEGMENTS):
+        make_segment(app, i)
+    for i in range(features):
+        if i % 2:
+            make_boolean(app, i)
+        else:
+            make_feature(app, i)
+    return app
+
+
+def resident_bytes():
+    """
+    Returns the resident set size of this process, or the peak on platforms
+    without /proc
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def measure(features, lazy):
+    """
+    Registers the features twice: once to time the registration and measure
+    the growth of the resident set, and once under tracemalloc to count the
+    bytes allocated by feats itself
+    """
+    # Import everything registration touches before taking the baseline
+    register(1, lazy)
+    gc.collect()
+    rss_before = resident_bytes()
+    start = perf_counter()
+    app = register(features, lazy)
+    elapsed = perf_counter() - start
+    gc.collect()
+    rss = resident_bytes() - rss_before
+
+    tracemalloc.start()
+    traced_app = register(features, lazy)
+    gc.collect()
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert len(app.features) == len(traced_app.features) == features
+    return {
+        'features': features,
+        'lazy': lazy,
+        'registration_ms': elapsed * 1000,
+        'registration_us_per_feature': elapsed / features * 1e6,
+        'rss_bytes': rss,
+        'rss_bytes_per_feature': rss / features,
+        'traced_bytes': traced,
+        'traced_bytes_per_feature': traced / features,
+    }
+
+
+def run(counts, lazy):
+    results = []
+    for features in counts:
+        command = [sys.executable, '-m', 'benchmarks.memory', '--child', str(features)]
+        if lazy:
+            command.append('--lazy')
+        output = subprocess.check_output(command)
+        result = json.loads(output)
+        results.append(result)
+        print(
+            f"{features:>7} features: registered in {result['registration_ms']:.0f}ms, "
+            f"{result['traced_bytes_per_feature']:.0f} bytes traced and "
+            f"{result['rss_bytes_per_feature']:.0f} bytes resident per feature",
+            file=sys.stderr,
+        )
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'timestamp': time.time(),
+        },
+        'results': results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', help='file to write JSON results to, defaults to stdout')
+    parser.add_argument('--features', type=int, nargs='+', default=[1000, 10000], help='numbers of features to register')
+    parser.add_argument('--lazy', action='store_true', help='register features without introspecting them')
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child is not None:
+        print(json.dumps(measure(args.child, args.lazy)))
+        return
+
+    output = json.dumps(run(args.features, args.lazy), indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""
+Measures the per-request cost of evaluating features in the example project.
+
+Starts the project with a number of generated features and segments against
+a local redis-server, then drives it with concurrent HTTP clients. The same
+page is requested with every feature evaluated, and with fixed
+implementations, so the difference between the two is the cost of feats.
+
+Usage, from the example directory:
+    python -m loadtest.run --features 50 --segments 10 --concurrency 8 --duration 10
+    python -m loadtest.run --redis memory --output results.json
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+PATHS = {
+    'baseline': '/baseline/',
+    'feats': '/feats/',
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args, port, prefix):
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE='loadtest.settings',
+        FEATS_LOADTEST_FEATURES=str(args.features),
+        FEATS_LOADTEST_SEGMENTS=str(args.segments),
+        FEATS_LOADTEST_REDIS=args.redis,
+        FEATS_LOADTEST_PREFIX=prefix,
+    )
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'loadtest.serve', str(port)],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError('The server exited before it was ready')
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', PATHS['baseline'])
+            connection.getresponse().read()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError('Timed out waiting for the server')
+
+
+def client(port, path, deadline, users, latencies, errors):
+    """
+    Requests the path over a single connection until the deadline,
+    reconnecting whenever the server closes it
+    """
+    connection = None
+    while time.monotonic() < deadline:
+        if connection is None:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        url = f'{path}?user={random.randrange(users)}'
+        start = time.perf_counter()
+        try:
+            connection.request('GET', url)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors.append(url)
+            connection.close()
+            connection = None
+            continue
+        latencies.append(time.perf_counter() - start)
+        if response.status != 200:
+            errors.append(url)
+        if response.will_close:
+            connection.close()
+            connection = None
+    if connection is not None:
+        connection.close()
+
+
+def percentile(values, q):
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def drive(port, path, concurrency, duration, users):
+    latencies = []
+    errors = []
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=client, args=(port, path, deadline, users, latencies, errors))
+        for _ in range(concurrency)
+    ]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    latencies.sort()
+    if not latencies:
+        raise RuntimeError(f'No successful requests to {path}')
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'requests_per_sec': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'mean_ms': sum(latencies) / len(latencies) * 1000,
+    }
+
+
+def cleanup(redis_url, prefix):
+    if redis_url == 'memory':
+        return
+    from redis import Redis
+    redis = Redis.from_url(redis_url)
+    keys = list(redis.scan_iter(f'{prefix}:*'))
+    if keys:
+        redis.delete(*keys)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--features', type=int, default=20, help='features evaluated per page')
+    parser.add_argument('--segments', type=int, default=5, help='segments shared by the features')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent clients')
+    parser.add_argument('--duration', type=float, default=10, help='seconds to drive each page for')
+    parser.add_argument('--warmup', type=float, default=2, help='seconds to drive each page before measuring')
+    parser.add_argument('--users', type=int, default=100000, help='distinct user ids to request pages for')
+    parser.add_argument('--redis', default='redis://localhost:6379/0', help='redis-server URL, or "memory"')
+    parser.add_argument('--output', help='file to write JSON results to')
+    args = parser.parse_args(argv)
+
+    port = free_port()
+    prefix = f'feats-loadtest-{uuid.uuid4().hex}'
+    server = start_server(args, port, prefix)
+    try:
+        results = {}
+        for name, path in PATHS.items():
+            drive(port, path, args.concurrency, args.warmup, args.users)
+            results[name] = drive(port, path, args.concurrency, args.duration, args.users)
+    finally:
+        server.terminate()
+        server.wait()
+        cleanup(args.redis, prefix)
+
+    baseline, evaluated = results['baseline'], results['feats']
+    report = {
+        'config': vars(args),
+        'results': results,
+        'feats_cost_ms': {
+            'p50': evaluated['p50_ms'] - baseline['p50_ms'],
+            'p99': evaluated['p99_ms'] - baseline['p99_ms'],
+            'mean': evaluated['mean_ms'] - baseline['mean_ms'],
+        },
+    }
+    for name, result in results.items():
+        print(
+            f"{name:<10} {result['requests_per_sec']:>8.1f} req/s  "
+            f"p50 {result['p50_ms']:>7.2f}ms  p99 {result['p99_ms']:>7.2f}ms  "
+            f"errors {result['errors']}"
+        )
+    cost = report['feats_cost_ms']
+    print(
+        f"feats cost per request: mean {cost['mean']:.2f}ms, "
+        f"p50 {cost['p50']:.2f}ms, p99 {cost['p99']:.2f}ms "
+        f"({args.features} features)"
+    )
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+"""
+Seeds the generated features' states and serves the example project with a
+threaded WSGI server. Started by loadtest/run.py.
+"""
+import os
+import sys
+
+
+def main():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'loadtest.settings')
+    import django
+    django.setup()
+
+    from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+    from django.core.wsgi import get_wsgi_application
+    from loadtest import settings
+
+    class RequestHandler(WSGIRequestHandler):
+        # Responses are written in several parts, which Nagle's algorithm
+        # would otherwise hold back waiting for the client to acknowledge
+        disable_nagle_algorithm = True
+
+    settings.seed()
+    port = int(sys.argv[1])
+    server = ThreadedWSGIServer(('127.0.0.1', port), RequestHandler)
+    server.daemon_threads = True
+    server.set_app(get_wsgi_application())
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
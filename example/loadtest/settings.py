@@ -0,0 +1,96 @@
+"""
+Settings for load testing the example project.
+
+Registers a configurable number of generated features and segments on a
+feats app backed by Redis, and routes the pages driven by loadtest/run.py.
+Configured through the environment:
+    FEATS_LOADTEST_FEATURES: number of features evaluated per page, default 20
+    FEATS_LOADTEST_SEGMENTS: number of segments the features use, default 5
+    FEATS_LOADTEST_REDIS: URL of the redis-server, or "memory" to use Memory storage
+    FEATS_LOADTEST_PREFIX: key prefix to store feature states under
+"""
+import os
+import zlib
+
+import feats
+from feats.selector import Rollout
+from feats.state import FeatureState
+from feats.storage import Memory as FeatsMemoryStorage
+from project.settings import *  # noqa: F401,F403
+
+DEBUG = False
+ALLOWED_HOSTS = ['*']
+ROOT_URLCONF = 'loadtest.urls'
+INSTALLED_APPS = INSTALLED_APPS + ['loadtest']  # noqa: F405
+
+# The development server logs every request, which would slow it down
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'loggers': {
+        'django.server': {'level': 'WARNING'},
+    },
+}
+
+LOADTEST_FEATURE_COUNT = int(os.environ.get('FEATS_LOADTEST_FEATURES', 20))
+LOADTEST_SEGMENT_COUNT = int(os.environ.get('FEATS_LOADTEST_SEGMENTS', 5))
+LOADTEST_REDIS = os.environ.get('FEATS_LOADTEST_REDIS', 'redis://localhost:6379/0')
+LOADTEST_PREFIX = os.environ.get('FEATS_LOADTEST_PREFIX', 'feats-loadtest')
+
+BUCKETS = ['0', '1', '2', '3']
+
+if LOADTEST_REDIS == 'memory':
+    storage = FeatsMemoryStorage()
+else:
+    from redis import Redis
+    from feats.redis import RedisStorage
+    storage = RedisStorage(
+        redis=Redis.from_url(LOADTEST_REDIS, decode_responses=True),
+        key_prefix=LOADTEST_PREFIX,
+    )
+
+FEATS = feats.App(storage=storage)
+
+
+def make_segment(index):
+    def user(self, user_id: str) -> str:
+        return BUCKETS[zlib.crc32(f'{index}:{user_id}'.encode()) % len(BUCKETS)]
+
+    cls = type(f'LoadSegment{index}', (), {'__module__': __name__, 'user': user, 'OPTIONS': BUCKETS})
+    return FEATS.segment(cls)
+
+
+def make_feature(index):
+    @FEATS.default
+    def control(self, user_id: str) -> str:
+        return f'control {index}'
+
+    def treatment(self, user_id: str) -> str:
+        return f'treatment {index}'
+
+    cls = type(f'LoadFeature{index}', (), {
+        '__module__': __name__,
+        'control': control,
+        'treatment': treatment,
+    })
+    return FEATS.feature(cls)
+
+
+LOADTEST_SEGMENTS = [make_segment(i) for i in range(LOADTEST_SEGMENT_COUNT)]
+LOADTEST_FEATURES = [make_feature(i) for i in range(LOADTEST_FEATURE_COUNT)]
+
+
+def seed():
+    """
+    Rolls each feature out to half of the users in each bucket of one of the
+    segments
+    """
+    for i, handle in enumerate(LOADTEST_FEATURES):
+        segment = LOADTEST_SEGMENTS[i % len(LOADTEST_SEGMENTS)]
+        rollout = Rollout('rollout', segment, {'control': 1, 'treatment': 1})
+        handle.state = FeatureState(
+            segments=[segment],
+            selectors=[rollout],
+            selector_mapping={(bucket,): rollout for bucket in BUCKETS},
+            created_by='loadtest',
+        )
@@ -0,0 +1,40 @@
+import random
+
+from django.conf import settings
+from django.shortcuts import render
+from django.urls import path
+
+
+def _user_id(request):
+    return request.GET.get('user') or str(random.randrange(1000000))
+
+
+def baseline(request):
+    """
+    Renders the page with a fixed implementation of every feature, to
+    measure the cost of the request without feats
+    """
+    _user_id(request)
+    implementations = [
+        (handle.name, handle.feature.default_implementation.name)
+        for handle in settings.LOADTEST_FEATURES
+    ]
+    return render(request, 'loadtest/page.html', {'implementations': implementations})
+
+
+def evaluated(request):
+    """
+    Renders the page with every feature evaluated for the user
+    """
+    user_id = _user_id(request)
+    implementations = [
+        (handle.name, handle.create(user_id))
+        for handle in settings.LOADTEST_FEATURES
+    ]
+    return render(request, 'loadtest/page.html', {'implementations': implementations})
+
+
+urlpatterns = [
+    path('baseline/', baseline),
+    path('feats/', evaluated),
+]
@@ -12,6 +12,9 @@ https://docs.djangoproject.com/en/3.0/ref/settings/
 
 import os
 import feats
+from feats.exposure import ExposureStream, MemoryExposureCounter
+from feats.instrumentation import ImplementationTimingListener
+from feats.persister import MemoryExperimentPersister
 from feats.storage import Memory as FeatsMemoryStorage
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
@@ -123,7 +126,15 @@ USE_TZ = True
 STATIC_URL = '/static/'
 
 
-FEATS = feats.App(storage=FeatsMemoryStorage())
+FEATS = feats.App(
+    storage=FeatsMemoryStorage(),
+    exposures=ExposureStream(
+        [MemoryExposureCounter()],
+        subject=lambda *args: args[0] if args else None,
+    ),
+)
+FEATS.persister(MemoryExperimentPersister())
+FEATS.listener(ImplementationTimingListener())
 
 
 @FEATS.feature
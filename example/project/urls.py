@@ -20,4 +20,5 @@ from django.urls import path, include
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('feats/', include('feats.django.urls')),
+    path('features/', include('feats.django.client_urls')),
 ]
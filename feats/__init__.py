@@ -2,3 +2,5 @@
 
 from .feature import default
 from .app import App
+from .segment import memoize_segments
+from .cache import SegmentCache
@@ -1,73 +1,409 @@
+import abc
 import inspect
-from typing import Dict, List, Optional, Type
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Type
+from weakref import WeakKeyDictionary
 import copy
 
-from .storage import Storage
-from .errors import UnknownSelectorName, UnknownSegmentName
+from . import instrumentation
+from .errors import InvalidPreselectionToken
+from .errors import UnknownPersisterName, UnknownSelectorName, UnknownSegmentName
+from .exposure import ExposureStream
 from .feature import Feature
+from .instrumentation import Evaluation, EvaluationListener
 from .feature import default
 from .meta import Definition
+from .preselection import PreselectionToken
 from .segment import Segment
-from .selector import Experiment, Rollout, Selector, Static, Default
+from .selector import DeterministicExperiment, Experiment, ExperimentPersister
+from .override import OVERRIDES_KEY, Overrides, serialize as serialize_overrides
+from .selector import Rollout, Selector, Static, Default, Override
 from .state import FeatureState
+from .storage import Storage, StoredState, append_many, compare_and_append_many, compare_and_update, latest_states
 
+logger = logging.getLogger(__name__)
 
-class FeatureHandle:
-    def __init__(self, app: 'App', name: str, feature: Feature):
+
+def _feature_from_class(cls) -> Feature:
+    return Feature(Definition.from_object(cls()))
+
+
+def _feature_from_function(fn) -> Feature:
+    return_type = inspect.signature(fn).return_annotation
+    if return_type != bool:
+        raise ValueError(f"Expected bool return type - got {return_type}")
+    return Feature(Definition.from_function(fn))
+
+
+class FeatureHandle(metaclass=abc.ABCMeta):
+    __slots__ = ('app', 'name', 'feature', '_source')
+
+    def __init__(self, app: 'App', name: str, feature: Feature = None, source=None):
+        """
+        Handles are either given the feature, or the class or function it is
+        defined by, in which case the feature is built when first used.
+        """
         self.app = app
         self.name = name
-        self.feature = feature
+        self._source = source
+        if feature is not None:
+            self.feature = feature
 
-    def find_selector(self, *args) -> Selector:
-        state = self.state
+    @staticmethod
+    @abc.abstractmethod
+    def _load(source) -> Feature:
+        """
+        Builds the feature from the class or function it is defined by
+        """
+
+    def __getattr__(self, attr):
+        # Only called while the feature slot is empty, i.e for lazily
+        # registered features which haven't been used yet. Once set, reading
+        # the feature costs nothing extra.
+        if attr != 'feature' or self._source is None:
+            raise AttributeError(attr)
+        self.feature = self._load(self._source)
+        return self.feature
+
+    @property
+    def loaded(self) -> bool:
+        """
+        Whether the feature has been built from its definition
+        """
+        try:
+            object.__getattribute__(self, 'feature')
+        except AttributeError:
+            return False
+        return True
+
+    def _evaluate(self, *args, evaluation: Evaluation = None) -> Tuple[Selector, Optional[tuple]]:
+        """
+        Returns the selector to use for the argument(s) and the segment values
+        it was found with.
+        The default implementation is used when the feature has no state, or
+        no selector is mapped to the segment values.
+        Overridden features are neither read from storage nor segmented.
+        """
+        override = self.app.overrides.get(self)
+        if override is not None:
+            return override, None
+        return self._select(self._load_state(evaluation), args, evaluation)
+
+    def _select(
+            self,
+            state: Optional[FeatureState],
+            args: tuple,
+            evaluation: Evaluation = None) -> Tuple[Selector, Optional[tuple]]:
         if state is None:
-            return Default(self.feature)
-        return state.find_selector(*args)
+            if evaluation is not None:
+                evaluation.fallback = True
+            return Default(self.feature), None
+        segment_values = state.segment_values(*args)
+        if evaluation is not None:
+            evaluation.mark('segment')
+        selector = state.get_selector(segment_values)
+        if selector is None:
+            if evaluation is not None:
+                evaluation.fallback = True
+            selector = Default(self.feature)
+        return selector, segment_values
+
+    def _expose(self, selector: Selector, impl: str, segment_values: Optional[tuple], args: tuple):
+        exposures = self.app.exposures
+        if exposures is not None:
+            exposures.expose(self.name, selector.name, impl, segment_values, args)
 
-    def find_implementation(self, *args) -> str:
+    def find_selector(self, *args) -> Selector:
+        selector, _ = self._evaluate(*args)
+        return selector
+
+    def find_implementation(self, *args, with_token: bool = False):
         """
         Returns the name of the implementation to use for the argument(s).
+
+        If with_token is True, returns the name along with a
+        PreselectionToken, which can be given to used_implementation in
+        place of the name to spare it evaluating the feature again.
+        """
+        if self.app.listeners:
+            return self._instrumented('find_implementation', self._find_implementation, args, with_token)
+        return self._find_implementation(args, with_token)
+
+    def _find_implementation(self, args: tuple, with_token: bool, evaluation: Evaluation = None):
+        if with_token:
+            token, selector = self._preselect(args, evaluation)
+            if evaluation is not None:
+                evaluation.selector, evaluation.implementation = selector.name, token.implementation
+            return token.implementation, token
+        selector, _ = self._evaluate(*args, evaluation=evaluation)
+        name = selector.select(*args)
+        if evaluation is not None:
+            evaluation.mark('select')
+            evaluation.selector, evaluation.implementation = selector.name, name
+        return name
+
+    def preselect_token(self, stored: Optional[StoredState], *args) -> PreselectionToken:
+        """
+        Returns a PreselectionToken for the implementation find_implementation
+        would pick, using the given stored state of the feature rather than
+        fetching the latest, so many features can be preselected from a single
+        read of storage.
+        """
+        state = None
+        if stored is not None:
+            state = FeatureState.deserialize(self.app, stored.data)
+        token, _ = self._token(state, None if stored is None else stored.version, args)
+        return token
+
+    def _preselect(self, args: tuple, evaluation: Evaluation = None) -> Tuple[PreselectionToken, Selector]:
+        """
+        Fetches the latest state of the feature along with its version, and
+        preselects an implementation with it
         """
-        selector = self.find_selector(*args)
-        return selector.select(*args)
+        if self.app.overrides.get(self) is not None:
+            return self._token(None, None, args, evaluation)
+        try:
+            stored = latest_states(self.app.storage, [self.name])[self.name]
+        except Exception:
+            if evaluation is not None:
+                evaluation.mark('storage')
+                evaluation.storage_error = True
+            raise
+        if evaluation is not None:
+            evaluation.mark('storage')
+        if stored is None:
+            return self._token(None, None, args, evaluation)
+
+        state = FeatureState.deserialize(self.app, stored.data)
+        if evaluation is not None:
+            evaluation.mark('deserialize')
+        return self._token(state, stored.version, args, evaluation)
+
+    def _token(
+            self,
+            state: Optional[FeatureState],
+            version: Optional[str],
+            args: tuple,
+            evaluation: Evaluation = None) -> Tuple[PreselectionToken, Selector]:
+        selector = self.app.overrides.get(self)
+        segment_values = None
+        if selector is None:
+            selector, segment_values = self._select(state, args, evaluation)
+        name = selector.select(*args)
+        if evaluation is not None:
+            evaluation.mark('select')
+        index = None
+        if state is not None and not isinstance(selector, (Default, Override)):
+            index = state.selectors.index(selector)
+        return PreselectionToken(self.name, version, index, name, segment_values), selector
+
+    def _redeem(
+            self,
+            token: PreselectionToken,
+            args: tuple,
+            evaluation: Evaluation = None) -> Tuple[Selector, str, Optional[tuple]]:
+        """
+        Returns the selector the token was preselected with, the token's
+        implementation and the segment values it was found with.
+
+        The token is checked against the version of the feature's latest
+        state, so only the one selector needs to be built. If the feature
+        has been reconfigured since, it is evaluated again instead.
+        """
+        if token.feature != self.name:
+            raise InvalidPreselectionToken(
+                "Token is for {}, not {}".format(token.feature, self.name)
+            )
+        override = self.app.overrides.get(self)
+        if override is not None:
+            return override, token.implementation, token.segment_values
+        stored = latest_states(self.app.storage, [self.name])[self.name]
+        if evaluation is not None:
+            evaluation.mark('storage')
+
+        if stored is None and token.version is None:
+            if evaluation is not None:
+                evaluation.fallback = True
+            return Default(self.feature), token.implementation, token.segment_values
+        if stored is not None and stored.version is not None and stored.version == token.version:
+            if token.selector is None:
+                if evaluation is not None:
+                    evaluation.fallback = True
+                return Default(self.feature), token.implementation, token.segment_values
+            selector_data = stored.data.get('selector:{}'.format(token.selector))
+            if selector_data is None:
+                raise InvalidPreselectionToken(
+                    "{} has no selector {}".format(self.name, token.selector)
+                )
+            selector = FeatureState._build_selector(self.app, selector_data)
+            if evaluation is not None:
+                evaluation.mark('deserialize')
+            return selector, token.implementation, token.segment_values
+
+        state = None
+        if stored is not None:
+            state = FeatureState.deserialize(self.app, stored.data)
+            if evaluation is not None:
+                evaluation.mark('deserialize')
+        selector, segment_values = self._select(state, args, evaluation)
+        return selector, token.implementation, segment_values
+
+    def used_implementation(self, impl, *args):
+        """
+        Marks the implementation as used for the argument(s).
+        impl is either the name of the implementation, or a
+        PreselectionToken returned by find_implementation.
+        """
+        if self.app.listeners:
+            return self._instrumented('used_implementation', self._used_implementation, impl, args)
+        self._used_implementation(impl, args)
 
-    def used_implementation(self, impl: str, *args):
-        selector = self.find_selector(*args)
+    def _used_implementation(self, impl, args: tuple, evaluation: Evaluation = None) -> None:
+        if isinstance(impl, PreselectionToken):
+            selector, impl, segment_values = self._redeem(impl, args, evaluation)
+        else:
+            selector, segment_values = self._evaluate(*args, evaluation=evaluation)
         selector.used_implementation(impl, *args)
+        if evaluation is not None:
+            evaluation.mark('select')
+            evaluation.selector, evaluation.implementation = selector.name, impl
+        self._expose(selector, impl, segment_values, args)
+        if evaluation is not None:
+            evaluation.mark('exposure')
+
+    def _use(self, args: tuple, evaluation: Evaluation = None):
+        """
+        Selects and marks an implementation as used for the argument(s),
+        then calls it.
+        """
+        selector, segment_values = self._evaluate(*args, evaluation=evaluation)
+        name = selector.select_and_use(*args)
+        if evaluation is not None:
+            evaluation.mark('select')
+            evaluation.selector, evaluation.implementation = selector.name, name
+        self._expose(selector, name, segment_values, args)
+        if evaluation is not None:
+            evaluation.mark('exposure')
+        result = self.feature.implementations[name].fn(*args)
+        if evaluation is not None:
+            evaluation.mark('implementation')
+        return result
+
+    def _instrumented(self, method: str, evaluate: Callable, *args):
+        """
+        Calls evaluate with the arguments and an Evaluation of the method,
+        recording it for the app's listeners.
+        Kept apart from the methods so they pay nothing for instrumentation
+        while there are no listeners.
+        """
+        evaluation = instrumentation.begin(self.name, method)
+        try:
+            return evaluate(*args, evaluation=evaluation)
+        finally:
+            instrumentation.end(evaluation)
+            self.app._notify_listeners(evaluation)
 
-    @property
-    def state(self) -> Optional[FeatureState]:
-        states = self.app.storage[self.name]
+    def _load_state(self, evaluation: Evaluation = None) -> Optional[FeatureState]:
+        """
+        Fetches and deserializes the latest state of the feature, recording
+        the time taken on the evaluation, if given.
+        """
         try:
-            state_data = states.last()
+            state_data = self.app.storage[self.name].last()
         except IndexError:
+            if evaluation is not None:
+                evaluation.mark('storage')
             return None
+        except Exception:
+            if evaluation is not None:
+                evaluation.mark('storage')
+                evaluation.storage_error = True
+            raise
+        if evaluation is not None:
+            evaluation.mark('storage')
+
+        state = FeatureState.deserialize(self.app, state_data)
+        if evaluation is not None:
+            evaluation.mark('deserialize')
+        return state
 
-        return FeatureState.deserialize(self.app, state_data)
+    @property
+    def state(self) -> Optional[FeatureState]:
+        transaction = self.app._transaction()
+        if transaction is not None and self.name in transaction.states:
+            return FeatureState.deserialize(self.app, copy.deepcopy(transaction.states[self.name]))
+        return self._load_state()
 
     @state.setter
     def state(self, new_state: FeatureState):
         serialized_state = copy.deepcopy(new_state.serialize(self.app))
+        transaction = self.app._transaction()
+        if transaction is not None:
+            transaction.states[self.name] = serialized_state
+            return
         self.app.storage[self.name].append(serialized_state)
 
+    def update_state(
+            self,
+            update: Callable[[Optional[FeatureState]], Optional[FeatureState]],
+            retries: int = 3) -> Optional[FeatureState]:
+        """
+        Stores the state returned by update when given the latest state, or
+        None if the feature has no state. If update returns None, nothing is
+        stored.
+
+        Unlike assigning to state, the new state is only stored if no other
+        state was stored since the latest one was read. Otherwise update is
+        called again with the state which was, up to retries more times,
+        before raising ConcurrentModification. update may also raise
+        ConcurrentModification itself if it can't be applied to the new state.
+
+        Within App.transaction, the version of the state read is checked when
+        the transaction is stored instead, and the transaction raises
+        ConcurrentModification without retrying.
+        """
+        transaction = self.app._transaction()
+        if transaction is not None:
+            if self.name in transaction.states:
+                state = self.state
+            else:
+                stored = latest_states(self.app.storage, [self.name])[self.name]
+                state = None if stored is None else FeatureState.deserialize(self.app, stored.data)
+                transaction.versions.setdefault(self.name, None if stored is None else stored.version)
+            new_state = update(state)
+            if new_state is not None:
+                self.state = new_state
+            return new_state
+
+        new_states = []
+
+        def update_stored(stored):
+            state = None if stored is None else FeatureState.deserialize(self.app, stored.data)
+            new_state = update(state)
+            new_states.append(new_state)
+            return None if new_state is None else copy.deepcopy(new_state.serialize(self.app))
+
+        if compare_and_update(self.app.storage, self.name, update_stored, retries) is None:
+            return None
+        return new_states[-1]
+
     def valid_segments(self):
         """
         Returns the segments which can take the same inputs as this feature
         """
-        input_type = None
         if len(self.feature.input_types) != 1:
             return {}
 
-        input_type = self.feature.input_types[0]
-        found = {}
-        for name, segment in self.app.segments.items():
-            impl = segment.find_implementation(input_type)
-            if impl is not None:
-                found[name] = segment
-        return found
+        return self.app.get_segments_for_type(self.feature.input_types[0])
 
 
 class FeatureFactory(FeatureHandle):
+    __slots__ = ()
+    _load = staticmethod(_feature_from_class)
+
     def create(self, *args) -> object:
         """
         Returns the appropriate implementation to use for the argument(s).
@@ -75,18 +411,31 @@ class FeatureFactory(FeatureHandle):
         The implementation is found using any configured segmentations and
         selectors for the feature.
         """
-        selector = self.find_selector(*args)
-        name = selector.select(*args)
-        selector.used_implementation(name, *args)
-        return self.feature.implementations[name].fn(*args)
+        if self.app.listeners:
+            return self._instrumented('create', self._use, args)
+        return self._use(args)
 
 
 class FeatureConditional(FeatureHandle):
+    __slots__ = ()
+    _load = staticmethod(_feature_from_function)
+
     def is_enabled(self, *args) -> bool:
-        selector = self.find_selector(*args)
-        name = selector.select(*args)
-        selector.used_implementation(name, *args)
-        return bool(self.feature.implementations[name].fn(*args))
+        if self.app.listeners:
+            return bool(self._instrumented('is_enabled', self._use, args))
+        return bool(self._use(args))
+
+
+class Transaction:
+    """
+    The new states of features, collected by App.transaction to be stored
+    together, and the versions update_state read them at
+    """
+    __slots__ = ('states', 'versions')
+
+    def __init__(self):
+        self.states: Dict[str, dict] = {}
+        self.versions: Dict[str, Optional[str]] = {}
 
 
 class App:
@@ -95,16 +444,32 @@ class App:
     are held. An application can have multiple app, but typically will use
     a single one.
     """
-    def __init__(self, *, storage: Storage):
+    def __init__(self, *, storage: Storage, exposures: ExposureStream = None, lazy: bool = False):
         """
         storage: where to store and retrieve feature states
+        exposures: if given, records which implementation of a feature was
+            used each time one is created, checked or marked as used
+        lazy: if True, features are only introspected and validated when
+            first used, or by validate, instead of when they are registered
         """
         self.segments: Dict[str, Segment] = {}
         self.features: Dict[str, FeatureHandle] = {}
         self.selectors: Dict[str, Selector] = {}
+        self.persisters: Dict[str, ExperimentPersister] = {}
         self.storage = storage
-
-        for cls in [Experiment, Rollout, Static]:
+        self.exposures = exposures
+        self.listeners: List[EvaluationListener] = []
+        self.lazy = lazy
+        # Lazily registered features which aren't indexed by input type yet
+        self._unindexed: Dict[str, FeatureHandle] = {}
+        # Indexes built as features and segments are registered, so lookups
+        # by input type don't need to scan every registration
+        self._features_by_input_types: Dict[tuple, Dict[str, FeatureHandle]] = {}
+        self._segments_by_type = WeakKeyDictionary()
+        self._local = threading.local()
+        self.overrides = Overrides()
+
+        for cls in [Experiment, DeterministicExperiment, Rollout, Static]:
             self.selectors[self._name(cls)] = cls
 
     def _name(self, cls):
@@ -126,6 +491,15 @@ class App:
             raise UnknownSelectorName(class_name)
         return self.selectors[class_name]
 
+    def get_persister(self, persister_name):
+        """
+        Fetches the registered persister related to the fully qualified name
+        """
+        persister = self.persisters.get(persister_name)
+        if persister is None:
+            raise UnknownPersisterName(persister_name)
+        return persister
+
     def get_segment(self, segment_name):
         """
         Fetches the segment from our application related to the fully qualified name
@@ -139,10 +513,86 @@ class App:
         """
         Returns the registered features which require values of the given input types.
         """
-        return [
-                handle for handle in self.features.values()
-                if handle.feature.input_types == input_types
-        ]
+        self._index_features()
+        handles = self._features_by_input_types.get(tuple(input_types), {})
+        return list(handles.values())
+
+    def get_features_for(self, *args) -> List[FeatureHandle]:
+        """
+        Returns the registered features which can be given the argument(s),
+        i.e whose input types the arguments are instances of.
+        """
+        self._index_features()
+        handles = []
+        for input_types, features in self._features_by_input_types.items():
+            if len(input_types) != len(args):
+                continue
+            if all(
+                isinstance(input_type, type) and isinstance(arg, input_type)
+                for arg, input_type in zip(args, input_types)
+            ):
+                handles.extend(features.values())
+        return handles
+
+    def get_segments_for_type(self, input_type: Type) -> Dict[str, Segment]:
+        """
+        Returns the registered segments which can segment values of the given type.
+        """
+        segments = self._segments_by_type.get(input_type)
+        if segments is None:
+            segments = {
+                name: segment for name, segment in self.segments.items()
+                if segment.find_implementation(input_type) is not None
+            }
+            self._segments_by_type[input_type] = segments
+        return dict(segments)
+
+    def _register_feature(self, name: str, handle: FeatureHandle) -> None:
+        previous = self.features.get(name)
+        unindexed = self._unindexed.pop(name, None) is not None
+        if previous is not None and not unindexed and previous.loaded:
+            key = previous.feature.input_types
+            self._features_by_input_types[key].pop(name, None)
+
+        self.features[name] = handle
+        if not handle.loaded:
+            self._unindexed[name] = handle
+            return
+        key = handle.feature.input_types
+        self._features_by_input_types.setdefault(key, {})[name] = handle
+
+    def _index_features(self) -> None:
+        """
+        Loads and indexes the lazily registered features. Invalid features
+        are logged and left out of the index, and raise when used.
+        """
+        while self._unindexed:
+            name, handle = next(iter(self._unindexed.items()))
+            del self._unindexed[name]
+            try:
+                key = handle.feature.input_types
+            except ValueError:
+                logger.exception("Feature %s is invalid and was not indexed", name)
+                continue
+            self._features_by_input_types.setdefault(key, {})[name] = handle
+
+    def validate(self) -> None:
+        """
+        Loads every lazily registered feature, raising a ValueError listing
+        the features whose definitions are invalid.
+        Apps which aren't lazy validate features as they are registered.
+        """
+        errors = []
+        for name, handle in list(self.features.items()):
+            if handle.loaded:
+                continue
+            try:
+                handle.feature
+            except ValueError as e:
+                errors.append("{}: {}".format(name, e))
+        if errors:
+            raise ValueError(errors)
+        self._index_features()
 
     def feature(self, cls) -> FeatureFactory:
         """
@@ -170,13 +620,13 @@ class App:
         if not inspect.isclass(cls):
             raise ValueError("Invalid feature object - expected class")
 
-        obj = cls()
-        definition = Definition.from_object(obj)
-        feature = Feature(definition)
         name = self._name(cls)
-        handle = FeatureFactory(self, name, feature)
+        if self.lazy:
+            handle = FeatureFactory(self, name, source=cls)
+        else:
+            handle = FeatureFactory(self, name, _feature_from_class(cls))
         # TODO: Prevent double-write
-        self.features[name] = handle
+        self._register_feature(name, handle)
         return handle
 
     def default(self, fn):
@@ -207,15 +657,12 @@ class App:
         if not callable(fn):
             raise ValueError("Boolean feature must be a function")
 
-        return_type = inspect.signature(fn).return_annotation
-        if return_type != bool:
-            raise ValueError(f"Expected bool return type - got {return_type}")
-
-        definition = Definition.from_function(fn)
-        feature = Feature(definition)
         name = self._name(fn)
-        handle = FeatureConditional(self, name, feature)
-        self.features[name] = handle
+        if self.lazy:
+            handle = FeatureConditional(self, name, source=fn)
+        else:
+            handle = FeatureConditional(self, name, _feature_from_function(fn))
+        self._register_feature(name, handle)
         return handle
 
     def segment(self, cls):
@@ -232,6 +679,9 @@ class App:
 
             def floats(self, f: float) -> str:
                 return str(f)
+
+        Segments can declare a list of OPTIONS their values are limited to,
+        and a feats.SegmentCache as CACHE to reuse values across units of work.
         """
         if not inspect.isclass(cls):
             raise ValueError("Invalid segment object - expected class")
@@ -239,6 +689,149 @@ class App:
         obj = cls()
         name = self._name(cls)
         definition = Definition.from_object(obj)
-        seg = Segment(name, definition, options=getattr(obj, 'OPTIONS', None))
+        seg = Segment(
+            name,
+            definition,
+            options=getattr(obj, 'OPTIONS', None),
+            cache=getattr(obj, 'CACHE', None),
+        )
         self.segments[name] = seg
+        self._segments_by_type.clear()
         return seg
+
+    def _validate_override(self, key: str, implementation: str) -> None:
+        """
+        Raises ValueError unless key names a feature with the implementation,
+        or a group of features at least one of which has it
+        """
+        handle = self.features.get(key)
+        if handle is not None:
+            if implementation not in handle.feature.implementations:
+                raise ValueError("{} has no implementation '{}'".format(key, implementation))
+            return
+        prefix = key + '.'
+        group = [handle for name, handle in self.features.items() if name.startswith(prefix)]
+        if not group:
+            raise ValueError("No feature is named {} or grouped under it".format(key))
+        if not any(implementation in handle.feature.implementations for handle in group):
+            raise ValueError("No feature in {} has an implementation '{}'".format(key, implementation))
+
+    def _store_overrides(self, change, created_by: str) -> None:
+        """
+        Stores the overrides change returns when given the stored ones, and
+        uses them straight away in this process
+        """
+        def update(stored):
+            overrides = {} if stored is None else json.loads(stored.data['overrides'])
+            change(overrides)
+            return serialize_overrides(overrides, created_by)
+
+        data = compare_and_update(self.storage, OVERRIDES_KEY, update)
+        self.overrides.replace(json.loads(data['overrides']))
+
+    def set_override(self, key: str, implementation: str, created_by: str) -> None:
+        """
+        Forces the feature named key, or every feature in the group of
+        features whose names start with key, to use the implementation,
+        whatever their states. Features in a group without the implementation
+        aren't affected.
+
+        The override is stored so other processes sharing the storage can
+        pick it up with sync_overrides, e.g from an OverrideWatcher.
+        """
+        self._validate_override(key, implementation)
+        self._store_overrides(lambda overrides: overrides.update({key: implementation}), created_by)
+
+    def clear_override(self, key: str, created_by: str) -> None:
+        """
+        Removes the override set for key, if any
+        """
+        self._store_overrides(lambda overrides: overrides.pop(key, None), created_by)
+
+    def sync_overrides(self) -> bool:
+        """
+        Reads the overrides stored by any app sharing this app's storage in
+        a single round trip, returning whether they changed
+        """
+        stored = latest_states(self.storage, [OVERRIDES_KEY])[OVERRIDES_KEY]
+        return self.overrides.load(stored)
+
+    def _transaction(self) -> Optional[Transaction]:
+        return getattr(self._local, 'transaction', None)
+
+    @contextmanager
+    def transaction(self) -> Iterator[Transaction]:
+        """
+        Collects the states assigned to features in this thread, and stores
+        them all at once when the block exits, e.g to switch many features to
+        their fallbacks during an incident.
+
+        Storages which support it, like RedisStorage, store the states
+        atomically, so either every state is applied or none are. If the
+        block raises, no state is stored. Reading the state of a feature
+        within the block returns the state assigned to it, if any.
+        Transactions nested within one another are stored with the outermost.
+
+        States stored with update_state are only stored if no other state was
+        stored for those features since they were read. Otherwise, the
+        transaction raises ConcurrentModification and stores nothing.
+        """
+        transaction = self._transaction()
+        if transaction is not None:
+            yield transaction
+            return
+
+        transaction = self._local.transaction = Transaction()
+        try:
+            yield transaction
+        finally:
+            self._local.transaction = None
+        if not transaction.states:
+            return
+        versions = {
+            name: version for name, version in transaction.versions.items()
+            if name in transaction.states
+        }
+        if versions:
+            compare_and_append_many(self.storage, transaction.states, versions)
+        else:
+            append_many(self.storage, transaction.states)
+
+    def listener(self, listener: EvaluationListener) -> EvaluationListener:
+        """
+        Registers the listener to receive a record of how each feature
+        evaluation went, including the time spent in each phase.
+        Evaluations are only recorded while the app has listeners.
+
+        Example
+        histograms = my_app.listener(HistogramListener())
+        """
+        if not isinstance(listener, EvaluationListener):
+            raise ValueError("Invalid listener - expected an EvaluationListener")
+
+        self.listeners.append(listener)
+        return listener
+
+    def _notify_listeners(self, evaluation: Evaluation) -> None:
+        for listener in self.listeners:
+            try:
+                listener.on_evaluation(evaluation)
+            except Exception:
+                logger.exception("Evaluation listener %s failed", listener)
+
+    def persister(self, persister: ExperimentPersister) -> ExperimentPersister:
+        """
+        Registers the persister so experiments can remember the groups
+        objects were bucketed in.
+
+        Persisters are registered by the fully qualified name of their class,
+        so only one persister of each class can be registered.
+
+        Example
+        my_app.persister(RedisExperimentPersister(redis, key=lambda user: user.id))
+        """
+        if not isinstance(persister, ExperimentPersister):
+            raise ValueError("Invalid persister - expected an ExperimentPersister")
+
+        self.persisters[self._name(persister)] = persister
+        return persister
@@ -0,0 +1,167 @@
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from typing import Callable, Hashable
+
+CacheInfo = namedtuple(
+    'CacheInfo',
+    ['hits', 'misses', 'evictions', 'expirations', 'size', 'maxsize']
+)
+
+_missing = object()
+
+
+class TTLCache:
+    """
+    A bounded, thread-safe cache whose entries expire after a time to live.
+
+    When the cache is full, the least recently used entry is evicted to make
+    room for a new one. Statistics about the cache's usage are available
+    through `info`.
+    """
+    def __init__(self, maxsize: int, ttl: float, timer: Callable[[], float] = time.monotonic):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        if ttl <= 0:
+            raise ValueError("ttl must be positive")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key: Hashable, default=None):
+        """
+        Returns the value cached for the key, or default if there is no
+        unexpired value.
+        """
+        with self._lock:
+            entry = self._entries.get(key, _missing)
+            if entry is _missing:
+                self._misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at <= self._timer():
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def set(self, key: Hashable, value) -> None:
+        """
+        Caches the value for the key until the ttl elapses.
+        """
+        with self._lock:
+            self._entries[key] = (self._timer() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        """
+        Removes all entries from the cache. Statistics are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                expirations=self._expirations,
+                size=len(self._entries),
+                maxsize=self.maxsize,
+            )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SegmentCache(TTLCache):
+    """
+    Caches the values of a segment across units of work.
+
+    Segments declare a cache by setting it as their CACHE attribute.
+    key is given the object being segmented and returns a stable, hashable
+    identifier for it, e.g its id. Objects for which key returns None are not
+    cached.
+
+    Example:
+    @my_app.segment
+    class Subdivision:
+        CACHE = SegmentCache(key=lambda user: user.id, ttl=300)
+
+        def user(self, user: User) -> str:
+            return user.address.subdivision_code
+    """
+    def __init__(
+            self,
+            key: Callable[[object], Hashable],
+            ttl: float,
+            maxsize: int = 1024,
+            timer: Callable[[], float] = time.monotonic):
+        super().__init__(maxsize, ttl, timer)
+        self.key = key
+
+
+class BloomFilter:
+    """
+    A probabilistic set of keys using a fixed amount of memory.
+
+    Keys which were added are always reported as contained, and keys which
+    weren't are falsely reported as contained with a probability of about
+    error_rate. Once capacity keys have been added the filter is cleared, so
+    the error rate never exceeds the configured one.
+    """
+    def __init__(self, capacity: int, error_rate: float):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def _positions(self, key: Hashable):
+        digest = hashlib.blake2b(str(key).encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, key: Hashable) -> None:
+        positions = self._positions(key)
+        with self._lock:
+            if self._count >= self.capacity:
+                self._bits = bytearray(len(self._bits))
+                self._count = 0
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+            self._count += 1
+
+    def __contains__(self, key: Hashable) -> bool:
+        bits = self._bits
+        return all(
+            bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+    def __len__(self) -> int:
+        return self._count
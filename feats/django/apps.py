@@ -1,8 +1,17 @@
+import logging
+from collections import namedtuple
+from importlib import import_module
+from time import perf_counter
+
 from django.apps import AppConfig
 from django.core.exceptions import ImproperlyConfigured, AppRegistryNotReady
 from django.conf import settings
+from django.utils.module_loading import module_has_submodule
 from feats import App
-from importlib import import_module
+
+logger = logging.getLogger(__name__)
+
+ModuleImport = namedtuple('ModuleImport', ['module', 'seconds', 'features'])
 
 
 class FeatsConfig(AppConfig):
@@ -12,6 +21,11 @@ class FeatsConfig(AppConfig):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._feats_app = None
+        self.module_imports = []
+        """
+        The feats module of each installed app, with the time taken to import
+        it and the number of features it registered
+        """
 
     def ready(self):
         feats_app = settings.FEATS
@@ -27,11 +41,20 @@ class FeatsConfig(AppConfig):
         self._feats_app = feats_app
         # Register other feats files in other django apps
         for app in self.apps.get_app_configs():
-            try:
-                import_module('.feats', app.name)
-            except ModuleNotFoundError:
-                # Not all apps need to have feats
-                pass
+            # Not all apps need to have feats. Checking first, rather than
+            # catching ModuleNotFoundError, doesn't hide errors from inside
+            # of the feats module.
+            if not module_has_submodule(app.module, 'feats'):
+                continue
+            module = '{}.feats'.format(app.name)
+            features = len(feats_app.features)
+            start = perf_counter()
+            import_module(module)
+            seconds = perf_counter() - start
+            self.module_imports.append(
+                ModuleImport(module, seconds, len(feats_app.features) - features)
+            )
+            logger.debug("Imported %s in %.1fms", module, seconds * 1000)
 
     @property
     def feats_app(self):
@@ -0,0 +1,9 @@
+from django.conf.urls import url
+
+from . import views
+
+app_name = 'feats-client'
+urlpatterns = [
+    url(r'^preselect/$', views.Preselect.as_view(), name='preselect'),
+    url(r'^used/$', views.UsedImplementations.as_view(), name='used'),
+]
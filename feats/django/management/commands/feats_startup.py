@@ -0,0 +1,35 @@
+from time import perf_counter
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Reports the time taken to import the feats module of each installed "
+        "app, and to validate every registered feature."
+    )
+
+    def handle(self, *args, **options):
+        config = apps.get_app_config('feats')
+        feats_app = config.feats_app
+
+        imports = sorted(config.module_imports, key=lambda i: i.seconds, reverse=True)
+        for module_import in imports:
+            self.stdout.write("{:>9.1f}ms {:>5} features  {}".format(
+                module_import.seconds * 1000, module_import.features, module_import.module,
+            ))
+        self.stdout.write("{:>9.1f}ms {:>5} features  imported in total".format(
+            sum(i.seconds for i in imports) * 1000,
+            sum(i.features for i in imports),
+        ))
+
+        unloaded = sum(not handle.loaded for handle in feats_app.features.values())
+        start = perf_counter()
+        try:
+            feats_app.validate()
+        except ValueError as e:
+            raise CommandError("Invalid features: {}".format(e))
+        self.stdout.write("{:>9.1f}ms {:>5} features  loaded by App.validate()".format(
+            (perf_counter() - start) * 1000, unloaded,
+        ))
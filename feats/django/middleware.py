@@ -0,0 +1,100 @@
+from django.apps import apps
+
+from feats.django.persister import CookieExperimentPersister
+from feats.instrumentation import CollectingListener, summarize
+from feats.segment import memoize_segments
+
+
+def evaluation_collector() -> CollectingListener:
+    """
+    Returns the app's CollectingListener, registering one if needed
+    """
+    feats_app = apps.get_app_config('feats').feats_app
+    for listener in feats_app.listeners:
+        if isinstance(listener, CollectingListener):
+            return listener
+    return feats_app.listener(CollectingListener())
+
+
+class SegmentMemoMiddleware:
+    """
+    Memoizes segment values for the duration of each request.
+
+    A request evaluating several features which segment on the same object,
+    e.g the request's user, will only compute each segment value once.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with memoize_segments():
+            return self.get_response(request)
+
+
+class ExperimentCookieMiddleware:
+    """
+    Loads the experiment groups stored by each registered
+    CookieExperimentPersister at the start of a request, and sets a single
+    cookie for each on the response if groups were persisted.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    @property
+    def persisters(self):
+        feats_app = apps.get_app_config('feats').feats_app
+        return [
+            persister for persister in feats_app.persisters.values()
+            if isinstance(persister, CookieExperimentPersister)
+        ]
+
+    def __call__(self, request):
+        persisters = self.persisters
+        for persister in persisters:
+            persister.start_request(request)
+
+        response = None
+        try:
+            response = self.get_response(request)
+        finally:
+            for persister in persisters:
+                persister.finish_request(response)
+        return response
+
+
+class ServerTimingMiddleware:
+    """
+    Adds the cost of the features evaluated during each request to the
+    response's Server-Timing header, so it can be seen in the browser's
+    developer tools.
+
+    The evaluations are also available to views as request.feats_evaluations.
+    Instrumenting evaluations slows them down slightly, so this is intended
+    for development and debugging. It should be placed before any middleware
+    which evaluates features.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.collector = evaluation_collector()
+
+    def __call__(self, request):
+        with self.collector.collect() as evaluations:
+            request.feats_evaluations = evaluations
+            response = self.get_response(request)
+
+        metrics = self.server_timing(evaluations)
+        existing = response.get('Server-Timing')
+        response['Server-Timing'] = f'{existing}, {metrics}' if existing else metrics
+        return response
+
+    def server_timing(self, evaluations) -> str:
+        summary = summarize(evaluations)
+        description = (
+            f'{summary.count} evaluations, {summary.storage_round_trips} storage round trips, '
+            f'{summary.cache_hits} cache hits'
+        )
+        metrics = [f'feats;dur={summary.duration * 1000:.3f};desc="{description}"']
+        for phase, seconds in summary.phases.items():
+            if seconds:
+                metrics.append(f'feats-{phase};dur={seconds * 1000:.3f}')
+        return ', '.join(metrics)
@@ -0,0 +1,49 @@
+from debug_toolbar.panels import Panel
+
+from feats.django.middleware import evaluation_collector
+from feats.instrumentation import summarize
+
+
+class FeatsPanel(Panel):
+    """
+    A django-debug-toolbar panel listing every feature evaluated during the
+    request, with the time spent, storage round trips, cache hits and
+    chosen implementations.
+
+    Enable it by adding 'feats.django.panels.FeatsPanel' to
+    DEBUG_TOOLBAR_PANELS.
+    """
+    title = 'Feats'
+    template = 'feats/panel.html'
+
+    @property
+    def nav_subtitle(self):
+        stats = self.get_stats()
+        if not stats:
+            return ''
+        summary = stats['summary']
+        return '{} evaluations in {:.2f}ms'.format(summary['count'], summary['duration'] * 1000)
+
+    def process_request(self, request):
+        with evaluation_collector().collect() as evaluations:
+            response = super().process_request(request)
+        summary = summarize(evaluations)
+        self.record_stats({
+            'summary': dict(summary._asdict()),
+            'evaluations': [
+                {
+                    'feature': evaluation.feature,
+                    'method': evaluation.method,
+                    'selector': evaluation.selector,
+                    'implementation': evaluation.implementation,
+                    'duration': evaluation.duration,
+                    'timings': dict(evaluation.timings),
+                    'cache_hits': evaluation.cache_hits,
+                    'storage_error': evaluation.storage_error,
+                    'fallback': evaluation.fallback,
+                    'nested': evaluation.nested,
+                }
+                for evaluation in evaluations
+            ],
+        })
+        return response
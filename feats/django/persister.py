@@ -0,0 +1,110 @@
+import threading
+from typing import Optional
+
+from django.core import signing
+
+from feats.selector import ExperimentPersister
+
+
+class _CookieGroups:
+    """
+    The experiment groups held in one request's cookie
+    """
+    def __init__(self, request, persister):
+        self.groups = persister.load(request.COOKIES.get(persister.cookie_name))
+        self.changed = False
+
+
+class CookieExperimentPersister(ExperimentPersister):
+    """
+    Keeps each visitor's experiment groups in a single signed cookie, so no
+    storage is needed on the server.
+
+    Groups belong to the visitor of the request being handled, regardless of
+    the object given, so experiments using this persister should be
+    evaluated for the visitor of the request.
+    ExperimentCookieMiddleware must be installed. It reads the cookie once
+    per request, and writes all of the request's new groups in a single
+    Set-Cookie on the response. Outside of a request, objects can't be
+    bucketed.
+    """
+    def __init__(
+            self,
+            cookie_name: str = 'feats_experiments',
+            max_age: int = 60 * 60 * 24 * 365,
+            salt: str = 'feats.django.persister',
+            path: str = '/',
+            domain: str = None,
+            secure: bool = False,
+            httponly: bool = True,
+            samesite: str = 'Lax'):
+        self.cookie_name = cookie_name
+        self.max_age = max_age
+        self.salt = salt
+        self.path = path
+        self.domain = domain
+        self.secure = secure
+        self.httponly = httponly
+        self.samesite = samesite
+        self._local = threading.local()
+
+    def load(self, value: Optional[str]) -> dict:
+        """
+        Returns the groups stored in the cookie's value. Cookies which have
+        been tampered with are ignored.
+        """
+        if not value:
+            return {}
+        try:
+            groups = signing.loads(value, salt=self.salt)
+        except signing.BadSignature:
+            return {}
+        if not isinstance(groups, dict):
+            return {}
+        return groups
+
+    def dump(self, groups: dict) -> str:
+        return signing.dumps(groups, salt=self.salt, compress=True)
+
+    def start_request(self, request) -> None:
+        self._local.groups = _CookieGroups(request, self)
+
+    def finish_request(self, response) -> None:
+        """
+        Sets the cookie on the response if any groups were persisted during
+        the request. response is None if the request failed.
+        """
+        current = getattr(self._local, 'groups', None)
+        self._local.groups = None
+        if current is None or not current.changed or response is None:
+            return
+        response.set_cookie(
+            self.cookie_name,
+            self.dump(current.groups),
+            max_age=self.max_age,
+            path=self.path,
+            domain=self.domain,
+            secure=self.secure,
+            httponly=self.httponly,
+            samesite=self.samesite,
+        )
+
+    def get_existing_test_group(self, experiment: str, obj: object) -> Optional[str]:
+        current = getattr(self._local, 'groups', None)
+        if current is None:
+            return None
+        return current.groups.get(experiment)
+
+    def persist_test_group(self, experiment: str, obj: object, group: str) -> Optional[str]:
+        current = getattr(self._local, 'groups', None)
+        if current is None:
+            return None
+        existing = current.groups.get(experiment)
+        if existing is not None:
+            return existing
+        current.groups[experiment] = group
+        current.changed = True
+        return group
+
+    def get_or_persist_test_group(self, experiment: str, obj: object, group: str) -> Optional[str]:
+        return self.persist_test_group(experiment, obj, group)
@@ -0,0 +1,8 @@
+from django.conf.urls import url
+
+from . import views
+
+app_name = 'feats-service'
+urlpatterns = [
+    url(r'^snapshot/$', views.Snapshot.as_view(), name='snapshot'),
+]
@@ -12,3 +12,15 @@ def selector_type(selector):
         return name
     else:
         raise ValueError("Selector '{}' has not been registered with the app".format(name))
+
+
+@register.filter
+def persister_name(persister):
+    return app_config.feats_app._name(persister)
+
+
+@register.filter
+def milliseconds(seconds):
+    if seconds is None:
+        return '-'
+    return '{:.3f}ms'.format(seconds * 1000)
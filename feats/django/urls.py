@@ -9,5 +9,6 @@ urlpatterns = [
     url(r'^features/([^/]+)/segmentation/$', views.ChangeSegmentation.as_view(), name='update-segmentation'),
     url(r'^features/([^/]+)/segmentation-mapping/$', views.ChangeMapping.as_view(), name='update-mapping'),
     url(r'^features/([^/]+)/$', views.Detail.as_view(), name='detail'),
+    url(r'^overrides/$', views.Overrides.as_view(), name='overrides'),
     url(r'^$', views.Index.as_view(), name='index'),
 ]
@@ -1,7 +1,11 @@
 # flake8: noqa
 from .detail import Detail
 from .index import Index
+from .overrides import Overrides
 from .segmentation import ChangeMapping
 from .segmentation import ChangeSegmentation
 from .selectors import ChangeSelector
 from .selectors import AddSelector
+from .preselect import Preselect
+from .preselect import UsedImplementations
+from .snapshot import Snapshot
@@ -1,4 +1,5 @@
 from django.apps import apps
+from django.http import HttpResponse
 from django.views.generic import base
 from django import forms
 from collections import defaultdict
@@ -9,19 +10,27 @@ WIDGET_ATTRS = {'class': 'form-control'}
 TEXT_WIDGET = forms.TextInput(attrs=WIDGET_ATTRS)
 INTEGER_WIDGET = forms.NumberInput(attrs=WIDGET_ATTRS)
 CHOICES_WIDGET = forms.Select(attrs=WIDGET_ATTRS)
+CHECKBOX_WIDGET = forms.CheckboxInput(attrs={'class': 'form-check-input'})
 
 
 class TemplateView(base.TemplateView):
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['features'] = app_config.feats_app.features.values()
-        return context
-
     @property
     def feats_app(self):
         return app_config.feats_app
 
 
+def conflict(name: str) -> HttpResponse:
+    """
+    The response given when the state of a feature, or the overrides, keep
+    being changed by someone else while a view is changing them
+    """
+    return HttpResponse(
+        "{} was changed by someone else, reload it and try again".format(name),
+        status=409,
+        content_type='text/plain',
+    )
+
+
 class Form(forms.Form):
     @property
     def fieldsets(self):
@@ -55,6 +64,12 @@ class CharField(forms.CharField):
         self.fieldset = fieldset
 
 
+class BooleanField(forms.BooleanField):
+    def __init__(self, widget=CHECKBOX_WIDGET, fieldset=None, *args, **kwargs):
+        super().__init__(*args, widget=widget, **kwargs)
+        self.fieldset = fieldset
+
+
 class HiddenCharField(forms.CharField):
     def __init__(self, widget=forms.HiddenInput, fieldset=None, *args, **kwargs):
         super().__init__(*args, widget=widget, **kwargs)
@@ -1,3 +1,5 @@
+from feats.exposure import ExposureCounter
+from feats.instrumentation import ImplementationTimingListener
 from .base import TemplateView
 
 
@@ -14,8 +16,44 @@ class Detail(TemplateView):
         state = feature.state
         context['feature'] = feature
         context['state'] = state
+        self.feats_app.sync_overrides()
+        context['override'] = self.feats_app.overrides.get(feature)
         if state:
             context['segment_names'] = [
                 segment.name for segment in state.segments
             ]
+        context['exposure_counts'] = self.exposure_counts(feature, state)
+        context['implementation_timings'] = self.implementation_timings(feature)
         return context
+
+    def implementation_timings(self, feature):
+        """
+        Returns the latency percentiles of each of the feature's
+        implementations, if the app times them.
+        """
+        for listener in self.feats_app.listeners:
+            if isinstance(listener, ImplementationTimingListener):
+                return listener.summary(feature.name, feature.feature.implementations)
+        return {}
+
+    def exposure_counts(self, feature, state):
+        """
+        Returns today's exposure counts for each of the feature's selectors,
+        as a list of (selector name, {implementation: count}), if the app
+        counts exposures.
+        """
+        exposures = self.feats_app.exposures
+        if exposures is None:
+            return []
+        counters = [sink for sink in exposures.sinks if isinstance(sink, ExposureCounter)]
+        if not counters:
+            return []
+
+        selector_names = ['Default']
+        if state:
+            selector_names += [selector.name for selector in state.selectors]
+        implementations = list(feature.feature.implementations)
+        return [
+            (name, counters[0].counts(feature.name, name, implementations))
+            for name in selector_names
+        ]
@@ -1,5 +1,82 @@
+import json
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from django.core.paginator import Paginator
+from feats.storage import latest_states
 from .base import TemplateView
 
+FeatureSummary = namedtuple(
+    'FeatureSummary',
+    ['feature', 'modified', 'created_by', 'selector_types', 'segments']
+)
+
+
+def summarize(feature, stored):
+    """
+    Summarizes the feature's latest stored state without deserializing it,
+    so features whose segments or selectors are no longer registered can
+    still be listed.
+    """
+    if stored is None:
+        return FeatureSummary(feature, None, None, [], [])
+    data = stored.data
+    selector_types = [
+        json.loads(value)['type'].rsplit('.', 1)[-1]
+        for key, value in sorted(data.items())
+        if key.startswith('selector:')
+    ]
+    modified = None
+    if stored.modified is not None:
+        modified = datetime.fromtimestamp(stored.modified, timezone.utc)
+    return FeatureSummary(
+        feature=feature,
+        modified=modified,
+        created_by=data.get('created_by'),
+        selector_types=selector_types,
+        segments=json.loads(data.get('segmentation', '[]')),
+    )
+
+
+def matches(summary, query):
+    """
+    Whether the query is a case-insensitive substring of the feature's name
+    or description, or of one of its segments or selector types
+    """
+    feature = summary.feature
+    fields = [feature.name, feature.feature.description or '']
+    fields += summary.segments
+    fields += summary.selector_types
+    return any(query in field.lower() for field in fields)
+
 
 class Index(TemplateView):
     template_name = 'feats/index.html'
+    paginate_by = 50
+
+    def summaries(self, features):
+        """
+        Summarizes the features from a single bulk read of their states
+        """
+        states = latest_states(self.feats_app.storage, [feature.name for feature in features])
+        return [summarize(feature, states[feature.name]) for feature in features]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get('q', '').strip()
+        features = sorted(self.feats_app.features.values(), key=lambda feature: feature.name)
+        if query:
+            # Segments and selectors are only known from the states, so
+            # searching reads every feature's state
+            summaries = [
+                summary for summary in self.summaries(features)
+                if matches(summary, query.lower())
+            ]
+            page = Paginator(summaries, self.paginate_by).get_page(self.request.GET.get('page'))
+        else:
+            page = Paginator(features, self.paginate_by).get_page(self.request.GET.get('page'))
+            page.object_list = self.summaries(page.object_list)
+        context['query'] = query
+        context['page'] = page
+        context['registered'] = len(features)
+        return context
@@ -0,0 +1,58 @@
+from django import forms
+from django.http.response import HttpResponseRedirect
+from django.urls import reverse
+
+from feats.errors import ConcurrentModification
+from feats.django.views import base
+
+
+class OverrideForm(base.Form):
+    key = base.CharField(required=True, label="Feature or group")
+    implementation = base.CharField(required=True)
+
+    def __init__(self, feats_app, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.feats_app = feats_app
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not self.errors:
+            try:
+                self.feats_app._validate_override(cleaned_data['key'], cleaned_data['implementation'])
+            except ValueError as e:
+                raise forms.ValidationError(str(e))
+        return cleaned_data
+
+
+class Overrides(base.TemplateView):
+    """
+    Lists the overrides of the app, and sets or clears them.
+    Overrides take effect in other processes once they sync them.
+    """
+    template_name = 'feats/overrides.html'
+
+    def get_context_data(self, form=None, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # This process may not be syncing the overrides itself
+        self.feats_app.sync_overrides()
+        context['overrides'] = sorted(self.feats_app.overrides.as_dict().items())
+        context['form'] = form or OverrideForm(self.feats_app)
+        return context
+
+    def post(self, request, *args, **kwargs):
+        username = request.user.username
+        try:
+            if 'clear' in request.POST:
+                self.feats_app.clear_override(request.POST['clear'], created_by=username)
+            else:
+                form = OverrideForm(self.feats_app, data=request.POST)
+                if not form.is_valid():
+                    return self.render_to_response(self.get_context_data(form=form), status=400)
+                self.feats_app.set_override(
+                    form.cleaned_data['key'],
+                    form.cleaned_data['implementation'],
+                    created_by=username,
+                )
+        except ConcurrentModification:
+            return base.conflict("The overrides")
+        return HttpResponseRedirect(reverse('feats:overrides'))
@@ -0,0 +1,142 @@
+import hashlib
+import json
+
+from django.core import signing
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
+from django.views.generic import View
+
+from feats.errors import InvalidPreselectionToken
+from feats.override import OVERRIDES_KEY
+from feats.preselection import PreselectionToken
+from feats.storage import latest_states
+from .base import app_config
+
+signer = signing.Signer(salt='feats.preselection')
+
+
+class SubjectView(View):
+    """
+    Base for views which evaluate features for the subject of a request,
+    by default its user. Override subject to evaluate features for something
+    else, e.g a device or an account.
+    """
+    @property
+    def feats_app(self):
+        return app_config.feats_app
+
+    def subject(self, request) -> tuple:
+        """
+        Returns the argument(s) features are given for the request
+        """
+        return (request.user,)
+
+    def subject_key(self, request) -> str:
+        """
+        Identifies the subject of the request, so cached results for one
+        subject aren't served to another
+        """
+        return str(getattr(request.user, 'pk', None))
+
+
+class Preselect(SubjectView):
+    """
+    Returns the implementation of every feature which can be given the
+    request's subject, as {"implementations": {feature: implementation}},
+    without marking any of them as used. "tokens" maps each feature to a
+    signed preselection token, which clients can report as used instead of
+    the implementation, so the feature isn't evaluated again.
+
+    The states of the features and the app's overrides are read from storage
+    at once. The response has an ETag derived from their versions, so clients
+    which send it back in If-None-Match get a 304 until a feature is
+    reconfigured or the overrides change.
+    """
+    def etag(self, request, states) -> str:
+        digest = hashlib.sha1(self.subject_key(request).encode())
+        for name in sorted(states):
+            stored = states[name]
+            if stored is None:
+                version = '-'
+            elif stored.version is not None:
+                version = stored.version
+            else:
+                version = hashlib.sha1(json.dumps(stored.data, sort_keys=True).encode()).hexdigest()
+            digest.update('\0{}\0{}'.format(name, version).encode())
+        return quote_etag(digest.hexdigest())
+
+    def get(self, request, *args, **kwargs):
+        subject = self.subject(request)
+        features = self.feats_app.get_features_for(*subject)
+        states = latest_states(self.feats_app.storage, [feature.name for feature in features] + [OVERRIDES_KEY])
+        # The overrides were read anyway, so use them rather than whatever
+        # this process last synced
+        self.feats_app.overrides.load(states[OVERRIDES_KEY])
+        etag = self.etag(request, states)
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            implementations = {}
+            tokens = {}
+            for feature in features:
+                token = feature.preselect_token(states[feature.name], *subject)
+                implementations[feature.name] = token.implementation
+                tokens[feature.name] = signer.sign(token.encode())
+            response = JsonResponse({'implementations': implementations, 'tokens': tokens})
+        response['ETag'] = etag
+        # Results depend on the user, and must be revalidated before reuse
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Cookie'])
+        return response
+
+
+class UsedImplementations(SubjectView):
+    """
+    Marks implementations of features as used by the request's subject,
+    taking the same {"implementations": {feature: implementation}} as
+    Preselect returns, and/or a list of the tokens it returned as "tokens".
+
+    Reports are validated before any is applied, so a batch containing an
+    unknown feature or implementation is rejected as a whole.
+    """
+    def post(self, request, *args, **kwargs):
+        try:
+            body = json.loads(request.body)
+            implementations = body.get('implementations', {})
+            encoded_tokens = body.get('tokens', [])
+            if not isinstance(implementations, dict) or not isinstance(encoded_tokens, list):
+                raise TypeError
+        except (ValueError, AttributeError, TypeError):
+            return JsonResponse(
+                {'errors': ['Expected a JSON object with a mapping of implementations or a list of tokens']},
+                status=400,
+            )
+
+        subject = self.subject(request)
+        features = {feature.name: feature for feature in self.feats_app.get_features_for(*subject)}
+        errors = []
+        tokens = []
+        for encoded in encoded_tokens:
+            try:
+                token = PreselectionToken.decode(signer.unsign(encoded))
+            except (signing.BadSignature, InvalidPreselectionToken, TypeError):
+                errors.append("Invalid token '{}'".format(encoded))
+                continue
+            if token.feature not in features:
+                errors.append("Unknown feature '{}'".format(token.feature))
+            tokens.append(token)
+        for name, implementation in implementations.items():
+            feature = features.get(name)
+            if feature is None:
+                errors.append("Unknown feature '{}'".format(name))
+            elif implementation not in feature.feature.implementations:
+                errors.append("Unknown implementation '{}' of '{}'".format(implementation, name))
+        if errors:
+            return JsonResponse({'errors': errors}, status=400)
+
+        for token in tokens:
+            features[token.feature].used_implementation(token, *subject)
+        for name, implementation in implementations.items():
+            features[name].used_implementation(implementation, *subject)
+        return HttpResponse(status=204)
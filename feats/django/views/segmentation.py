@@ -2,6 +2,7 @@ from django.forms.formsets import BaseFormSet
 from django.forms import formset_factory
 from django.http.response import HttpResponseBadRequest, HttpResponseRedirect
 from django.urls import reverse
+from feats.errors import ConcurrentModification
 from feats.state import FeatureState
 
 from feats.django.views import base
@@ -167,28 +168,36 @@ class ChangeMapping(base.TemplateView):
 
     def post(self, request, *args, **kwargs):
         feature = self.feature
-        state = feature.state
         segments = self.get_segment_formset(feature).validate_and_get_segments(self.feats_app)
-        if state is None:
-            state = FeatureState.initial(self.request.user.username)
 
-        mapping_formset = self.get_mapping_formset(segments, state, request.POST)
-        if mapping_formset.is_valid():
+        def change_mapping(state):
+            if state is None:
+                state = FeatureState.initial(self.request.user.username)
+
+            mapping_formset = self.get_mapping_formset(segments, state, request.POST)
+            if not mapping_formset.is_valid():
+                return None
+
             selector_mapping = dict(
                 form.get_mapping_entry() for form in mapping_formset
             )
-            state = FeatureState(
+            return FeatureState(
                     segments=segments,
                     selectors=state.selectors,
                     selector_mapping=selector_mapping,
                     created_by=self.request.user.username
             )
-            self.feature.state = state
-            return HttpResponseRedirect(
-                reverse('feats:detail', args=self.args)
-            )
 
-        return HttpResponseBadRequest()
+        try:
+            state = feature.update_state(change_mapping)
+        except ConcurrentModification:
+            return base.conflict(feature.name)
+        if state is None:
+            return HttpResponseBadRequest()
+
+        return HttpResponseRedirect(
+            reverse('feats:detail', args=self.args)
+        )
 
 
 class ChangeSegmentation(base.TemplateView):
@@ -1,8 +1,11 @@
+from uuid import uuid4
+
 from django.http import Http404
 from django.http.response import HttpResponseBadRequest, HttpResponseRedirect
 from django.utils.functional import cached_property
 from django.urls import reverse
 from feats import selector
+from feats.errors import ConcurrentModification
 from feats.state import FeatureState
 from feats.django.views import base
 from feats.django.templatetags.feats import selector_type
@@ -105,18 +108,91 @@ class RolloutSelectorForm(WeightedSelectorForm):
 
 class ExperimentSelectorForm(WeightedSelectorForm):
     def __init__(self, feature_handle, selector=None, initial=None, *args, **kwargs):
+        if selector is not None:
+            initial = initial or {}
+            initial['persister'] = feature_handle.app._name(selector.persister)
+
         super().__init__(feature_handle, 'experiment', selector, initial, *args, **kwargs)
+        self.selector = selector
+        self.fields['persister'] = base.ChoiceField(
+            choices=[
+                (name, name) for name in feature_handle.app.persisters.keys()
+            ],
+            required=True,
+        )
 
     def create_selector(self):
         name = self.cleaned_data['name']
         weights = self.get_weights()
+        # Keep the key of an edited experiment so previously bucketed
+        # objects stay in their groups
+        if self.selector is not None:
+            key = self.selector.key
+        else:
+            key = uuid4().hex
 
         return selector.Experiment.from_data(
             self.feature_handle.app, {
                 'name': name,
-                # Needs App support for registering persisters
-                'persister': "# TODO:",
+                'persister': self.cleaned_data['persister'],
                 'weights': weights,
+                'key': key,
+            }
+        )
+
+
+class DeterministicExperimentSelectorForm(WeightedSelectorForm):
+    pin = base.BooleanField(
+        required=False,
+        help_text="Persist every exposure, so objects keep their group if the weights change",
+    )
+
+    def __init__(self, feature_handle, selector=None, initial=None, *args, **kwargs):
+        if selector is not None:
+            initial = initial or {}
+            initial['segment'] = selector.segment.name
+            initial['pin'] = selector.pin
+            if selector.persister is not None:
+                initial['persister'] = feature_handle.app._name(selector.persister)
+
+        super().__init__(
+            feature_handle, 'deterministic_experiment', selector, initial, *args, **kwargs
+        )
+        self.selector = selector
+        self.fields['segment'] = base.ChoiceField(
+            choices=[
+                (name, name) for name in feature_handle.valid_segments().keys()
+            ],
+            required=True,
+        )
+        self.fields['persister'] = base.ChoiceField(
+            choices=[('', 'None')] + [
+                (name, name) for name in feature_handle.app.persisters.keys()
+            ],
+            required=False,
+        )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('pin') and not cleaned_data.get('persister'):
+            self.add_error('persister', "A persister is required to pin groups")
+        return cleaned_data
+
+    def create_selector(self):
+        # Keep the salt of an edited experiment so objects keep their groups
+        if self.selector is not None:
+            salt = self.selector.salt
+        else:
+            salt = uuid4().hex
+
+        return selector.DeterministicExperiment.from_data(
+            self.feature_handle.app, {
+                'name': self.cleaned_data['name'],
+                'segment': self.cleaned_data['segment'],
+                'weights': self.get_weights(),
+                'salt': salt,
+                'persister': self.cleaned_data['persister'] or None,
+                'pin': self.cleaned_data['pin'],
             }
         )
 
@@ -125,6 +201,7 @@ class AddSelector(base.TemplateView):
     template_name = 'feats/add_selector.html'
     forms = {
         'experiment': ExperimentSelectorForm,
+        'deterministic_experiment': DeterministicExperimentSelectorForm,
         'static': StaticSelectorForm,
         'rollout': RolloutSelectorForm,
     }
@@ -176,15 +253,19 @@ class AddSelector(base.TemplateView):
         if bound_form.is_valid():
             feature = self.feature
             selector = form.create_selector()
-            state = feature.state
-            if state is None:
-                state = FeatureState.initial(self.request.user.username)
 
-            state = state.add_selector(
-                selector,
-                created_by=self.request.user.username
-            )
-            self.feature.state = state
+            def add_selector(state):
+                if state is None:
+                    state = FeatureState.initial(self.request.user.username)
+                return state.add_selector(
+                    selector,
+                    created_by=self.request.user.username
+                )
+
+            try:
+                feature.update_state(add_selector)
+            except ConcurrentModification:
+                return base.conflict(feature.name)
             return HttpResponseRedirect(
                 reverse('feats:detail', args=self.args)
             )
@@ -198,6 +279,7 @@ class ChangeSelector(base.TemplateView):
             'feats.selector.Static': StaticSelectorForm,
             'feats.selector.Rollout': RolloutSelectorForm,
             'feats.selector.Experiment': ExperimentSelectorForm,
+            'feats.selector.DeterministicExperiment': DeterministicExperimentSelectorForm,
     }
 
     @cached_property
@@ -223,6 +305,19 @@ class ChangeSelector(base.TemplateView):
     def form(self):
         return self.forms[selector_type(self.selector)]
 
+    def is_current(self, state) -> bool:
+        """
+        Returns whether the selector being changed is still the same in state
+        """
+        if self.selector_idx >= len(state.selectors):
+            return False
+        app = self.feats_app
+        current = state.selectors[self.selector_idx]
+        return (
+            (app._name(current), current.serialize_data(app))
+            == (app._name(self.selector), self.selector.serialize_data(app))
+        )
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['feature'] = self.feature
@@ -234,12 +329,23 @@ class ChangeSelector(base.TemplateView):
         form = self.form(self.feature, data=request.POST, selector=self.selector)
         if form.is_valid():
             if form.has_changed():
-                state = self.state.update_selector(
-                        self.selector_idx,
-                        form.create_selector(),
-                        created_by=self.request.user.username,
-                )
-                self.feature.state = state
+                new_selector = form.create_selector()
+
+                def update_selector(state):
+                    # The form was filled in for the selector as it was read,
+                    # so it can't be applied if that selector has changed since
+                    if state is None or not self.is_current(state):
+                        raise ConcurrentModification(self.feature.name)
+                    return state.update_selector(
+                            self.selector_idx,
+                            new_selector,
+                            created_by=self.request.user.username,
+                    )
+
+                try:
+                    self.feature.update_state(update_selector)
+                except ConcurrentModification:
+                    return base.conflict(self.feature.name)
             return HttpResponseRedirect(
                 reverse('feats:detail', args=self.args[:1])
             )
@@ -0,0 +1,37 @@
+import hmac
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.generic import View
+
+from feats.snapshot import build_snapshot
+from .base import app_config
+
+
+class Snapshot(View):
+    """
+    Serves the serialized states of every feature for a SnapshotClient.
+    With ?since=<version>, only the features modified since that version of
+    the snapshot are included.
+
+    Snapshots expose the configuration of every feature, so requests must
+    send the FEATS_SNAPSHOT_TOKEN setting as a bearer token. Every request
+    is refused if it isn't set.
+    """
+    def authorized(self, request) -> bool:
+        token = getattr(settings, 'FEATS_SNAPSHOT_TOKEN', None)
+        if not token:
+            return False
+        expected = 'Bearer {}'.format(token)
+        return hmac.compare_digest(request.META.get('HTTP_AUTHORIZATION', '').encode(), expected.encode())
+
+    def get(self, request, *args, **kwargs):
+        if not self.authorized(request):
+            return JsonResponse({'errors': ["Invalid snapshot token"]}, status=403)
+        since = request.GET.get('since')
+        if since is not None:
+            try:
+                since = float(since)
+            except ValueError:
+                return JsonResponse({'errors': ["Invalid version '{}'".format(since)]}, status=400)
+        return JsonResponse(build_snapshot(app_config.feats_app, since))
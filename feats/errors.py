@@ -38,3 +38,15 @@ class UnknownSegmentName(Exception):
 
 class UnknownSelectorName(Exception):
     pass
+
+
+class UnknownPersisterName(Exception):
+    pass
+
+
+class InvalidPreselectionToken(Exception):
+    pass
+
+
+class ConcurrentModification(Exception):
+    pass
@@ -0,0 +1,396 @@
+import abc
+import atexit
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque, namedtuple
+from typing import Callable, Dict, Hashable, Iterable, List, Optional
+
+from .worker import Worker
+
+logger = logging.getLogger(__name__)
+
+
+class ExposureEvent(namedtuple(
+        'ExposureEvent',
+        ['feature', 'selector', 'implementation', 'segment_values', 'timestamp', 'subject'])):
+    """
+    Records that an implementation of a feature was used.
+
+    segment_values are the values of the feature's segments for the object
+    exposed, or None if the feature had no state.
+    subject identifies the object exposed, or is None if the stream has no
+    way to identify it.
+    """
+    __slots__ = ()
+
+    def serialize(self) -> dict:
+        """
+        Converts the event to a flat dictionary of strings
+        """
+        return {
+            'feature': self.feature,
+            'selector': self.selector,
+            'implementation': self.implementation,
+            'segment_values': json.dumps(self.segment_values),
+            'timestamp': repr(self.timestamp),
+            'subject': '' if self.subject is None else str(self.subject),
+        }
+
+    @property
+    def day(self) -> str:
+        """
+        The UTC date the event occurred on, as YYYY-MM-DD
+        """
+        return time.strftime('%Y-%m-%d', time.gmtime(self.timestamp))
+
+
+class ExposureSink(metaclass=abc.ABCMeta):
+    """
+    Receives batches of exposure events from an ExposureStream
+    """
+    @abc.abstractmethod
+    def write(self, events: List[ExposureEvent]) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+ExposureCount = namedtuple('ExposureCount', ['subjects', 'exposures'])
+
+
+class ExposureCounter(ExposureSink):
+    """
+    Counts the exposures to each implementation of a feature per selector
+    and day, along with the number of distinct subjects exposed.
+    """
+    @abc.abstractmethod
+    def counts(
+            self,
+            feature: str,
+            selector: str,
+            implementations: Iterable[str],
+            day: str = None) -> Dict[str, ExposureCount]:
+        """
+        Returns the counts for each of the implementations on the UTC day,
+        formatted as YYYY-MM-DD. Defaults to today.
+        """
+
+    @staticmethod
+    def _aggregate(events: List[ExposureEvent]) -> Dict[tuple, list]:
+        """
+        Groups the events by feature, selector, day and implementation,
+        collecting the subjects and number of events for each group
+        """
+        groups = {}
+        for event in events:
+            group = (event.feature, event.selector, event.day, event.implementation)
+            entry = groups.get(group)
+            if entry is None:
+                entry = groups[group] = [set(), 0]
+            if event.subject is not None:
+                entry[0].add(event.subject)
+            entry[1] += 1
+        return groups
+
+    @staticmethod
+    def _today() -> str:
+        return time.strftime('%Y-%m-%d', time.gmtime())
+
+
+class MemoryExposureCounter(ExposureCounter):
+    """
+    Counts exposures exactly in memory.
+    Only useful for testing environments, as counts aren't shared between
+    processes and are never discarded.
+    """
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def write(self, events: List[ExposureEvent]) -> None:
+        with self._lock:
+            for group, (subjects, exposures) in self._aggregate(events).items():
+                entry = self._counts.setdefault(group, [set(), 0])
+                entry[0].update(subjects)
+                entry[1] += exposures
+
+    def counts(
+            self,
+            feature: str,
+            selector: str,
+            implementations: Iterable[str],
+            day: str = None) -> Dict[str, ExposureCount]:
+        day = day or self._today()
+        counts = {}
+        with self._lock:
+            for impl in implementations:
+                subjects, exposures = self._counts.get((feature, selector, day, impl), (set(), 0))
+                counts[impl] = ExposureCount(subjects=len(subjects), exposures=exposures)
+        return counts
+
+
+class CallbackSink(ExposureSink):
+    """
+    Calls the function with each batch of events
+    """
+    def __init__(self, fn: Callable[[List[ExposureEvent]], None]):
+        self.fn = fn
+
+    def write(self, events: List[ExposureEvent]) -> None:
+        self.fn(events)
+
+
+class FileSink(ExposureSink):
+    """
+    Appends events to a local file as JSON lines.
+
+    Once the file grows past max_bytes it is rotated to path.1, path.1 to
+    path.2 and so on, keeping at most backup_count old files.
+    """
+    def __init__(self, path: str, max_bytes: int = 100 * 1024 * 1024, backup_count: int = 5):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._file = None
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f'{self.path}.{i}'
+            if os.path.exists(source):
+                os.replace(source, f'{self.path}.{i + 1}')
+        if self.backup_count > 0:
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.remove(self.path)
+
+    def write(self, events: List[ExposureEvent]) -> None:
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.writelines(
+            json.dumps(event._asdict(), default=str) + '\n' for event in events
+        )
+        self._file.flush()
+        if self._file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+ExposureInfo = namedtuple('ExposureInfo', ['emitted', 'sampled_out', 'dropped', 'flushed', 'failed'])
+
+
+class ExposureStream:
+    """
+    Collects exposure events and writes them to sinks in batches from a
+    background thread, so recording an exposure never waits on a sink.
+
+    subject is given the argument(s) a feature was used with and returns an
+    identifier for the object exposed, e.g the user's id, or None.
+    sample_rate is the fraction of events which are recorded.
+    Events are buffered in a bounded deque, which can be appended to without
+    taking a lock. When it holds maxsize events, overflow decides which are
+    dropped:
+        'drop_newest': new events are discarded
+        'drop_oldest': the oldest buffered events are discarded
+
+    Buffered events are flushed every flush_interval seconds, or as soon as
+    batch_size events are waiting. Pending events are written by calling
+    flush or close, and when the interpreter exits unless exit_timeout is
+    None.
+    """
+    OVERFLOW_POLICIES = ('drop_newest', 'drop_oldest')
+
+    def __init__(
+            self,
+            sinks: Iterable[ExposureSink],
+            subject: Callable[..., Optional[Hashable]] = None,
+            sample_rate: float = 1.0,
+            maxsize: int = 10000,
+            batch_size: int = 500,
+            flush_interval: float = 1.0,
+            overflow: str = 'drop_newest',
+            exit_timeout: Optional[float] = 10.0):
+        if not 0 <= sample_rate <= 1:
+            raise ValueError("sample_rate must be between 0 and 1")
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(
+                f"overflow must be one of {self.OVERFLOW_POLICIES}, got {overflow}"
+            )
+        self.sinks = list(sinks)
+        self.subject = subject
+        self.sample_rate = sample_rate
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self._buffer = deque(maxlen=maxsize if overflow == 'drop_oldest' else None)
+        self._wakeup = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._lock = threading.Lock()
+        self._drained = threading.Condition(self._lock)
+        self._worker = Worker(self._run, 'feats-exposures', on_fork=self._buffer.clear)
+        self._closed = False
+        # Counters are only statistics, so lost updates between threads
+        # are tolerated rather than taking a lock on every event
+        self._emitted = 0
+        self._sampled_out = 0
+        self._dropped = 0
+        self._flushed = 0
+        self._failed = 0
+        if exit_timeout is not None:
+            atexit.register(self.close, exit_timeout)
+
+    def get_subject(self, *args) -> Optional[Hashable]:
+        """
+        Identifies the object exposed by a feature used with the argument(s)
+        """
+        if self.subject is None:
+            return None
+        return self.subject(*args)
+
+    def expose(
+            self,
+            feature: str,
+            selector: str,
+            implementation: str,
+            segment_values: Optional[tuple],
+            args: tuple) -> None:
+        """
+        Records an exposure of the feature used with the argument(s), if
+        sampled. The event and its subject are only built once sampled.
+        """
+        if not self._sample():
+            return
+        self._append(ExposureEvent(
+            feature=feature,
+            selector=selector,
+            implementation=implementation,
+            segment_values=segment_values,
+            timestamp=time.time(),
+            subject=self.get_subject(*args),
+        ))
+
+    def emit(self, event: ExposureEvent) -> None:
+        """
+        Records the event, if sampled.
+        """
+        if self._sample():
+            self._append(event)
+
+    def _sample(self) -> bool:
+        if self._closed:
+            return False
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            self._sampled_out += 1
+            return False
+        return True
+
+    def _append(self, event: ExposureEvent) -> None:
+        if not self._worker.started():
+            self._start_worker()
+
+        buffer = self._buffer
+        size = len(buffer)
+        if size >= self.maxsize:
+            self._dropped += 1
+            if self.overflow == 'drop_newest':
+                return
+        buffer.append(event)
+        self._emitted += 1
+        if size + 1 >= self.batch_size:
+            self._wakeup.set()
+
+    def _start_worker(self):
+        with self._lock:
+            if not self._closed:
+                self._worker.start()
+
+    def _drain(self) -> bool:
+        """
+        Writes up to batch_size buffered events to every sink.
+        Returns False if there was nothing to write.
+        """
+        batch = []
+        buffer = self._buffer
+        try:
+            while len(batch) < self.batch_size:
+                batch.append(buffer.popleft())
+        except IndexError:
+            pass
+        if not batch:
+            return False
+
+        for sink in self.sinks:
+            try:
+                sink.write(batch)
+            except Exception:
+                logger.exception("Failed to write %s exposures to %s", len(batch), sink)
+                self._failed += len(batch)
+        self._flushed += len(batch)
+        return True
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self._idle.clear()
+            while self._drain():
+                pass
+            self._idle.set()
+            with self._lock:
+                self._drained.notify_all()
+            if self._closed:
+                for sink in self.sinks:
+                    sink.close()
+                return
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Waits until every buffered event has been written.
+        Returns False if the timeout elapsed first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while self._buffer or not self._idle.is_set():
+                if not self._worker.is_alive():
+                    return False
+                self._wakeup.set()
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._drained.wait(remaining)
+        return True
+
+    def close(self, timeout: float = None) -> bool:
+        """
+        Writes buffered events, stops the worker and closes the sinks.
+        Events emitted after closing are discarded.
+        Returns False if the timeout elapsed before all events were written.
+        """
+        self._closed = True
+        self._wakeup.set()
+        if not self._worker.is_alive():
+            for sink in self.sinks:
+                sink.close()
+            return True
+        return self._worker.join(timeout)
+
+    def info(self) -> ExposureInfo:
+        return ExposureInfo(
+            emitted=self._emitted,
+            sampled_out=self._sampled_out,
+            dropped=self._dropped,
+            flushed=self._flushed,
+            failed=self._failed,
+        )
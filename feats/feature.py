@@ -13,7 +13,7 @@ def default(fn):
 
 def _check_same_inputs(definition: Definition) -> None:
     input_types = Counter([
-        tuple(impl.input_types) for impl in definition.implementations.values()
+        impl.input_types for impl in definition.implementations.values()
     ])
     errors = []
     if len(input_types) > 1:
@@ -36,6 +36,8 @@ def _check_default(definition: Definition) -> None:
 
 
 class Feature:
+    __slots__ = ('definition',)
+
     def __init__(self, definition):
         _check_same_inputs(definition)
         _check_default(definition)
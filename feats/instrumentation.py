@@ -0,0 +1,361 @@
+import abc
+import bisect
+import threading
+from collections import defaultdict, namedtuple
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_scope = threading.local()
+
+PHASES = ('storage', 'deserialize', 'segment', 'select', 'exposure', 'implementation')
+
+# Feature evaluations typically take microseconds, unless storage is remote
+DEFAULT_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+)
+
+
+class Evaluation:
+    """
+    Records how a single call to create, is_enabled, find_implementation or
+    used_implementation of a feature was evaluated.
+
+    timings maps each phase of the evaluation which ran to the seconds spent
+    in it. Phases are, in order: storage, deserialize, segment, select,
+    exposure and implementation.
+    cache_hits counts the segment values which were memoized or cached.
+    storage_error is True if fetching the feature's state raised.
+    fallback is True if the default implementation was used because the
+    feature had no state, or no selector was mapped to the segment values.
+    nested is True if the evaluation happened during another, e.g inside of
+    another feature's implementation.
+    """
+    __slots__ = (
+        'feature', 'method', 'selector', 'implementation', 'timings',
+        'cache_hits', 'storage_error', 'fallback', 'nested', 'duration', '_start', '_last',
+    )
+
+    def __init__(self, feature: str, method: str):
+        self.feature = feature
+        self.method = method
+        self.selector: Optional[str] = None
+        self.implementation: Optional[str] = None
+        self.timings: Dict[str, float] = {}
+        self.cache_hits = 0
+        self.storage_error = False
+        self.fallback = False
+        self.nested = False
+        self.duration = 0.0
+        self._start = self._last = perf_counter()
+
+    def mark(self, phase: str) -> None:
+        """
+        Attributes the time since the previous mark to the phase
+        """
+        now = perf_counter()
+        self.timings[phase] = self.timings.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def finish(self) -> None:
+        self.duration = perf_counter() - self._start
+
+
+def begin(feature: str, method: str) -> Evaluation:
+    """
+    Starts recording an evaluation on this thread.
+    Evaluations may nest, e.g if an implementation uses another feature.
+    """
+    evaluation = Evaluation(feature, method)
+    stack = getattr(_scope, 'stack', None)
+    if stack is None:
+        stack = _scope.stack = []
+    evaluation.nested = bool(stack)
+    stack.append(evaluation)
+    return evaluation
+
+
+def end(evaluation: Evaluation) -> None:
+    """
+    Stops recording the evaluation on this thread
+    """
+    evaluation.finish()
+    _scope.stack.pop()
+
+
+def record_cache_hit() -> None:
+    """
+    Counts a cache hit against the evaluation in progress on this thread, if
+    any
+    """
+    stack = getattr(_scope, 'stack', None)
+    if stack:
+        stack[-1].cache_hits += 1
+
+
+class EvaluationListener(metaclass=abc.ABCMeta):
+    """
+    Receives a record of each feature evaluation.
+    Listeners are called synchronously, on the thread which evaluated the
+    feature, so they should be fast.
+    """
+    @abc.abstractmethod
+    def on_evaluation(self, evaluation: Evaluation) -> None:
+        pass
+
+
+class CollectingListener(EvaluationListener):
+    """
+    Collects the evaluations made on a thread while inside of `collect`,
+    e.g for the duration of a request.
+    """
+    def __init__(self):
+        self._local = threading.local()
+
+    @contextmanager
+    def collect(self):
+        """
+        Yields a list which the evaluations made on this thread are appended
+        to until the context exits. Contexts may nest, in which case the
+        evaluations are collected by each of them.
+        """
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        evaluations = []
+        stack.append(evaluations)
+        try:
+            yield evaluations
+        finally:
+            stack.pop()
+
+    def on_evaluation(self, evaluation: Evaluation) -> None:
+        stack = getattr(self._local, 'stack', None)
+        if stack:
+            for evaluations in stack:
+                evaluations.append(evaluation)
+
+
+EvaluationSummary = namedtuple(
+    'EvaluationSummary',
+    ['count', 'duration', 'storage_round_trips', 'cache_hits', 'storage_errors', 'fallbacks', 'phases']
+)
+
+
+def summarize(evaluations: List[Evaluation]) -> EvaluationSummary:
+    """
+    Totals the cost of the evaluations.
+    The duration only includes evaluations which weren't nested, as nested
+    evaluations are part of their parent's. Phases include every evaluation.
+    """
+    phases = dict.fromkeys(PHASES, 0.0)
+    for evaluation in evaluations:
+        for phase, seconds in evaluation.timings.items():
+            phases[phase] += seconds
+    return EvaluationSummary(
+        count=len(evaluations),
+        duration=sum(evaluation.duration for evaluation in evaluations if not evaluation.nested),
+        storage_round_trips=sum('storage' in evaluation.timings for evaluation in evaluations),
+        cache_hits=sum(evaluation.cache_hits for evaluation in evaluations),
+        storage_errors=sum(evaluation.storage_error for evaluation in evaluations),
+        fallbacks=sum(evaluation.fallback for evaluation in evaluations),
+        phases=phases,
+    )
+
+
+class Histogram:
+    """
+    Counts observations into buckets by their upper bounds.
+    Observations larger than every bound are only counted in the total.
+    """
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, other: 'Histogram') -> None:
+        """
+        Adds the observations of another histogram with the same buckets
+        """
+        if other.buckets != self.buckets:
+            raise ValueError("Cannot merge histograms with different buckets")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimates the value below which the fraction q of observations fall,
+        by interpolating within the bucket it falls in.
+        Returns None if there are no observations, and the largest bound for
+        quantiles which fall above it.
+        """
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        total = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, self.counts):
+            if count and total + count >= rank:
+                return lower + (bound - lower) * (rank - total) / count
+            total += count
+            lower = bound
+        return self.buckets[-1]
+
+    def cumulative_counts(self):
+        """
+        Returns (upper bound, number of observations <= bound) for each bucket
+        """
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+
+class HistogramListener(EvaluationListener):
+    """
+    Aggregates evaluations in memory: a histogram of the time spent in each
+    phase per feature, and counters of evaluations, cache hits, storage
+    errors and fallbacks to the default implementation per feature.
+
+    The aggregates can be exposed to Prometheus with `render_prometheus`.
+    """
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.histograms: Dict[Tuple[str, str], Histogram] = {}
+        self.counters: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: dict.fromkeys(['evaluations', 'cache_hits', 'storage_errors', 'fallbacks'], 0)
+        )
+        self._lock = threading.Lock()
+
+    def on_evaluation(self, evaluation: Evaluation) -> None:
+        feature = evaluation.feature
+        with self._lock:
+            for phase, seconds in evaluation.timings.items():
+                histogram = self.histograms.get((feature, phase))
+                if histogram is None:
+                    histogram = self.histograms[(feature, phase)] = Histogram(self.buckets)
+                histogram.observe(seconds)
+            counters = self.counters[feature]
+            counters['evaluations'] += 1
+            counters['cache_hits'] += evaluation.cache_hits
+            counters['storage_errors'] += evaluation.storage_error
+            counters['fallbacks'] += evaluation.fallback
+
+    def clear(self) -> None:
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+
+TimingSummary = namedtuple('TimingSummary', ['count', 'p50', 'p95', 'p99'])
+
+
+class ImplementationTimingListener(EvaluationListener):
+    """
+    Aggregates the time spent calling each implementation of a feature from
+    create or is_enabled into a histogram per feature and implementation,
+    so implementations can be compared by latency.
+    """
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._histograms: Dict[Tuple[str, str], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def on_evaluation(self, evaluation: Evaluation) -> None:
+        seconds = evaluation.timings.get('implementation')
+        if seconds is None:
+            return
+        key = (evaluation.feature, evaluation.implementation)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def histogram(self, feature: str, implementation: str) -> Histogram:
+        """
+        Returns a copy of the timings of the feature's implementation
+        """
+        histogram = Histogram(self.buckets)
+        with self._lock:
+            recorded = self._histograms.get((feature, implementation))
+            if recorded is not None:
+                histogram.merge(recorded)
+        return histogram
+
+    def summary(self, feature: str, implementations: Iterable[str]) -> Dict[str, TimingSummary]:
+        """
+        Returns the number of timed calls and the estimated 50th, 95th and
+        99th percentile latencies in seconds of each implementation
+        """
+        summaries = {}
+        for implementation in implementations:
+            histogram = self.histogram(feature, implementation)
+            summaries[implementation] = TimingSummary(
+                count=histogram.count,
+                p50=histogram.quantile(0.5),
+                p95=histogram.quantile(0.95),
+                p99=histogram.quantile(0.99),
+            )
+        return summaries
+
+    def clear(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_bound(bound: float) -> str:
+    return repr(float(bound))
+
+
+def render_prometheus(listener: HistogramListener, namespace: str = 'feats') -> str:
+    """
+    Renders the listener's aggregates in the Prometheus text exposition format
+    """
+    with listener._lock:
+        histograms = sorted(
+            listener.histograms.items(),
+            key=lambda item: (item[0][0], PHASES.index(item[0][1])),
+        )
+        counters = sorted(
+            (feature, dict(values)) for feature, values in listener.counters.items()
+        )
+        lines = []
+        name = f'{namespace}_phase_seconds'
+        lines.append(f'# HELP {name} Time spent in each phase of evaluating a feature.')
+        lines.append(f'# TYPE {name} histogram')
+        for (feature, phase), histogram in histograms:
+            labels = f'feature="{_escape(feature)}",phase="{phase}"'
+            for bound, count in histogram.cumulative_counts():
+                lines.append(f'{name}_bucket{{{labels},le="{_format_bound(bound)}"}} {count}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f'{name}_sum{{{labels}}} {histogram.sum!r}')
+            lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+    descriptions = [
+        ('evaluations', 'Features evaluated.'),
+        ('cache_hits', 'Segment values served from a memo or cache.'),
+        ('storage_errors', 'Errors fetching feature states from storage.'),
+        ('fallbacks', 'Evaluations which fell back to the default implementation.'),
+    ]
+    for counter, description in descriptions:
+        name = f'{namespace}_{counter}_total'
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} counter')
+        for feature, values in counters:
+            lines.append(f'{name}{{feature="{_escape(feature)}"}} {values[counter]}')
+    return '\n'.join(lines) + '\n'
@@ -1,20 +1,33 @@
 import inspect
+import sys
 from functools import wraps
 from collections import defaultdict
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
+
+# Implementations usually share a handful of signatures, so their input types
+# are kept as one tuple per signature
+_input_types: Dict[Tuple[type, ...], Tuple[type, ...]] = {}
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return None
+    return sys.intern(value)
 
 
 class Implementation:
+    __slots__ = ('fn', 'name', 'description', 'output_type', 'input_types')
+
     def __init__(self, fn):
         self.fn = fn
-        self.name = fn.__name__
-        self.description = inspect.getdoc(fn)
+        self.name = _intern(fn.__name__)
+        self.description = _intern(inspect.getdoc(fn))
 
         signature = inspect.signature(fn)
         self.output_type = signature.return_annotation
         has_output = self.output_type != inspect.Signature.empty
 
-        self.input_types = []
+        input_types = []
         errors = []
         for name, param in signature.parameters.items():
             if param.annotation == inspect.Parameter.empty:
@@ -22,7 +35,9 @@ class Implementation:
                     "{} does not declare an input type for {}".format(fn, name)
                 )
             else:
-                self.input_types.append(param.annotation)
+                input_types.append(param.annotation)
+        input_types = tuple(input_types)
+        self.input_types = _input_types.setdefault(input_types, input_types)
 
         if not has_output:
             errors.append("{} does not declare an output type".format(fn))
@@ -30,9 +45,21 @@ class Implementation:
             raise ValueError(errors)
 
 
+class Annotations(dict):
+    """
+    Maps each annotation to the tuple of implementations annotated with it.
+    Annotations which no implementation has map to an empty tuple.
+    """
+    __slots__ = ()
+
+    def __missing__(self, key):
+        return ()
+
+
 class Definition:
     """
     """
+    __slots__ = ('description', 'implementations', 'annotations')
 
     def __init__(
             self,
@@ -46,11 +73,13 @@ class Definition:
                 "Definition did not contain at least one implementation"
             )
 
-        self.description = description
+        self.description = _intern(description)
         self.implementations = {
             impl.name: impl for impl in implementations
         }
-        self.annotations = annotations
+        self.annotations = Annotations(
+            (_intern(key), tuple(impls)) for key, impls in annotations.items()
+        )
 
     @classmethod
     def from_function(cls, fn):
@@ -0,0 +1,116 @@
+import json
+import logging
+from typing import Dict, Mapping, Optional
+
+from .selector import Override
+from .storage import StoredState
+from .worker import Poller
+
+logger = logging.getLogger(__name__)
+
+OVERRIDES_KEY = '__overrides__'
+"""
+The name the overrides of an app are stored under, alongside the histories
+of its features
+"""
+
+
+def serialize(overrides: Mapping[str, str], created_by: str) -> dict:
+    return {
+        'overrides': json.dumps(dict(overrides), sort_keys=True),
+        'created_by': created_by,
+    }
+
+
+class Overrides:
+    """
+    The implementations features are forced to use, keyed by the name of a
+    feature, or by a dotted prefix of the names of a group of features, e.g
+    'myapp.integrations' for every feature defined in that module.
+
+    Overrides are held in memory, and resolved once per feature, so checking
+    whether a feature is overridden costs a dictionary lookup.
+    """
+    __slots__ = ('_state', 'version')
+
+    def __init__(self, overrides: Mapping[str, str] = None):
+        # The overrides and the resolution of each feature checked against
+        # them, replaced together so readers never see one without the other
+        self._state = (dict(overrides or {}), {})
+        self.version: Optional[str] = None
+
+    def get(self, handle) -> Optional[Override]:
+        """
+        Returns the override for the feature, if any
+        """
+        overrides, resolved = self._state
+        if not overrides:
+            return None
+        try:
+            return resolved[handle.name]
+        except KeyError:
+            pass
+        override = resolved[handle.name] = self._resolve(overrides, handle)
+        return override
+
+    @staticmethod
+    def _resolve(overrides: Dict[str, str], handle) -> Optional[Override]:
+        """
+        Finds the most specific override whose implementation the feature has
+        """
+        key = handle.name
+        while True:
+            implementation = overrides.get(key)
+            if implementation is not None and implementation in handle.feature.implementations:
+                return Override(implementation)
+            if '.' not in key:
+                return None
+            key = key.rsplit('.', 1)[0]
+
+    def as_dict(self) -> Dict[str, str]:
+        return dict(self._state[0])
+
+    def replace(self, overrides: Mapping[str, str], version: str = None) -> None:
+        self._state = (dict(overrides), {})
+        self.version = version
+
+    def load(self, stored: Optional[StoredState]) -> bool:
+        """
+        Replaces the overrides with those stored, returning whether they
+        changed
+        """
+        if stored is None:
+            changed = bool(self._state[0])
+            if changed:
+                self.replace({})
+            return changed
+        if stored.version is not None and stored.version == self.version:
+            return False
+        overrides = json.loads(stored.data['overrides'])
+        changed = overrides != self._state[0]
+        if changed:
+            self.replace(overrides, stored.version)
+        else:
+            self.version = stored.version
+        return changed
+
+    def __len__(self) -> int:
+        return len(self._state[0])
+
+
+class OverrideWatcher(Poller):
+    """
+    Keeps the overrides of an app up to date with those stored by any app
+    sharing its storage, e.g the one serving the admin, by reading them every
+    interval seconds from a background thread once started. Each read is a
+    single storage round trip, and evaluating features never waits on one.
+    """
+    thread_name = 'feats-overrides'
+
+    def __init__(self, app, interval: float = 1.0):
+        super().__init__(interval)
+        self.app = app
+
+    def poll(self) -> None:
+        if self.app.sync_overrides():
+            logger.info("Overrides changed to %s", self.app.overrides.as_dict())
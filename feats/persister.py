@@ -0,0 +1,429 @@
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from typing import Callable, Hashable, Optional
+
+from .cache import BloomFilter, TTLCache
+from .selector import ExperimentPersister
+from .worker import Worker
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryExperimentPersister(ExperimentPersister):
+    """
+    Keeps the test groups of each experiment in memory. When the application
+    exits, all data will be lost.
+    Mainly useful for testing environments.
+
+    key converts an object to the identifier its group is stored under, and
+    may return None for objects which can't be bucketed. By default the
+    object itself is used.
+    """
+    def __init__(self, key: Callable[[object], Optional[Hashable]] = None):
+        self.key = key or (lambda obj: obj)
+        self._groups = {}
+        self._lock = threading.Lock()
+
+    def get_existing_test_group(self, experiment: str, obj: object) -> Optional[str]:
+        subject = self.key(obj)
+        if subject is None:
+            return None
+        return self._groups.get((experiment, subject))
+
+    def persist_test_group(self, experiment: str, obj: object, group: str) -> Optional[str]:
+        subject = self.key(obj)
+        if subject is None:
+            return None
+        with self._lock:
+            return self._groups.setdefault((experiment, subject), group)
+
+    def get_or_persist_test_group(self, experiment: str, obj: object, group: str) -> Optional[str]:
+        return self.persist_test_group(experiment, obj, group)
+
+
+WriteBehindInfo = namedtuple(
+    'WriteBehindInfo',
+    ['queued', 'coalesced', 'overflowed', 'flushed', 'failed', 'pending']
+)
+
+
+class WriteBehindPersister(ExperimentPersister):
+    """
+    Wraps a persister so test groups are persisted by a background worker
+    instead of while the caller waits.
+
+    Persisted groups are kept in a local overlay until the worker has written
+    them, so get_existing_test_group is consistent within the process.
+    Repeated writes for the same object and experiment are coalesced, and
+    the worker flushes up to batch_size entries at a time using the wrapped
+    persister's persist_test_groups.
+
+    At most maxsize entries are held in memory. When full, overflow decides
+    what happens to new writes:
+        'block': wait for the worker to make room
+        'drop': discard the write
+        'sync': persist the write immediately, as if unwrapped
+
+    Only writes are deferred. Objects without a pending write are read from
+    the wrapped persister, and the groups found are cached for up to
+    cache_ttl seconds, so objects bucketed by other processes keep their
+    group.
+
+    key converts an object to a hashable identifier, and may return None for
+    objects which can't be bucketed. Pending writes are flushed by calling
+    flush or close, and when the interpreter exits unless exit_timeout is
+    None.
+    """
+    OVERFLOW_POLICIES = ('block', 'drop', 'sync')
+
+    def __init__(
+            self,
+            persister: ExperimentPersister,
+            key: Callable[[object], Optional[Hashable]],
+            maxsize: int = 10000,
+            batch_size: int = 100,
+            flush_interval: float = 1.0,
+            overflow: str = 'block',
+            exit_timeout: Optional[float] = 10.0,
+            cache_size: int = 100000,
+            cache_ttl: float = 60 * 60):
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(
+                f"overflow must be one of {self.OVERFLOW_POLICIES}, got {overflow}"
+            )
+        self.persister = persister
+        self.key = key
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._pending = OrderedDict()
+        self._inflight = {}
+        self._cached = TTLCache(cache_size, cache_ttl)
+        self._worker = Worker(self._run, 'feats-write-behind', on_fork=self._discard)
+        self._closed = False
+        self._flushing = 0
+        self._queued = 0
+        self._coalesced = 0
+        self._overflowed = 0
+        self._flushed = 0
+        self._failed = 0
+        if exit_timeout is not None:
+            atexit.register(self.close, exit_timeout)
+
+    def _overlay(self, key):
+        entry = self._pending.get(key)
+        if entry is None:
+            entry = self._inflight.get(key)
+        if entry is None:
+            return None
+        return entry[2]
+
+    def get_existing_test_group(self, experiment: str, obj: object) -> Optional[str]:
+        subject = self.key(obj)
+        if subject is None:
+            return None
+        key = (experiment, subject)
+        with self._lock:
+            group = self._overlay(key)
+        if group is None:
+            group = self._cached.get(key)
+        if group is None:
+            group = self.persister.get_existing_test_group(experiment, obj)
+            if group is not None:
+                self._cached.set(key, group)
+        return group
+
+    def persist_test_group(self, experiment: str, obj: object, group: str) -> Optional[str]:
+        subject = self.key(obj)
+        if subject is None:
+            return None
+
+        key = (experiment, subject)
+        with self._lock:
+            self._ensure_worker()
+            existing = self._overlay(key)
+            if existing is not None:
+                self._coalesced += 1
+                return existing
+
+            if len(self._pending) >= self.maxsize:
+                self._overflowed += 1
+                if self.overflow == 'drop':
+                    return group
+                elif self.overflow == 'sync':
+                    sync = True
+                else:
+                    while len(self._pending) >= self.maxsize and not self._closed:
+                        self._changed.wait()
+                    sync = self._closed
+            else:
+                sync = self._closed
+
+            if not sync:
+                self._pending[key] = (experiment, obj, group)
+                self._queued += 1
+                if len(self._pending) >= self.batch_size:
+                    self._changed.notify_all()
+                return group
+
+        return self.persister.persist_test_group(experiment, obj, group)
+
+    def _ensure_worker(self):
+        """
+        Starts the worker if it isn't running in this process.
+        Must be called while holding the lock.
+        """
+        if not self._closed:
+            self._worker.start()
+
+    def _discard(self):
+        self._pending.clear()
+        self._inflight.clear()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                waiting = not self._closed and not self._flushing
+                if waiting and len(self._pending) < self.batch_size:
+                    self._changed.wait(self.flush_interval)
+                if not self._pending:
+                    if self._closed:
+                        return
+                    continue
+                batch = []
+                while self._pending and len(batch) < self.batch_size:
+                    key, entry = self._pending.popitem(last=False)
+                    self._inflight[key] = entry
+                    batch.append((key, entry))
+                self._changed.notify_all()
+
+            try:
+                self.persister.persist_test_groups(entry for _, entry in batch)
+                failed = 0
+            except Exception:
+                logger.exception("Failed to persist %s test groups", len(batch))
+                failed = len(batch)
+
+            with self._lock:
+                for key, _ in batch:
+                    self._inflight.pop(key, None)
+                self._flushed += len(batch) - failed
+                self._failed += failed
+                self._changed.notify_all()
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Waits until every pending write has been persisted.
+        Returns False if the timeout elapsed first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            self._flushing += 1
+            self._changed.notify_all()
+            try:
+                while self._pending or self._inflight:
+                    if not self._worker.is_alive():
+                        return False
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._changed.wait(remaining)
+            finally:
+                self._flushing -= 1
+        return True
+
+    def close(self, timeout: float = None) -> bool:
+        """
+        Flushes pending writes and stops the worker. Writes after closing are
+        persisted immediately.
+        Returns False if the timeout elapsed before all writes were flushed.
+        """
+        with self._lock:
+            self._closed = True
+            self._changed.notify_all()
+        return self._worker.join(timeout)
+
+    def info(self) -> WriteBehindInfo:
+        with self._lock:
+            return WriteBehindInfo(
+                queued=self._queued,
+                coalesced=self._coalesced,
+                overflowed=self._overflowed,
+                flushed=self._flushed,
+                failed=self._failed,
+                pending=len(self._pending) + len(self._inflight),
+            )
+
+
+DedupingInfo = namedtuple('DedupingInfo', ['hits', 'misses', 'hit_rate'])
+
+
+class DedupingPersister(ExperimentPersister):
+    """
+    Wraps a persister to skip it for objects already known to be bucketed.
+
+    Each experiment remembers the objects it has seen bucketed in a bounded
+    filter, so repeat exposures of an object skip some or all calls to the
+    wrapped persister.
+
+    filter chooses how objects are remembered:
+        'lru': the maxsize most recently seen objects and their groups are
+            kept for up to ttl seconds. Repeat reads and writes are skipped,
+            so repeat exposures don't call the wrapped persister at all.
+        'bloom': a Bloom filter of up to maxsize objects, using far less
+            memory. Only repeat writes are skipped, as groups aren't kept.
+            get_or_persist_test_group, which experiments call on every
+            exposure, still reads the group of a repeat object from the
+            wrapped persister, so it saves a write but not a round trip.
+
+    A Bloom filter will occasionally report an object as bucketed when it
+    isn't. false_positives decides how persist_test_group handles this:
+        'skip': the write is skipped, and the object is not persisted
+        'verify': the wrapped persister is read, and written to if the
+            object hasn't been bucketed
+    get_or_persist_test_group must return the object's existing group, so it
+    always verifies.
+
+    key converts an object to a hashable identifier, and may return None for
+    objects which can't be bucketed.
+    """
+    FILTERS = ('lru', 'bloom')
+    FALSE_POSITIVE_POLICIES = ('skip', 'verify')
+
+    def __init__(
+            self,
+            persister: ExperimentPersister,
+            key: Callable[[object], Optional[Hashable]],
+            filter: str = 'lru',
+            maxsize: int = 100000,
+            ttl: float = 60 * 60,
+            error_rate: float = 0.001,
+            false_positives: str = 'verify'):
+        if filter not in self.FILTERS:
+            raise ValueError(f"filter must be one of {self.FILTERS}, got {filter}")
+        if false_positives not in self.FALSE_POSITIVE_POLICIES:
+            raise ValueError(
+                f"false_positives must be one of {self.FALSE_POSITIVE_POLICIES}, "
+                f"got {false_positives}"
+            )
+        self.persister = persister
+        self.key = key
+        self.filter = filter
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.error_rate = error_rate
+        self.false_positives = false_positives
+        self._filters = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def _filter(self, experiment: str):
+        seen = self._filters.get(experiment)
+        if seen is None:
+            with self._lock:
+                seen = self._filters.get(experiment)
+                if seen is None:
+                    if self.filter == 'lru':
+                        seen = TTLCache(self.maxsize, self.ttl)
+                    else:
+                        seen = BloomFilter(self.maxsize, self.error_rate)
+                    self._filters[experiment] = seen
+        return seen
+
+    def _remember(self, experiment: str, subject: Hashable, group: Optional[str]) -> None:
+        if group is None:
+            return
+        seen = self._filter(experiment)
+        if self.filter == 'lru':
+            seen.set(subject, group)
+        else:
+            seen.add(subject)
+
+    def _record(self, hit: bool) -> None:
+        # Unlocked, like the counters of an ExposureStream
+        if hit:
+            self._hits += 1
+        else:
+            self._misses += 1
+
+    def get_existing_test_group(self, experiment: str, obj: object) -> Optional[str]:
+        subject = self.key(obj)
+        if subject is None:
+            return None
+
+        if self.filter == 'lru':
+            group = self._filter(experiment).get(subject)
+            if group is not None:
+                self._record(True)
+                return group
+
+        self._record(False)
+        group = self.persister.get_existing_test_group(experiment, obj)
+        self._remember(experiment, subject, group)
+        return group
+
+    def persist_test_group(self, experiment: str, obj: object, group: str) -> Optional[str]:
+        subject = self.key(obj)
+        if subject is None:
+            return None
+
+        seen = self._filter(experiment)
+        if self.filter == 'lru':
+            existing = seen.get(subject)
+            if existing is not None:
+                self._record(True)
+                return existing
+        elif subject in seen:
+            if self.false_positives == 'skip':
+                self._record(True)
+                return group
+            existing = self.persister.get_existing_test_group(experiment, obj)
+            if existing is not None:
+                self._record(True)
+                return existing
+
+        self._record(False)
+        persisted = self.persister.persist_test_group(experiment, obj, group)
+        self._remember(experiment, subject, persisted)
+        return persisted
+
+    def get_or_persist_test_group(self, experiment: str, obj: object, group: str) -> Optional[str]:
+        subject = self.key(obj)
+        if subject is None:
+            return None
+
+        if self.filter == 'lru':
+            existing = self._filter(experiment).get(subject)
+            if existing is not None:
+                self._record(True)
+                return existing
+        elif subject in self._filter(experiment):
+            # Groups aren't kept by the Bloom filter, so they're read instead
+            # of being written again, whatever the false_positives policy
+            existing = self.persister.get_existing_test_group(experiment, obj)
+            if existing is not None:
+                self._record(True)
+                return existing
+
+        self._record(False)
+        persisted = self.persister.get_or_persist_test_group(experiment, obj, group)
+        self._remember(experiment, subject, persisted)
+        return persisted
+
+    def info(self) -> DedupingInfo:
+        hits = self._hits
+        misses = self._misses
+        total = hits + misses
+        return DedupingInfo(
+            hits=hits,
+            misses=misses,
+            hit_rate=hits / total if total else 0.0,
+        )
@@ -0,0 +1,40 @@
+import base64
+import json
+from collections import namedtuple
+
+from .errors import InvalidPreselectionToken
+
+
+class PreselectionToken(namedtuple(
+        'PreselectionToken',
+        ['feature', 'version', 'selector', 'implementation', 'segment_values'])):
+    """
+    Records how find_implementation preselected an implementation of a
+    feature, so used_implementation can notify the same selector without
+    evaluating the feature again.
+
+    version identifies the state the implementation was selected with, or
+    is None if the feature had no state. selector is the index of the
+    selector in that state, or None if the default implementation was used.
+    """
+    __slots__ = ()
+
+    def encode(self) -> str:
+        """
+        Encodes the token as an opaque URL safe string
+        """
+        data = json.dumps(list(self), separators=(',', ':'))
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+    @classmethod
+    def decode(cls, encoded: str) -> 'PreselectionToken':
+        try:
+            padding = '=' * (-len(encoded) % 4)
+            data = json.loads(base64.urlsafe_b64decode(encoded + padding))
+            token = cls(*data)
+        except (ValueError, TypeError) as e:
+            raise InvalidPreselectionToken(encoded) from e
+        segment_values = token.segment_values
+        if segment_values is not None:
+            token = token._replace(segment_values=tuple(segment_values))
+        return token
@@ -1,6 +1,11 @@
-from typing import List
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 from redis import Redis
-from .errors import StorageUnavailableException
+from .errors import ConcurrentModification, StorageUnavailableException
+from .exposure import ExposureCount, ExposureCounter, ExposureEvent, ExposureSink
+from .instrumentation import DEFAULT_BUCKETS, Histogram, ImplementationTimingListener
+from .selector import ExperimentPersister
+from .storage import StoredState
+from .worker import Poller
 
 
 class StreamIterator:
@@ -28,15 +33,66 @@ class StreamIterator:
         return result[1]
 
 
+_APPEND_IF_SCRIPT = """
+local last = redis.call('XREVRANGE', KEYS[1], '+', '-', 'COUNT', 1)
+local version = ''
+if #last > 0 then
+    version = last[1][1]
+end
+if version ~= ARGV[1] then
+    return false
+end
+return redis.call('XADD', KEYS[1], '*', unpack(ARGV, 2))
+"""
+"""
+Appends the field/value pairs in ARGV[2:] to the stream at KEYS[1], provided
+the id of its last entry is ARGV[1], or the stream is empty if that is ''.
+Returns the id of the new entry, or nil if the stream has moved on.
+"""
+
+_APPEND_MANY_IF_SCRIPT = """
+for i = 1, #KEYS do
+    if ARGV[i] ~= '*' then
+        local last = redis.call('XREVRANGE', KEYS[i], '+', '-', 'COUNT', 1)
+        local version = ''
+        if #last > 0 then
+            version = last[1][1]
+        end
+        if version ~= ARGV[i] then
+            return i
+        end
+    end
+end
+local ids = {}
+local offset = #KEYS + 1
+for i = 1, #KEYS do
+    local count = tonumber(ARGV[offset])
+    ids[i] = redis.call('XADD', KEYS[i], '*', unpack(ARGV, offset + 1, offset + count))
+    offset = offset + count + 1
+end
+return ids
+"""
+"""
+Checks the id of the last entry of each stream in KEYS against ARGV[i], ''
+meaning the stream must be empty and '*' that it isn't checked. If they all
+match, appends to each stream the field/value pairs which follow, each set
+preceded by its length, and returns the ids of the new entries. Otherwise
+returns the position in KEYS of the first stream which has moved on, and
+appends nothing.
+"""
+
+
 class FeatureStream:
     """
     This class provides utility methods for retrieving data from Redis.
     It should not be initialized directly but instead returned from keying off
     a RedisStorage instance.
     """
-    def __init__(self, redis, key, prefix=None):
+    def __init__(self, redis, key, prefix=None, append_if_script=None):
         self.key = self._get_key(key, prefix)
         self._redis = redis
+        # Shared by every stream of a RedisStorage, or registered on first use
+        self._append_if_script = append_if_script
 
     def _get_key(self, key, prefix) -> str:
         """
@@ -54,6 +110,26 @@ class FeatureStream:
         """
         return self._redis.xadd(self.key, state)
 
+    def append_if(self, state, expected_id: Optional[str]) -> str:
+        """
+        Adds FeatureState data to the head of the Redis Stream, provided the
+        id of its last entry is still expected_id, or it is empty if that is
+        None. The check and the append are made atomically by a Lua script.
+        Raises ConcurrentModification if another entry was appended since.
+        """
+        script = self._append_if_script
+        if script is None:
+            script = self._append_if_script = self._redis.register_script(_APPEND_IF_SCRIPT)
+        args = [expected_id or '']
+        for field, value in state.items():
+            args.extend((field, value))
+        stream_id = script(keys=[self.key], args=args)
+        if stream_id is None:
+            raise ConcurrentModification(self.key)
+        if isinstance(stream_id, bytes):
+            stream_id = stream_id.decode()
+        return stream_id
+
     def info(self) -> dict:
         """
         Wrapper for redis xinfo
@@ -118,6 +194,8 @@ class RedisStorage:
     def __init__(self, redis=None, key_prefix=None, **options):
         self.key_prefix = key_prefix
         self._connection_object = redis
+        self._append_if_script = None if redis is None else redis.register_script(_APPEND_IF_SCRIPT)
+        self._append_many_if_script = None if redis is None else redis.register_script(_APPEND_MANY_IF_SCRIPT)
 
     def _connect(self, host, port, db, **options):
         """
@@ -160,4 +238,454 @@ class RedisStorage:
         was provided on client initialization, it will be used as the prefix on
         the feature key.
         """
-        return FeatureStream(self.connection, key, self.key_prefix)
+        return FeatureStream(self.connection, key, self.key_prefix, self._append_if_script)
+
+    def latest_states(self, names: Iterable[str]) -> Dict[str, Optional[StoredState]]:
+        """
+        Fetches the latest entry of each feature's stream in a single round
+        trip, atomically in a MULTI/EXEC transaction. Entries are timestamped
+        and versioned by their stream ids.
+        """
+        names = list(names)
+        pipeline = self.connection.pipeline(transaction=True)
+        for name in names:
+            pipeline.xrevrange(self[name].key, count=1)
+        states = {}
+        for name, entries in zip(names, pipeline.execute()):
+            if not entries:
+                states[name] = None
+                continue
+            stream_id, data = entries[0]
+            if isinstance(stream_id, bytes):
+                stream_id = stream_id.decode()
+            milliseconds = int(stream_id.split('-', 1)[0])
+            states[name] = StoredState(data, milliseconds / 1000, stream_id)
+        return states
+
+    def append_many(self, states: Dict[str, dict]) -> Dict[str, str]:
+        """
+        Appends a state to each feature's stream in a single MULTI/EXEC
+        transaction, so either every state is stored or none are. Returns
+        the id of each new entry.
+        """
+        names = list(states)
+        pipeline = self.connection.pipeline(transaction=True)
+        for name in names:
+            pipeline.xadd(self[name].key, states[name])
+        return dict(zip(names, pipeline.execute()))
+
+    def append_many_if(self, states: Dict[str, dict], expected_versions: Dict[str, Optional[str]]) -> Dict[str, str]:
+        """
+        Appends a state to each feature's stream, provided the id of the last
+        entry of each stream in expected_versions is still the one given, or
+        the stream is empty if that is None. The checks and the appends are
+        made atomically by a Lua script. Raises ConcurrentModification,
+        appending nothing, if any stream has moved on. Returns the id of each
+        new entry.
+        """
+        script = self._append_many_if_script
+        if script is None:
+            script = self._append_many_if_script = self.connection.register_script(_APPEND_MANY_IF_SCRIPT)
+        names = list(states)
+        args = []
+        for name in names:
+            args.append((expected_versions[name] or '') if name in expected_versions else '*')
+        for name in names:
+            args.append(len(states[name]) * 2)
+            for field, value in states[name].items():
+                args.extend((field, value))
+        result = script(keys=[self[name].key for name in names], args=args)
+        if isinstance(result, int):
+            raise ConcurrentModification(names[result - 1])
+        ids = [stream_id.decode() if isinstance(stream_id, bytes) else stream_id for stream_id in result]
+        return dict(zip(names, ids))
+
+
+class RedisExperimentPersister(ExperimentPersister):
+    """
+    Persists test groups in a Redis hash per experiment, mapping the key of
+    each bucketed object to its group.
+
+    Bucketing an object in create() costs a single round trip: the group is
+    set with HSETNX, so existing groups are never overwritten, and read back
+    in the same transaction.
+
+    key converts an object to the field its group is stored under, and may
+    return None for objects which can't be bucketed.
+    If ttl is given, an experiment's groups expire that many seconds after
+    the experiment last bucketed an object. Redis 5 can't expire individual
+    hash fields, so the ttl applies to the whole hash.
+
+    The connection should be created with decode_responses=True.
+    """
+    def __init__(
+            self,
+            redis: Redis,
+            key: Callable[[object], Optional[str]],
+            key_prefix: str = None,
+            ttl: int = None):
+        self._redis = redis
+        self.key = key
+        self.key_prefix = key_prefix
+        self.ttl = ttl
+
+    def _get_key(self, experiment: str) -> str:
+        """
+        Builds the Redis hash key for the experiment. If `key_prefix` is
+        provided, it will be used as the prefix for the experiment key.
+        """
+        if self.key_prefix:
+            return f"{self.key_prefix}:experiment:{experiment}"
+        return f"experiment:{experiment}"
+
+    def get_existing_test_group(self, experiment: str, obj: object) -> Optional[str]:
+        subject = self.key(obj)
+        if subject is None:
+            return None
+        return self._redis.hget(self._get_key(experiment), subject)
+
+    def persist_test_group(self, experiment: str, obj: object, group: str) -> Optional[str]:
+        return self.get_or_persist_test_group(experiment, obj, group)
+
+    def get_or_persist_test_group(self, experiment: str, obj: object, group: str) -> Optional[str]:
+        subject = self.key(obj)
+        if subject is None:
+            return None
+
+        key = self._get_key(experiment)
+        pipeline = self._redis.pipeline()
+        pipeline.hsetnx(key, subject, group)
+        pipeline.hget(key, subject)
+        if self.ttl is not None:
+            pipeline.expire(key, self.ttl)
+        results = pipeline.execute()
+        return results[1]
+
+    def persist_test_groups(self, entries: Iterable[Tuple[str, object, str]]) -> None:
+        pipeline = self._redis.pipeline(transaction=False)
+        keys = set()
+        for experiment, obj, group in entries:
+            subject = self.key(obj)
+            if subject is None:
+                continue
+            key = self._get_key(experiment)
+            keys.add(key)
+            pipeline.hsetnx(key, subject, group)
+        if self.ttl is not None:
+            for key in keys:
+                pipeline.expire(key, self.ttl)
+        pipeline.execute()
+
+
+# Reads the group index of each offset in the bitfield, then converts the
+# indexes to group names. 0 is the unassigned sentinel.
+_BITFIELD_GET_SCRIPT = """
+local args = {}
+for i = 2, #ARGV do
+    args[#args + 1] = 'GET'
+    args[#args + 1] = ARGV[1]
+    args[#args + 1] = '#' .. ARGV[i]
+end
+local indexes = redis.call('BITFIELD', KEYS[1], unpack(args))
+local groups = {}
+for i, index in ipairs(indexes) do
+    if index == 0 then
+        groups[i] = false
+    else
+        groups[i] = redis.call('HGET', KEYS[2], 'index:' .. index)
+    end
+end
+return groups
+"""
+
+# Returns the group at the offset, or assigns the given group if the offset is
+# unassigned. Group names are allocated the next free index the first time
+# they are persisted.
+_BITFIELD_GET_OR_SET_SCRIPT = """
+local current = redis.call('BITFIELD', KEYS[1], 'GET', ARGV[1], '#' .. ARGV[2])[1]
+if current ~= 0 then
+    return redis.call('HGET', KEYS[2], 'index:' .. current)
+end
+local index = redis.call('HGET', KEYS[2], 'group:' .. ARGV[3])
+if not index then
+    local count = tonumber(redis.call('HGET', KEYS[2], 'count') or '0')
+    if count >= tonumber(ARGV[4]) then
+        return redis.error_reply('Too many groups to store in the bitfield')
+    end
+    index = redis.call('HINCRBY', KEYS[2], 'count', 1)
+    redis.call('HSET', KEYS[2], 'group:' .. ARGV[3], index, 'index:' .. index, ARGV[3])
+end
+redis.call('BITFIELD', KEYS[1], 'SET', ARGV[1], '#' .. ARGV[2], index)
+return ARGV[3]
+"""
+
+
+class RedisBitfieldExperimentPersister(ExperimentPersister):
+    """
+    Persists test groups of objects with integer ids in a Redis bitfield per
+    experiment. Each object's group is stored in `bits` bits at an offset of
+    its id, so an experiment over ids up to 10 million takes 5MB with the
+    default of 4 bits.
+
+    Groups are stored as indexes into a small hash of the experiment's group
+    names, with 0 reserved for objects which are unassigned. At most
+    2 ** bits - 1 groups can be stored for an experiment.
+    Every operation is a single round trip.
+
+    key converts an object to its non-negative integer id, and may return
+    None for objects which can't be bucketed.
+
+    The connection should be created with decode_responses=True.
+    """
+    def __init__(
+            self,
+            redis: Redis,
+            key: Callable[[object], Optional[int]],
+            key_prefix: str = None,
+            bits: int = 4,
+            batch_size: int = 1000):
+        if not 1 <= bits <= 63:
+            raise ValueError("bits must be between 1 and 63")
+        self._redis = redis
+        self.key = key
+        self.key_prefix = key_prefix
+        self.type = f"u{bits}"
+        self.max_groups = 2 ** bits - 1
+        self.batch_size = batch_size
+        self._get_script = redis.register_script(_BITFIELD_GET_SCRIPT)
+        self._get_or_set_script = redis.register_script(_BITFIELD_GET_OR_SET_SCRIPT)
+
+    def _get_keys(self, experiment: str) -> List[str]:
+        """
+        Builds the Redis keys of the experiment's bitfield and group names.
+        If `key_prefix` is provided, it will be used as the prefix for both.
+        """
+        key = f"experiment:{experiment}"
+        if self.key_prefix:
+            key = f"{self.key_prefix}:{key}"
+        return [f"{key}:bits", f"{key}:groups"]
+
+    def _offset(self, obj: object) -> Optional[int]:
+        offset = self.key(obj)
+        if offset is not None and offset < 0:
+            raise ValueError(f"Expected a non-negative integer id, got {offset}")
+        return offset
+
+    def get_existing_test_groups(self, experiment: str, objs: Iterable[object]) -> List[Optional[str]]:
+        """
+        Returns the previously persisted group of each object, fetching
+        batch_size objects per round trip.
+        """
+        offsets = [self._offset(obj) for obj in objs]
+        valid = [offset for offset in offsets if offset is not None]
+        keys = self._get_keys(experiment)
+
+        found = {}
+        for start in range(0, len(valid), self.batch_size):
+            batch = valid[start:start + self.batch_size]
+            groups = self._get_script(keys=keys, args=[self.type, *batch])
+            found.update(zip(batch, groups))
+
+        return [
+            found.get(offset) if offset is not None else None
+            for offset in offsets
+        ]
+
+    def get_existing_test_group(self, experiment: str, obj: object) -> Optional[str]:
+        return self.get_existing_test_groups(experiment, [obj])[0]
+
+    def persist_test_group(self, experiment: str, obj: object, group: str) -> Optional[str]:
+        return self.get_or_persist_test_group(experiment, obj, group)
+
+    def get_or_persist_test_group(self, experiment: str, obj: object, group: str) -> Optional[str]:
+        offset = self._offset(obj)
+        if offset is None:
+            return None
+        return self._get_or_set_script(
+            keys=self._get_keys(experiment),
+            args=[self.type, offset, group, self.max_groups],
+        )
+
+    def persist_test_groups(self, entries: Iterable[Tuple[str, object, str]]) -> None:
+        pipeline = self._redis.pipeline(transaction=False)
+        for experiment, obj, group in entries:
+            offset = self._offset(obj)
+            if offset is None:
+                continue
+            self._get_or_set_script(
+                keys=self._get_keys(experiment),
+                args=[self.type, offset, group, self.max_groups],
+                client=pipeline,
+            )
+        pipeline.execute()
+
+
+class RedisStreamSink(ExposureSink):
+    """
+    Writes exposure events to a Redis stream, adding each batch in a single
+    pipeline.
+
+    If maxlen is given the stream is trimmed to approximately that many
+    events as they are added.
+    """
+    def __init__(self, redis: Redis, key_prefix: str = None, maxlen: int = None):
+        self._redis = redis
+        self.key_prefix = key_prefix
+        self.maxlen = maxlen
+        if key_prefix:
+            self.key = f"{key_prefix}:exposures"
+        else:
+            self.key = "exposures"
+
+    def write(self, events: List[ExposureEvent]) -> None:
+        pipeline = self._redis.pipeline(transaction=False)
+        for event in events:
+            pipeline.xadd(
+                self.key,
+                event.serialize(),
+                maxlen=self.maxlen,
+                approximate=True,
+            )
+        pipeline.execute()
+
+
+class RedisExposureCounter(ExposureCounter):
+    """
+    Counts exposures in Redis, keyed per feature, selector, day and
+    implementation.
+
+    Distinct subjects are approximated with a HyperLogLog, which takes at
+    most 12KB per key and has a standard error of 0.81%. Each batch of events
+    is aggregated locally and written in a single pipeline of PFADD and INCRBY
+    commands.
+
+    Counts expire ttl seconds after they were last written to.
+    """
+    def __init__(self, redis: Redis, key_prefix: str = None, ttl: int = 30 * 24 * 60 * 60):
+        self._redis = redis
+        self.key_prefix = key_prefix
+        self.ttl = ttl
+
+    def _get_key(self, feature: str, selector: str, day: str, impl: str) -> str:
+        """
+        Builds the Redis key prefix for the implementation's counts. If
+        `key_prefix` is provided, it will be used as the prefix for the key.
+        """
+        key = f"exposures:{feature}:{selector}:{day}:{impl}"
+        if self.key_prefix:
+            return f"{self.key_prefix}:{key}"
+        return key
+
+    def write(self, events: List[ExposureEvent]) -> None:
+        pipeline = self._redis.pipeline(transaction=False)
+        for group, (subjects, exposures) in self._aggregate(events).items():
+            key = self._get_key(*group)
+            if subjects:
+                pipeline.pfadd(f"{key}:subjects", *subjects)
+                if self.ttl is not None:
+                    pipeline.expire(f"{key}:subjects", self.ttl)
+            pipeline.incrby(f"{key}:count", exposures)
+            if self.ttl is not None:
+                pipeline.expire(f"{key}:count", self.ttl)
+        pipeline.execute()
+
+    def counts(
+            self,
+            feature: str,
+            selector: str,
+            implementations: Iterable[str],
+            day: str = None) -> Dict[str, ExposureCount]:
+        day = day or self._today()
+        implementations = list(implementations)
+        pipeline = self._redis.pipeline(transaction=False)
+        for impl in implementations:
+            key = self._get_key(feature, selector, day, impl)
+            pipeline.pfcount(f"{key}:subjects")
+            pipeline.get(f"{key}:count")
+        results = pipeline.execute()
+        return {
+            impl: ExposureCount(
+                subjects=results[2 * i],
+                exposures=int(results[2 * i + 1] or 0),
+            )
+            for i, impl in enumerate(implementations)
+        }
+
+
+class RedisImplementationTimingListener(ImplementationTimingListener, Poller):
+    """
+    Aggregates implementation timings from every process in a Redis hash per
+    feature and implementation.
+
+    Timings are recorded locally and added to Redis by `flush`, which start
+    calls every flush_interval seconds from a background thread, so
+    evaluations never wait on Redis. Histograms read from Redis include the
+    timings which haven't been flushed yet.
+    Every process must use the same buckets.
+    """
+    thread_name = 'feats-timings'
+
+    def __init__(
+            self,
+            redis: Redis,
+            key_prefix: str = None,
+            buckets: Iterable[float] = DEFAULT_BUCKETS,
+            flush_interval: float = 10.0,
+            ttl: int = None):
+        ImplementationTimingListener.__init__(self, buckets)
+        Poller.__init__(self, flush_interval)
+        self._redis = redis
+        self.key_prefix = key_prefix
+        self.ttl = ttl
+
+    def _get_key(self, feature: str, implementation: str) -> str:
+        """
+        Builds the Redis hash key for the implementation's timings. If
+        `key_prefix` is provided, it will be used as the prefix for the key.
+        """
+        if self.key_prefix:
+            return f"{self.key_prefix}:timings:{feature}:{implementation}"
+        return f"timings:{feature}:{implementation}"
+
+    def poll(self) -> None:
+        self.flush()
+
+    def flush(self) -> None:
+        """
+        Adds the timings recorded since the last flush to Redis
+        """
+        with self._lock:
+            pending, self._histograms = self._histograms, {}
+        if not pending:
+            return
+
+        try:
+            pipeline = self._redis.pipeline(transaction=False)
+            for (feature, implementation), histogram in pending.items():
+                key = self._get_key(feature, implementation)
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    if count:
+                        pipeline.hincrby(key, repr(float(bound)), count)
+                pipeline.hincrby(key, 'count', histogram.count)
+                pipeline.hincrbyfloat(key, 'sum', histogram.sum)
+                if self.ttl is not None:
+                    pipeline.expire(key, self.ttl)
+            pipeline.execute()
+        except Exception:
+            # Keep the timings so the next flush can retry them
+            with self._lock:
+                for key, histogram in pending.items():
+                    recorded = self._histograms.setdefault(key, Histogram(self.buckets))
+                    recorded.merge(histogram)
+            raise
+
+    def histogram(self, feature: str, implementation: str) -> Histogram:
+        histogram = super().histogram(feature, implementation)
+        data = self._redis.hgetall(self._get_key(feature, implementation))
+        if data:
+            recorded = Histogram(self.buckets)
+            recorded.counts = [int(data.get(repr(float(bound)), 0)) for bound in self.buckets]
+            recorded.count = int(data.get('count', 0))
+            recorded.sum = float(data.get('sum', 0))
+            histogram.merge(recorded)
+        return histogram
@@ -1,35 +1,78 @@
-from functools import lru_cache
+import threading
+from contextlib import contextmanager
 from inspect import getmro
-from typing import List
+from typing import List, Optional
+from weakref import WeakKeyDictionary
 
+from .cache import SegmentCache
+from .instrumentation import record_cache_hit
 from .meta import Definition, Implementation
 
+_scope = threading.local()
+
+
+@contextmanager
+def memoize_segments():
+    """
+    Memoizes the values of all segments for the duration of the context.
+
+    Inside of the context, segmenting the same object with the same segment
+    calls the segment's implementation once, no matter how many features
+    segment on it.
+    Objects are remembered by identity, so the context should be short lived,
+    e.g a single request. Nested contexts share the outermost memo.
+    """
+    if getattr(_scope, 'memo', None) is not None:
+        yield
+        return
+
+    _scope.memo = {}
+    try:
+        yield
+    finally:
+        _scope.memo = None
+
 
 class Segment:
-    def __init__(self, name: str, definition: Definition, options: List[str]=None):
+    __slots__ = ('name', 'definition', 'options', 'cache', 'input_mapping', '_dispatch')
+
+    def __init__(
+            self,
+            name: str,
+            definition: Definition,
+            options: List[str] = None,
+            cache: SegmentCache = None):
         _check_output_type(definition)
         _check_input_type(definition)
         self.name = name
         self.definition = definition
         self.options = options
+        self.cache = cache
         self.input_mapping = {
             impl.input_types[0]: impl
             for impl in self.definition.implementations.values()
         }
+        # Maps every class seen by this segment to its implementation.
+        # Classes are weakly referenced so dynamically created classes, e.g
+        # Django's deferred models, can still be garbage collected.
+        self._dispatch = WeakKeyDictionary(self.input_mapping)
 
-    @lru_cache(maxsize=32)
-    def find_implementation(self, cls) -> Implementation:
+    def find_implementation(self, cls) -> Optional[Implementation]:
         """
         For the given class, finds the implementation inside of the definition
         that matches the input type to that class.
         If multiple implementations are valid, it will raise a ValueError.
 
-        This method is cached under the assumption a small set of classes will
-        be given to the segment and class hierarchies don't change at runtime.
+        Results are remembered per class under the assumption class hierarchies
+        don't change at runtime.
         """
+        try:
+            return self._dispatch[cls]
+        except KeyError:
+            pass
+
         # couldn't find a way to isinstance between N classes, so we'll do it
         # ourselves
-
         tree = getmro(cls)
         found = []
         for cur_cls in tree:
@@ -37,24 +80,58 @@ class Segment:
             if impl is not None:
                 found.append(impl)
 
-        if len(found) == 0:
-            return None
-        elif len(found) > 1:
+        if len(found) > 1:
             # TODO: Better error messages about which impls match
             raise ValueError("Multiple implementations match {}".format(cls))
-        return found[0]
+
+        impl = found[0] if found else None
+        self._dispatch[cls] = impl
+        return impl
 
     def segment(self, value) -> str:
         """
         Segments the value by calling the implementation appropriate to the
         value's type.
+        If called inside of memoize_segments, the value is only segmented once.
+        If the segment has a cache, values are served from it until they expire.
         """
+        memo = getattr(_scope, 'memo', None)
+        if memo is not None:
+            key = (self, id(value))
+            memoized = memo.get(key)
+            if memoized is not None:
+                record_cache_hit()
+                return memoized[1]
+
         impl = self.find_implementation(type(value))
         if impl is None:
             raise ValueError(
                 "No Implementation which matches {}".format(type(value))
             )
-        return impl.fn(value)
+
+        cache_key = None
+        if self.cache is not None:
+            subject = self.cache.key(value)
+            if subject is not None:
+                # Different implementations may share identifiers, e.g a user
+                # and an address could both have an id of 1
+                cache_key = (impl.name, subject)
+
+        result = None
+        if cache_key is not None:
+            result = self.cache.get(cache_key)
+            if result is not None:
+                record_cache_hit()
+        if result is None:
+            result = impl.fn(value)
+            if cache_key is not None:
+                self.cache.set(cache_key, result)
+
+        if memo is not None:
+            # Keep a reference to the value so its id can't be reused by
+            # another object while the memo is alive
+            memo[key] = (value, result)
+        return result
 
 
 def _check_input_type(definition: Definition):
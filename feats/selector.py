@@ -3,7 +3,7 @@ import hashlib
 from bisect import bisect
 from itertools import accumulate
 from random import choices
-from typing import Callable, Mapping
+from typing import Callable, Iterable, Mapping, Optional, Tuple
 
 Weights = Mapping[str, int]
 Segment = Callable[[object], str]
@@ -14,6 +14,8 @@ class Selector(metaclass=abc.ABCMeta):
     A Selector decides the implementation a given input to a feature should use
     """
 
+    __slots__ = ('name',)
+
     def __init__(self, name: str):
         self.name = name
         """
@@ -33,6 +35,16 @@ class Selector(metaclass=abc.ABCMeta):
         Informs this selector that the given object has used a certain implementation
         """
 
+    def select_and_use(self, *args) -> str:
+        """
+        Returns the name of the feature implementation to use, and informs this
+        selector that it was used.
+        Selectors which can do both in a single step should override this.
+        """
+        impl = self.select(*args)
+        self.used_implementation(impl, *args)
+        return impl
+
     @classmethod
     @abc.abstractmethod
     def from_data(cls, app, configuration):
@@ -54,6 +66,8 @@ class Default(Selector):
     Used to represent the case where no FeatureState exists, and
     so will never be persisted to storage or configured by a user.
     """
+    __slots__ = ('feature',)
+
     def __init__(self, feature):
         super().__init__("Default")
         self.feature = feature
@@ -73,11 +87,41 @@ class Default(Selector):
         pass
 
 
+class Override(Selector):
+    """
+    Picks the implementation a feature has been overridden with, regardless
+    of its state.
+
+    Like Default, it is never persisted as part of a state or configured
+    through one.
+    """
+    __slots__ = ('value',)
+
+    def __init__(self, value: str):
+        super().__init__("Override")
+        self.value = value
+
+    def select(self, *args, **kwargs) -> str:
+        return self.value
+
+    def used_implementation(self, impl: str, *args):
+        pass
+
+    @classmethod
+    def from_data(cls, app, configuration):
+        pass
+
+    def serialize_data(self, app) -> dict:
+        pass
+
+
 class Static(Selector):
     """
     Static Selectors return a single implementation based on the
     configured value.
     """
+    __slots__ = ('value',)
+
     def __init__(self, name: str, value: str):
         super().__init__(name)
         self.value = value
@@ -108,14 +152,16 @@ class Rollout(Selector):
     configured weightings.
     They are designed to gradually enable a new feature over time.
     """
+    __slots__ = ('segment', 'weights', 'population', 'cum_weights', 'modulo', 'digest_size')
+
     def __init__(self, name: str, segment: Segment, weights: Weights):
         super().__init__(name)
         self.segment = segment
         self.weights = weights
-        self.population = list(weights.keys())
+        self.population = tuple(weights.keys())
         if len(self.population) == 0:
             raise ValueError("Must supply at least one weight to the selector")
-        self.cum_weights = list(accumulate(weights.values()))
+        self.cum_weights = tuple(accumulate(weights.values()))
         self.modulo = self.cum_weights[-1]
         if self.modulo == 0:
             raise ValueError("Must supply at least one positive weight to the selector")
@@ -157,14 +203,22 @@ class Rollout(Selector):
 
 
 class ExperimentPersister(metaclass=abc.ABCMeta):
+    """
+    Remembers the test group objects were bucketed in for each experiment.
+
+    Experiments are identified by their key, so a single persister can be
+    shared by every experiment in the app.
+    Persisters are registered with App.persister before experiments using
+    them can be deserialized.
+    """
     @abc.abstractmethod
-    def get_existing_test_group(self, obj: object) -> str:
+    def get_existing_test_group(self, experiment: str, obj: object) -> Optional[str]:
         """
         Returns the previously persisted group for the object.
         """
 
     @abc.abstractmethod
-    def persist_test_group(self, obj: object, group: str) -> str:
+    def persist_test_group(self, experiment: str, obj: object, group: str) -> Optional[str]:
         """
         Associates the provided test group to the specified object so that
         future checks return the group the object was already bucketed in.
@@ -183,6 +237,29 @@ class ExperimentPersister(metaclass=abc.ABCMeta):
         persister.
         """
 
+    def get_or_persist_test_group(self, experiment: str, obj: object, group: str) -> Optional[str]:
+        """
+        Returns the existing group for the object, persisting the given group
+        if the object was not yet bucketed.
+
+        Persisters which can check and persist in a single operation should
+        override this.
+        """
+        existing = self.get_existing_test_group(experiment, obj)
+        if existing is not None:
+            return existing
+        return self.persist_test_group(experiment, obj, group)
+
+    def persist_test_groups(self, entries: Iterable[Tuple[str, object, str]]) -> None:
+        """
+        Persists many (experiment, obj, group) entries at once.
+
+        Persisters which can write several entries in a single operation
+        should override this.
+        """
+        for experiment, obj, group in entries:
+            self.persist_test_group(experiment, obj, group)
+
 
 class Experiment(Selector):
     """
@@ -194,27 +271,49 @@ class Experiment(Selector):
     They can be used for doing A/B testing of two or more
     implementations of a feature.
     """
+    __slots__ = ('persister', 'weights', 'key', 'population', 'cum_weights')
+
     def __init__(
             self,
             name: str,
             persister: ExperimentPersister,
-            weights: Weights
+            weights: Weights,
+            key: str = None,
     ):
         super().__init__(name)
         self.persister = persister
-        self.population = list(weights.keys())
-        self.weights = list(weights.values())
+        self.weights = weights
+        self.key = key or name
+        """
+        Identifies the experiment to the persister. It should not change
+        when the experiment is edited, or objects will be bucketed again.
+        """
+        self.population = tuple(weights.keys())
+        if len(self.population) == 0:
+            raise ValueError("Must supply at least one weight to the selector")
+        self.cum_weights = tuple(accumulate(weights.values()))
+        if self.cum_weights[-1] == 0:
+            raise ValueError("Must supply at least one positive weight to the selector")
+
+    def _choose(self) -> str:
+        return choices(self.population, cum_weights=self.cum_weights)[0]
 
     def select(self, value: object) -> str:
-        existing_group = self.persister.get_existing_test_group(value)
+        existing_group = self.persister.get_existing_test_group(self.key, value)
         if existing_group is not None:
             return existing_group
 
-        choice = choices(self.population, self.weights)[0]
-        return choice
+        return self._choose()
 
     def used_implementation(self, impl: str, value: object):
-        self.persister.persist_test_group(value, impl)
+        self.persister.persist_test_group(self.key, value, impl)
+
+    def select_and_use(self, value: object) -> str:
+        choice = self._choose()
+        group = self.persister.get_or_persist_test_group(self.key, value, choice)
+        if group is None:
+            return choice
+        return group
 
     @classmethod
     def from_data(cls, app, configuration):
@@ -222,6 +321,7 @@ class Experiment(Selector):
             name=configuration['name'],
             persister=app.get_persister(configuration['persister']),
             weights=configuration['weights'],
+            key=configuration.get('key'),
         )
 
     def serialize_data(self, app):
@@ -229,4 +329,104 @@ class Experiment(Selector):
             'name': self.name,
             'persister': app._name(self.persister),
             'weights': self.weights,
+            'key': self.key,
+        }
+
+
+class DeterministicExperiment(Selector):
+    """
+    Deterministic Experiment Selectors assign an implementation by hashing
+    the experiment's salt with the segmented value, weighted by the
+    configured weightings.
+    Assignments need no storage, and can be reproduced offline with assign.
+    Experiments with different salts assign independently of each other.
+
+    A persister is optional. If given, groups found in it take precedence
+    over the hashed assignment, which allows overriding the group of
+    individual objects. If pin is also set, every used implementation is
+    persisted so that changing the weights later doesn't move objects which
+    were already exposed.
+    """
+    __slots__ = (
+        'segment', 'weights', 'salt', 'persister', 'pin', 'population', 'cum_weights', 'modulo',
+    )
+
+    def __init__(
+            self,
+            name: str,
+            segment: Segment,
+            weights: Weights,
+            salt: str,
+            persister: Optional[ExperimentPersister] = None,
+            pin: bool = False,
+    ):
+        super().__init__(name)
+        if pin and persister is None:
+            raise ValueError("A persister is required to pin groups")
+        self.segment = segment
+        self.weights = weights
+        self.salt = salt
+        self.persister = persister
+        self.pin = pin
+        self.population = tuple(weights.keys())
+        if len(self.population) == 0:
+            raise ValueError("Must supply at least one weight to the selector")
+        self.cum_weights = tuple(accumulate(weights.values()))
+        self.modulo = self.cum_weights[-1]
+        if self.modulo == 0:
+            raise ValueError("Must supply at least one positive weight to the selector")
+
+    def assign(self, key: str) -> str:
+        """
+        Returns the implementation assigned to the segment value, ignoring
+        any persisted groups.
+        """
+        # 8 bytes keeps the modulo bias negligible for any realistic weights
+        digest = hashlib.blake2s(
+            f'{self.salt}:{key}'.encode('utf-8'),
+            digest_size=8
+        ).digest()
+        bucket = int.from_bytes(digest, 'big') % self.modulo
+        return self.population[bisect(self.cum_weights, bucket)]
+
+    def select(self, value: object) -> str:
+        if self.persister is not None:
+            existing_group = self.persister.get_existing_test_group(self.salt, value)
+            if existing_group is not None:
+                return existing_group
+        return self.assign(self.segment.segment(value))
+
+    def used_implementation(self, impl: str, value: object):
+        if self.pin:
+            self.persister.persist_test_group(self.salt, value, impl)
+
+    def select_and_use(self, value: object) -> str:
+        if not self.pin:
+            return self.select(value)
+        choice = self.assign(self.segment.segment(value))
+        group = self.persister.get_or_persist_test_group(self.salt, value, choice)
+        if group is None:
+            return choice
+        return group
+
+    @classmethod
+    def from_data(cls, app, configuration):
+        persister = configuration.get('persister')
+        return cls(
+            name=configuration['name'],
+            segment=app.get_segment(configuration['segment']),
+            weights=configuration['weights'],
+            salt=configuration['salt'],
+            persister=app.get_persister(persister) if persister else None,
+            pin=configuration.get('pin', False),
+        )
+
+    def serialize_data(self, app):
+        return {
+            'name': self.name,
+            'segment': self.segment.name,
+            'weights': self.weights,
+            'salt': self.salt,
+            'persister': app._name(self.persister) if self.persister else None,
+            'pin': self.pin,
         }
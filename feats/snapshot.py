@@ -0,0 +1,192 @@
+import json
+import threading
+import time
+from copy import deepcopy
+from typing import Dict, Iterable, Mapping, Optional
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+from .override import OVERRIDES_KEY
+from .storage import Storage, StoredState, latest_states
+from .worker import Poller
+
+
+def build_snapshot(app, since: float = None) -> dict:
+    """
+    Returns the latest serialized state of every feature registered with the
+    app, as a JSON serializable dict.
+
+    If since is given, only features modified at or after it are included.
+    Features whose storage doesn't record when they were modified are always
+    included. The snapshot's version is the latest modification time of its
+    features, which clients send back as since to receive only the changes.
+    The app's stored overrides are always included.
+    """
+    started = time.time()
+    states = latest_states(app.storage, list(app.features) + [OVERRIDES_KEY])
+    overrides = states.pop(OVERRIDES_KEY)
+    version = max(
+        (stored.modified for stored in states.values() if stored is not None and stored.modified is not None),
+        default=since,
+    )
+    if version is not None and getattr(app.storage, 'latest_states', None) is None:
+        # The features were read in turn, so a feature read early on may have
+        # been modified before a later one was read. Such writes are only
+        # known to have been modified since the reads began.
+        version = min(version, started)
+    features = {}
+    for name, stored in states.items():
+        if stored is None:
+            continue
+        if since is not None and stored.modified is not None and stored.modified < since:
+            continue
+        features[name] = {
+            'data': stored.data,
+            'version': stored.version,
+            'modified': stored.modified,
+        }
+    return {
+        'version': version,
+        'delta': since is not None,
+        'features': features,
+        'overrides': None if overrides is None else {
+            'data': overrides.data,
+            'version': overrides.version,
+            'modified': overrides.modified,
+        },
+    }
+
+
+class SnapshotHistory:
+    """
+    The latest state of a feature, as received in a snapshot.
+    Only the latest state is kept, so appending replaces it.
+    """
+    __slots__ = ('data', 'version', 'modified')
+
+    def __init__(self):
+        self.data = None
+        self.version = None
+        self.modified = None
+
+    def last(self) -> dict:
+        if self.data is None:
+            raise IndexError("No state has been received")
+        return deepcopy(self.data)
+
+    def append(self, data: dict) -> None:
+        self.replace(StoredState(deepcopy(data), time.time(), None))
+
+    def replace(self, stored: StoredState) -> None:
+        self.data = stored.data
+        self.version = stored.version
+        self.modified = stored.modified
+
+    def __len__(self) -> int:
+        return 0 if self.data is None else 1
+
+    def __iter__(self):
+        if self.data is not None:
+            yield self.last()
+
+
+class Snapshot(dict):
+    """
+    A Storage holding the latest state of each feature received from
+    another app's snapshot endpoint, kept up to date by a SnapshotClient.
+    """
+    def __missing__(self, name: str) -> SnapshotHistory:
+        history = self[name] = SnapshotHistory()
+        return history
+
+    def replace(self, name: str, stored: StoredState) -> None:
+        self[name].replace(stored)
+
+
+class SnapshotClient(Poller):
+    """
+    Keeps the storage of an app up to date with the snapshot endpoint of
+    another, e.g feats.django.service_urls, so services which can't reach
+    the same storage use the same feature states.
+
+    The first sync fetches every state. Later syncs send the version of the
+    snapshot held, and only receive the features which changed since.
+    States are written to a Snapshot storage in place, or appended to any
+    other storage when their version changes.
+
+    The overrides of the other app replace those of this one, so features
+    overridden there are overridden here too.
+
+    start polls every interval seconds from a background thread. Failed
+    polls are logged, and the states last received are kept.
+    """
+    thread_name = 'feats-snapshot'
+
+    def __init__(
+            self,
+            app,
+            url: str,
+            interval: float = 5.0,
+            timeout: float = 5.0,
+            headers: Mapping[str, str] = None):
+        super().__init__(interval)
+        self.app = app
+        self.url = url
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+        self.version: Optional[float] = None
+        self._versions: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+
+    def fetch(self, since: float = None) -> dict:
+        url = self.url
+        if since is not None:
+            separator = '&' if '?' in url else '?'
+            url = url + separator + urlencode({'since': repr(since)})
+        request = Request(url, headers={'Accept': 'application/json', **self.headers})
+        with urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read().decode())
+
+    def apply(self, snapshot: dict) -> Iterable[str]:
+        """
+        Writes the states in the snapshot to the app's storage, returning the
+        names of the features which changed
+        """
+        storage: Storage = self.app.storage
+        replace = getattr(storage, 'replace', None)
+        current = {}
+        if replace is None:
+            # Avoid appending states the storage already holds, e.g when a
+            # service restarts
+            unseen = [name for name in snapshot['features'] if name not in self._versions]
+            current = latest_states(storage, unseen)
+        changed = []
+        for name, feature in snapshot['features'].items():
+            stored = StoredState(feature['data'], feature['modified'], feature['version'])
+            if stored.version is not None and self._versions.get(name) == stored.version:
+                continue
+            self._versions[name] = stored.version
+            if replace is not None:
+                replace(name, stored)
+            elif current.get(name) is not None and current[name].data == stored.data:
+                continue
+            else:
+                storage[name].append(stored.data)
+            changed.append(name)
+        overrides = snapshot.get('overrides')
+        self.app.overrides.load(None if overrides is None else StoredState(
+            overrides['data'], overrides['modified'], overrides['version'],
+        ))
+        self.version = snapshot['version']
+        return changed
+
+    def sync(self) -> Iterable[str]:
+        """
+        Fetches the changes since the last sync and applies them, returning
+        the names of the features which changed
+        """
+        with self._lock:
+            return self.apply(self.fetch(self.version))
+
+    def poll(self) -> None:
+        self.sync()
@@ -5,6 +5,7 @@ from .errors import InvalidSerializerVersion
 
 
 class FeatureState:
+    __slots__ = ('segments', 'selectors', 'selector_mapping', 'created_by')
     version = 'v1'
 
     @classmethod
@@ -33,10 +34,22 @@ class FeatureState:
             if selector not in self.selectors:
                 raise ValueError(f"{selector.name} was mapped, but not included in the set of selectors for this feature")
 
-    def find_selector(self, *args) -> Optional[Selector]:
-        segment_values = tuple([segment.segment(*args) for segment in self.segments])
+    def segment_values(self, *args) -> tuple:
+        """
+        Segments the argument(s) with each of this state's segments, in order
+        """
+        return tuple([segment.segment(*args) for segment in self.segments])
+
+    def get_selector(self, segment_values: tuple) -> Optional[Selector]:
+        """
+        Returns the selector mapped to the segment values, or the fallthrough
+        selector if none is mapped
+        """
         return self.selector_mapping.get(segment_values, self.selector_mapping.get(None))
 
+    def find_selector(self, *args) -> Optional[Selector]:
+        return self.get_selector(self.segment_values(*args))
+
     def add_selector(self, selector: Selector, created_by: str) -> 'FeatureState':
         selectors = self.selectors.copy()
         selector_mapping = self.selector_mapping.copy()
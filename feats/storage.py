@@ -1,8 +1,11 @@
+import threading
+import time
 from copy import deepcopy
 
-from typing import MutableMapping, MutableSequence
+from typing import Callable, Dict, Iterable, Mapping, MutableMapping, MutableSequence, Optional
+from .errors import ConcurrentModification
 from .state import FeatureState
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 
 Storage = MutableMapping[str, MutableSequence[FeatureState]]
 """
@@ -21,12 +24,162 @@ Mainly useful for testing environments.
 """
 
 
+StoredState = namedtuple('StoredState', ['data', 'modified', 'version'])
+"""
+The latest serialized state of a feature, the unix timestamp it was stored
+at, and an identifier which changes whenever a new state is stored, e.g the
+id of the stream entry, if the storage records them.
+"""
+
+
+def latest_states(storage: Storage, names: Iterable[str]) -> Dict[str, Optional[StoredState]]:
+    """
+    Returns the latest stored state of each of the features, or None for
+    features which have never been configured.
+
+    Storages which can fetch many states at once, e.g in a single round
+    trip, do so by defining latest_states, which must read them atomically,
+    so no write lands between the reads of two features. Otherwise the
+    history of each feature is read in turn.
+    """
+    bulk = getattr(storage, 'latest_states', None)
+    if bulk is not None:
+        return bulk(names)
+
+    states = {}
+    for name in names:
+        history = storage[name]
+        try:
+            data = history.last()
+        except IndexError:
+            states[name] = None
+            continue
+        states[name] = StoredState(
+            data,
+            getattr(history, 'modified', None),
+            getattr(history, 'version', None),
+        )
+    return states
+
+
+def append_many(storage: Storage, states: Mapping[str, dict]) -> None:
+    """
+    Appends a serialized state to the history of each of the features.
+
+    Storages which can append many states atomically, e.g in a single
+    transaction, do so by defining append_many. Otherwise the states are
+    appended in turn.
+    """
+    bulk = getattr(storage, 'append_many', None)
+    if bulk is not None:
+        bulk(states)
+        return
+
+    for name, data in states.items():
+        storage[name].append(data)
+
+
+def compare_and_append(storage: Storage, name: str, data: dict, expected_version: Optional[str]) -> None:
+    """
+    Appends a serialized state to the history of the feature, provided the
+    version of its latest state is still expected_version, or it has no
+    state if that is None. Raises ConcurrentModification otherwise.
+
+    Histories which can check and append atomically do so by defining
+    append_if. Otherwise the latest version is checked before appending, which
+    doesn't prevent a write from landing in between. Storages which don't
+    version their states can't detect concurrent writes at all.
+    """
+    history = storage[name]
+    append_if = getattr(history, 'append_if', None)
+    if append_if is not None:
+        append_if(data, expected_version)
+        return
+
+    stored = latest_states(storage, [name])[name]
+    version = None if stored is None else stored.version
+    if version != expected_version:
+        raise ConcurrentModification(name)
+    history.append(data)
+
+
+def compare_and_append_many(
+        storage: Storage,
+        states: Mapping[str, dict],
+        expected_versions: Mapping[str, Optional[str]]) -> None:
+    """
+    Appends a serialized state to the history of each of the features,
+    provided the version of the latest state of each feature in
+    expected_versions is still the one given, or it has no state if that is
+    None. Raises ConcurrentModification, appending nothing, otherwise.
+    Every feature in expected_versions must have a state in states.
+
+    Storages which can check and append many states atomically do so by
+    defining append_many_if. Otherwise the versions are checked before the
+    states are appended, as by compare_and_append.
+    """
+    bulk = getattr(storage, 'append_many_if', None)
+    if bulk is not None:
+        bulk(states, expected_versions)
+        return
+
+    for name, stored in latest_states(storage, expected_versions).items():
+        version = None if stored is None else stored.version
+        if version != expected_versions[name]:
+            raise ConcurrentModification(name)
+    append_many(storage, states)
+
+
+def compare_and_update(
+        storage: Storage,
+        name: str,
+        update: Callable[[Optional[StoredState]], Optional[dict]],
+        retries: int = 3) -> Optional[dict]:
+    """
+    Appends the serialized state returned by update when given the latest
+    stored state of the feature, or None if it has none, and returns it. If
+    update returns None, nothing is appended.
+
+    If another state is stored in between, update is called again with that
+    state, up to retries more times before raising ConcurrentModification.
+    """
+    for _ in range(retries + 1):
+        stored = latest_states(storage, [name])[name]
+        data = update(stored)
+        if data is None:
+            return None
+        try:
+            compare_and_append(storage, name, data, None if stored is None else stored.version)
+            return data
+        except ConcurrentModification:
+            pass
+    raise ConcurrentModification(name)
+
+
 class MemoryList(list):
     """
     This is an append-only list meant to store serialized feature states.
     It is immutable by design and returns deep copies so accidental mutations
     are prevented
     """
+    modified = None
+    """
+    The unix timestamp of the latest append, if any
+    """
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        # Held by append_if across its check and its append, which it makes
+        # through append, so a plain append can't land in between
+        self._lock = threading.RLock()
+
+    @property
+    def version(self):
+        """
+        The number of states appended
+        """
+        return str(len(self))
+
     def last(self):
         return self[-1]
 
@@ -39,4 +192,16 @@ class MemoryList(list):
 
     def append(self, value):
         clone = deepcopy(value)
-        super().append(clone)
+        with self._lock:
+            super().append(clone)
+            self.modified = time.time()
+
+    def append_if(self, value, expected_version: Optional[str]):
+        """
+        Appends the value, provided the version is still expected_version,
+        or the list is empty if that is None
+        """
+        with self._lock:
+            if (self.version if self else None) != expected_version:
+                raise ConcurrentModification()
+            self.append(value)
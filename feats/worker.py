@@ -0,0 +1,101 @@
+import abc
+import logging
+import os
+import threading
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """
+    Runs target in a daemon thread, started the first time start is called
+    from each process.
+
+    Threads don't survive a fork, so a forked process starts its own thread,
+    calling on_fork first to discard the work inherited from the parent.
+    Callers must not call start from several threads at once.
+    """
+    def __init__(self, target: Callable[[], None], name: str, on_fork: Callable[[], None] = None):
+        self.target = target
+        self.name = name
+        self.on_fork = on_fork
+        self._thread = None
+        self._pid = None
+
+    def started(self) -> bool:
+        """
+        Returns whether the thread was started by this process
+        """
+        return self._pid == os.getpid()
+
+    def start(self) -> None:
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        if self._pid is not None and self.on_fork is not None:
+            self.on_fork()
+        self._pid = pid
+        self._thread = threading.Thread(target=self.target, name=self.name, daemon=True)
+        self._thread.start()
+
+    def is_alive(self) -> bool:
+        return self.started() and self._thread.is_alive()
+
+    def join(self, timeout: float = None) -> bool:
+        """
+        Waits for the thread to finish, returning False if the timeout
+        elapsed first. Returns True if it was never started in this process.
+        """
+        if not self.started():
+            return True
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+
+class Poller(metaclass=abc.ABCMeta):
+    """
+    Calls poll every interval seconds from a daemon thread, between start
+    and stop. Exceptions raised by poll are logged.
+
+    Threads don't survive a fork, so preforking servers should call start in
+    each worker, e.g from a post_fork hook.
+    """
+    thread_name = 'feats-poller'
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._poll_lock = threading.Lock()
+        self._poll_stop = threading.Event()
+        self._poll_thread = None
+
+    @abc.abstractmethod
+    def poll(self) -> None:
+        """
+        Called from the background thread every interval seconds
+        """
+
+    def start(self) -> None:
+        """
+        Starts polling from a background thread, unless already polling
+        """
+        with self._poll_lock:
+            if self._poll_thread is not None and self._poll_thread.is_alive():
+                return
+            self._poll_stop.clear()
+            self._poll_thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+            self._poll_thread.start()
+
+    def stop(self, timeout: float = None) -> None:
+        self._poll_stop.set()
+        thread = self._poll_thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+
+    def _run(self):
+        while not self._poll_stop.is_set():
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("%s failed to poll", type(self).__name__)
+            self._poll_stop.wait(self.interval)
@@ -0,0 +1,69 @@
+from unittest import TestCase
+from redis import Redis
+from feats.exposure import ExposureCount
+from feats.exposure import ExposureEvent
+from feats.redis import RedisExposureCounter
+from feats.redis import RedisStreamSink
+
+
+class RedisStreamSinkTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.redis = Redis(host='redis', decode_responses=True)
+        self.sink = RedisStreamSink(self.redis, key_prefix=self.id())
+        self.redis.delete(self.sink.key)
+
+    def test_key(self):
+        self.assertEqual('exposures', RedisStreamSink(self.redis).key)
+        self.assertEqual(f'{self.id()}:exposures', self.sink.key)
+
+    def test_write(self):
+        events = [
+            ExposureEvent('feature', 'selector', impl, ('a',), 1.5, 'subject')
+            for impl in ['foo', 'bar']
+        ]
+        self.sink.write(events)
+        entries = self.redis.xrange(self.sink.key)
+        self.assertEqual([event.serialize() for event in events], [data for _, data in entries])
+
+    def test_maxlen(self):
+        sink = RedisStreamSink(self.redis, key_prefix=self.id(), maxlen=1)
+        sink.write([ExposureEvent('feature', 'selector', 'foo', None, 1.5, None)] * 1000)
+        self.assertLess(self.redis.xlen(sink.key), 1000)
+
+
+class RedisExposureCounterTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.redis = Redis(host='redis', decode_responses=True)
+        self.counter = RedisExposureCounter(self.redis, key_prefix=self.id(), ttl=60)
+        for key in self.redis.keys(f'{self.id()}:*'):
+            self.redis.delete(key)
+
+    def test_key(self):
+        self.assertEqual(
+            'exposures:feature:selector:1970-01-01:impl',
+            RedisExposureCounter(self.redis)._get_key('feature', 'selector', '1970-01-01', 'impl'),
+        )
+
+    def test_counts(self):
+        events = [
+            ExposureEvent('feature', 'selector', 'foo', None, 1.5, subject)
+            for subject in [1, 1, 2, None]
+        ]
+        self.counter.write(events)
+        self.counter.write(events[:1] + [ExposureEvent('feature', 'selector', 'bar', None, 1.5, 1)])
+        self.assertEqual(
+            {
+                'foo': ExposureCount(subjects=2, exposures=5),
+                'bar': ExposureCount(subjects=1, exposures=1),
+                'baz': ExposureCount(subjects=0, exposures=0),
+            },
+            self.counter.counts('feature', 'selector', ['foo', 'bar', 'baz'], day='1970-01-01'),
+        )
+
+    def test_ttl(self):
+        self.counter.write([ExposureEvent('feature', 'selector', 'foo', None, 1.5, 1)])
+        key = self.counter._get_key('feature', 'selector', '1970-01-01', 'foo')
+        self.assertLessEqual(0, self.redis.ttl(f'{key}:subjects'))
+        self.assertLessEqual(0, self.redis.ttl(f'{key}:count'))
@@ -0,0 +1,67 @@
+import time
+from unittest import TestCase
+from unittest.mock import patch
+from redis import Redis
+from feats.instrumentation import Evaluation
+from feats.redis import RedisImplementationTimingListener
+
+
+def make_evaluation(implementation, seconds):
+    evaluation = Evaluation('feature', 'create')
+    evaluation.implementation = implementation
+    evaluation.timings = {'implementation': seconds}
+    return evaluation
+
+
+class RedisImplementationTimingListenerTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.redis = Redis(host='redis', decode_responses=True)
+        self.listener = self.make_listener()
+        self.redis.delete(self.listener._get_key('feature', 'foo'))
+
+    def make_listener(self):
+        return RedisImplementationTimingListener(
+            self.redis,
+            key_prefix=self.id(),
+            buckets=[0.001, 0.01],
+            flush_interval=0.01,
+            ttl=60,
+        )
+
+    def test_key(self):
+        listener = RedisImplementationTimingListener(self.redis)
+        self.assertEqual('timings:feature:foo', listener._get_key('feature', 'foo'))
+
+    def test_flushes_from_background_thread(self):
+        self.listener.on_evaluation(make_evaluation('foo', 0.0005))
+        self.listener.on_evaluation(make_evaluation('foo', 0.005))
+        self.assertEqual({}, self.redis.hgetall(self.listener._get_key('feature', 'foo')))
+
+        self.listener.start()
+        self.addCleanup(self.listener.stop, 5)
+        deadline = time.monotonic() + 5
+        while not self.redis.exists(self.listener._get_key('feature', 'foo')):
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        self.assertEqual(
+            {'0.001': '1', '0.01': '1', 'count': '2', 'sum': '0.0055'},
+            self.redis.hgetall(self.listener._get_key('feature', 'foo')),
+        )
+
+    def test_combines_processes(self):
+        other = self.make_listener()
+        self.listener.on_evaluation(make_evaluation('foo', 0.0005))
+        other.on_evaluation(make_evaluation('foo', 0.005))
+        other.flush()
+        histogram = self.listener.histogram('feature', 'foo')
+        self.assertEqual([1, 1], histogram.counts)
+        self.assertEqual(2, self.listener.summary('feature', ['foo'])['foo'].count)
+
+    def test_failed_flush_is_retried(self):
+        self.listener.on_evaluation(make_evaluation('foo', 0.0005))
+        with patch.object(self.redis, 'pipeline', side_effect=ConnectionError()):
+            with self.assertRaises(ConnectionError):
+                self.listener.flush()
+        self.listener.flush()
+        self.assertEqual('1', self.redis.hget(self.listener._get_key('feature', 'foo'), 'count'))
@@ -0,0 +1,154 @@
+from unittest import TestCase
+from unittest.mock import patch
+from redis import Redis
+from feats.redis import RedisBitfieldExperimentPersister
+from feats.redis import RedisExperimentPersister
+
+
+class RedisExperimentPersisterTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.redis = Redis(host='redis', decode_responses=True)
+        self.persister = RedisExperimentPersister(
+            self.redis,
+            key=lambda obj: obj.get('id'),
+            key_prefix='test',
+        )
+        self.experiment = self.id()
+        self.redis.delete(self.persister._get_key(self.experiment))
+
+    def test_key(self):
+        persister = RedisExperimentPersister(self.redis, key=str)
+        with self.subTest("without prefix"):
+            self.assertEqual('experiment:exp', persister._get_key('exp'))
+        with self.subTest("with prefix"):
+            self.assertEqual('test:experiment:exp', self.persister._get_key('exp'))
+
+    def test_get_existing_test_group(self):
+        self.assertIsNone(self.persister.get_existing_test_group(self.experiment, {'id': '1'}))
+        self.persister.persist_test_group(self.experiment, {'id': '1'}, 'a')
+        self.assertEqual('a', self.persister.get_existing_test_group(self.experiment, {'id': '1'}))
+        self.assertIsNone(self.persister.get_existing_test_group(self.experiment, {'id': '2'}))
+
+    def test_persist_does_not_overwrite(self):
+        self.assertEqual('a', self.persister.persist_test_group(self.experiment, {'id': '1'}, 'a'))
+        self.assertEqual('a', self.persister.persist_test_group(self.experiment, {'id': '1'}, 'b'))
+        self.assertEqual('a', self.persister.get_existing_test_group(self.experiment, {'id': '1'}))
+
+    def test_get_or_persist_is_one_round_trip(self):
+        with patch.object(self.redis, 'hget', wraps=self.redis.hget) as hget:
+            self.assertEqual(
+                'a',
+                self.persister.get_or_persist_test_group(self.experiment, {'id': '1'}, 'a')
+            )
+            self.assertEqual(
+                'a',
+                self.persister.get_or_persist_test_group(self.experiment, {'id': '1'}, 'b')
+            )
+            hget.assert_not_called()
+
+    def test_invalid_target(self):
+        self.assertIsNone(self.persister.persist_test_group(self.experiment, {}, 'a'))
+        self.assertIsNone(self.persister.get_existing_test_group(self.experiment, {}))
+
+    def test_persist_test_groups(self):
+        self.persister.persist_test_group(self.experiment, {'id': '1'}, 'a')
+        self.persister.persist_test_groups([
+            (self.experiment, {'id': '1'}, 'b'),
+            (self.experiment, {'id': '2'}, 'b'),
+            (self.experiment, {}, 'b'),
+        ])
+        self.assertEqual('a', self.persister.get_existing_test_group(self.experiment, {'id': '1'}))
+        self.assertEqual('b', self.persister.get_existing_test_group(self.experiment, {'id': '2'}))
+
+    def test_ttl(self):
+        persister = RedisExperimentPersister(
+            self.redis,
+            key=lambda obj: obj.get('id'),
+            key_prefix='test',
+            ttl=60,
+        )
+        persister.persist_test_group(self.experiment, {'id': '1'}, 'a')
+        ttl = self.redis.ttl(persister._get_key(self.experiment))
+        self.assertGreater(ttl, 0)
+        self.assertLessEqual(ttl, 60)
+
+
+class RedisBitfieldExperimentPersisterTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.redis = Redis(host='redis', decode_responses=True)
+        self.persister = RedisBitfieldExperimentPersister(
+            self.redis,
+            key=lambda obj: obj.get('id'),
+            key_prefix='test',
+            bits=2,
+            batch_size=2,
+        )
+        self.experiment = self.id()
+        self.redis.delete(*self.persister._get_keys(self.experiment))
+
+    def test_invalid_bits(self):
+        for bits in (0, 64):
+            with self.subTest(bits=bits), self.assertRaises(ValueError):
+                RedisBitfieldExperimentPersister(self.redis, key=int, bits=bits)
+
+    def test_keys(self):
+        self.assertEqual(
+            ['test:experiment:exp:bits', 'test:experiment:exp:groups'],
+            self.persister._get_keys('exp')
+        )
+
+    def test_unassigned(self):
+        self.assertIsNone(self.persister.get_existing_test_group(self.experiment, {'id': 10}))
+
+    def test_persist_does_not_overwrite(self):
+        self.assertEqual('a', self.persister.persist_test_group(self.experiment, {'id': 10}, 'a'))
+        self.assertEqual('a', self.persister.persist_test_group(self.experiment, {'id': 10}, 'b'))
+        self.assertEqual('a', self.persister.get_existing_test_group(self.experiment, {'id': 10}))
+
+    def test_neighbours_are_independent(self):
+        self.persister.persist_test_group(self.experiment, {'id': 1}, 'a')
+        self.persister.persist_test_group(self.experiment, {'id': 2}, 'b')
+        self.persister.persist_test_group(self.experiment, {'id': 3}, 'c')
+        self.assertEqual(
+            ['a', 'b', 'c', None],
+            [
+                self.persister.get_existing_test_group(self.experiment, {'id': i})
+                for i in (1, 2, 3, 4)
+            ]
+        )
+
+    def test_too_many_groups(self):
+        for i, group in enumerate(['a', 'b', 'c']):
+            self.persister.persist_test_group(self.experiment, {'id': i}, group)
+        with self.assertRaises(Exception):
+            self.persister.persist_test_group(self.experiment, {'id': 4}, 'd')
+        # Known groups can still be persisted
+        self.assertEqual('a', self.persister.persist_test_group(self.experiment, {'id': 5}, 'a'))
+
+    def test_batched_reads(self):
+        self.persister.persist_test_group(self.experiment, {'id': 1}, 'a')
+        self.persister.persist_test_group(self.experiment, {'id': 3}, 'b')
+        objs = [{'id': 3}, {}, {'id': 2}, {'id': 1}, {'id': 1000}]
+        self.assertEqual(
+            ['b', None, None, 'a', None],
+            self.persister.get_existing_test_groups(self.experiment, objs)
+        )
+
+    def test_persist_test_groups(self):
+        self.persister.persist_test_group(self.experiment, {'id': 1}, 'a')
+        self.persister.persist_test_groups([
+            (self.experiment, {'id': 1}, 'b'),
+            (self.experiment, {'id': 2}, 'b'),
+            (self.experiment, {}, 'b'),
+        ])
+        self.assertEqual(
+            ['a', 'b'],
+            self.persister.get_existing_test_groups(self.experiment, [{'id': 1}, {'id': 2}])
+        )
+
+    def test_invalid_target(self):
+        self.assertIsNone(self.persister.persist_test_group(self.experiment, {}, 'a'))
+        with self.assertRaises(ValueError):
+            self.persister.persist_test_group(self.experiment, {'id': -1}, 'a')
@@ -1,10 +1,12 @@
+import time
 from unittest import TestCase
 from unittest.mock import patch
 from redis import Redis
 from feats.redis import FeatureStream
 from feats.redis import RedisStorage
 from feats.redis import StreamIterator
-from feats.errors import StorageUnavailableException
+from feats.errors import ConcurrentModification, StorageUnavailableException
+from feats.storage import latest_states
 
 
 class RedisStorageTests(TestCase):
@@ -38,7 +40,7 @@ class RedisStorageTests(TestCase):
         client = RedisStorage(redis=Redis(host='redis'), key_prefix=prefix)
         with patch.object(FeatureStream, '__init__', return_value=None) as mock:
             client[key]
-            mock.assert_called_once_with(client.connection, key, prefix)
+            mock.assert_called_once_with(client.connection, key, prefix, client._append_if_script)
 
 
 class FeatureInitializationTests(TestCase):
@@ -141,6 +143,91 @@ class FeatureStreamTests(FeatureTests):
         self.assertEqual(stream.last()['more'], 'things')
 
 
+class LatestStatesTests(FeatureTests):
+    def test_latest_states(self):
+        self._populate_stream()
+        before = time.time()
+        stream_id = self._get_stream().append({'latest': 'state'})
+        states = latest_states(self.client, [self._stream_name, 'unconfigured-feature'])
+        self.assertIsNone(states['unconfigured-feature'])
+        latest = states[self._stream_name]
+        self.assertEqual(latest.data, {'latest': 'state'})
+        self.assertAlmostEqual(latest.modified, before, delta=5)
+        self.assertEqual(latest.version, stream_id)
+
+    def test_single_round_trip(self):
+        self._populate_stream()
+        connection = self.client.connection
+        with patch.object(connection, 'pipeline', wraps=connection.pipeline) as pipeline:
+            latest_states(self.client, [self._stream_name] * 10)
+            # Atomically, so the snapshot version can't skip a write made
+            # between the reads of two streams
+            pipeline.assert_called_once_with(transaction=True)
+
+
+class AppendManyTests(FeatureTests):
+    def test_append_many(self):
+        self._populate_stream()
+        names = [self._stream_name, 'other-feature']
+        self.addCleanup(self.client.connection.delete, self.client['other-feature'].key)
+        ids = self.client.append_many({name: {'new': name} for name in names})
+        states = latest_states(self.client, names)
+        for name in names:
+            self.assertEqual(states[name].data, {'new': name})
+            self.assertEqual(states[name].version, ids[name])
+
+    def test_transaction(self):
+        connection = self.client.connection
+        with patch.object(connection, 'pipeline', wraps=connection.pipeline) as pipeline:
+            self.client.append_many({self._stream_name: {'new': 'state'}})
+            pipeline.assert_called_once_with(transaction=True)
+
+    def test_append_many_if(self):
+        other = 'other-feature'
+        self.addCleanup(self.client.connection.delete, self.client[other].key)
+        self.client.connection.delete(self.client[other].key)
+        stream_id = self._get_stream().append({'foo': 'bar'})
+        states = {self._stream_name: {'new': 'state'}, other: {'other': 'state'}}
+
+        with self.subTest("stale"), self.assertRaises(ConcurrentModification):
+            self.client.append_many_if(states, {self._stream_name: None})
+        self.assertEqual(self._get_stream().last(), {'foo': 'bar'})
+        self.assertEqual(len(self.client[other]), 0)
+
+        ids = self.client.append_many_if(states, {self._stream_name: stream_id})
+        latest = latest_states(self.client, list(states))
+        for name, data in states.items():
+            self.assertEqual(latest[name].data, data)
+            self.assertEqual(latest[name].version, ids[name])
+
+
+class AppendIfTests(FeatureTests):
+    def test_empty_stream(self):
+        self._purge_stream()
+        self.client.connection.delete(self._get_stream().key)
+        stream_id = self._get_stream().append_if({'first': 'state'}, None)
+        self.assertEqual(latest_states(self.client, [self._stream_name])[self._stream_name].version, stream_id)
+        with self.assertRaises(ConcurrentModification):
+            self._get_stream().append_if({'stale': 'state'}, None)
+
+    def test_expected_id(self):
+        stream = self._get_stream()
+        stream_id = stream.append({'foo': 'bar'})
+        new_id = stream.append_if({'new': 'state'}, stream_id)
+        self.assertEqual(stream.last(), {'new': 'state'})
+        with self.assertRaises(ConcurrentModification):
+            stream.append_if({'stale': 'state'}, stream_id)
+        self.assertEqual(latest_states(self.client, [self._stream_name])[self._stream_name].version, new_id)
+
+    def test_script_registered_once(self):
+        connection = self.client.connection
+        with patch.object(connection, 'register_script', wraps=connection.register_script) as register_script:
+            for i in range(3):
+                stored = latest_states(self.client, [self._stream_name])[self._stream_name]
+                self._get_stream().append_if({'new': str(i)}, None if stored is None else stored.version)
+            register_script.assert_not_called()
+
+
 class StreamIteratorTests(FeatureTests):
     def test_iterator_retuns_stream_iterator(self):
         iterator = iter(self._get_stream())
@@ -0,0 +1,93 @@
+from unittest import TestCase
+
+from feats.cache import BloomFilter
+from feats.cache import TTLCache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class TTLCacheTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.timer = FakeTimer()
+        self.cache = TTLCache(maxsize=2, ttl=10, timer=self.timer)
+
+    def test_invalid_arguments(self):
+        with self.subTest("maxsize"), self.assertRaises(ValueError):
+            TTLCache(maxsize=0, ttl=10)
+        with self.subTest("ttl"), self.assertRaises(ValueError):
+            TTLCache(maxsize=1, ttl=0)
+
+    def test_get_set(self):
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual('default', self.cache.get('a', 'default'))
+        self.cache.set('a', 1)
+        self.assertEqual(1, self.cache.get('a'))
+        info = self.cache.info()
+        self.assertEqual(1, info.hits)
+        self.assertEqual(2, info.misses)
+        self.assertEqual(1, info.size)
+
+    def test_expires(self):
+        self.cache.set('a', 1)
+        self.timer.now = 9
+        self.assertEqual(1, self.cache.get('a'))
+        self.timer.now = 10
+        self.assertIsNone(self.cache.get('a'))
+        info = self.cache.info()
+        self.assertEqual(1, info.expirations)
+        self.assertEqual(0, info.size)
+
+    def test_evicts_least_recently_used(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        # Using 'a' makes 'b' the least recently used
+        self.cache.get('a')
+        self.cache.set('c', 3)
+        self.assertEqual(1, self.cache.get('a'))
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(3, self.cache.get('c'))
+        self.assertEqual(1, self.cache.info().evictions)
+
+    def test_clear(self):
+        self.cache.set('a', 1)
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(0, len(self.cache))
+
+
+class BloomFilterTests(TestCase):
+    def test_invalid_arguments(self):
+        with self.subTest("capacity"), self.assertRaises(ValueError):
+            BloomFilter(capacity=0, error_rate=0.01)
+        with self.subTest("error_rate"), self.assertRaises(ValueError):
+            BloomFilter(capacity=10, error_rate=1)
+
+    def test_contains_added(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(i)
+        for i in range(1000):
+            self.assertIn(i, bloom)
+        self.assertEqual(1000, len(bloom))
+
+    def test_error_rate(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(i)
+        false_positives = sum(1 for i in range(1000, 11000) if i in bloom)
+        self.assertLess(false_positives / 10000, 0.03)
+
+    def test_clears_at_capacity(self):
+        bloom = BloomFilter(capacity=10, error_rate=0.01)
+        for i in range(10):
+            bloom.add(i)
+        bloom.add('new')
+        self.assertIn('new', bloom)
+        self.assertEqual(1, len(bloom))
@@ -5,5 +5,9 @@ import feats
 from feats.storage import Memory
 
 if not settings.configured:
-    settings.configure(INSTALLED_APPS=['feats.django'], FEATS=feats.App(storage=Memory()))
+    settings.configure(
+        INSTALLED_APPS=['feats.django'],
+        FEATS=feats.App(storage=Memory()),
+        SECRET_KEY='feats-tests',
+    )
     django.setup()
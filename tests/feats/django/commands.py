@@ -0,0 +1,55 @@
+from io import StringIO
+from unittest import TestCase
+from unittest.mock import patch
+
+from django.apps import apps
+from django.core.management import CommandError, call_command
+
+import feats
+from feats.app import App
+from feats.django.apps import ModuleImport
+from feats.storage import Memory
+
+
+class LazyFeature:
+    @feats.default
+    def foo(self, arg: str) -> str:
+        return "foo"
+
+
+class NoDefaultFeature:
+    def foo(self, arg: str) -> str:
+        return "foo"
+
+
+class FeatsStartupTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.config = apps.get_app_config('feats')
+        self.app = App(storage=Memory(), lazy=True)
+        for patcher in [
+            patch.object(self.config, '_feats_app', self.app),
+            patch.object(self.config, 'module_imports', [
+                ModuleImport('fast.feats', 0.001, 1),
+                ModuleImport('slow.feats', 0.25, 3),
+            ]),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_reports_imports(self):
+        handle = self.app.feature(LazyFeature)
+        out = StringIO()
+        call_command('feats_startup', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertIn('slow.feats', lines[0])
+        self.assertIn('fast.feats', lines[1])
+        self.assertIn('4 features  imported in total', lines[2])
+        self.assertIn('1 features  loaded by App.validate()', lines[3])
+        self.assertTrue(handle.loaded)
+
+    def test_invalid_features(self):
+        self.app.feature(NoDefaultFeature)
+        with self.assertRaises(CommandError):
+            call_command('feats_startup', stdout=StringIO())
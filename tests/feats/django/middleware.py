@@ -0,0 +1,165 @@
+import re
+from unittest import TestCase
+from unittest.mock import patch
+
+from django.apps import apps
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from feats.django.middleware import ExperimentCookieMiddleware
+from feats.django.middleware import SegmentMemoMiddleware
+from feats.django.middleware import ServerTimingMiddleware
+from feats.django.persister import CookieExperimentPersister
+from feats.instrumentation import CollectingListener
+from feats.meta import Definition
+from feats.segment import Segment
+
+
+class CountingSegment:
+    def __init__(self):
+        self.calls = 0
+
+    def string(self, value: str) -> str:
+        self.calls += 1
+        return value
+
+
+class SegmentMemoMiddlewareTests(TestCase):
+    def test_memoizes_during_request(self):
+        obj = CountingSegment()
+        segment = Segment('segment.name', Definition.from_object(obj))
+        value = "request-user"
+
+        def get_response(request):
+            segment.segment(value)
+            segment.segment(value)
+            return 'response'
+
+        middleware = SegmentMemoMiddleware(get_response)
+        self.assertEqual('response', middleware(object()))
+        self.assertEqual(obj.calls, 1)
+
+        segment.segment(value)
+        self.assertEqual(obj.calls, 2)
+
+
+class ExperimentCookieMiddlewareTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.persister = CookieExperimentPersister()
+        feats_app = apps.get_app_config('feats').feats_app
+        patcher = patch.dict(
+            feats_app.persisters,
+            {feats_app._name(self.persister): self.persister}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.factory = RequestFactory()
+
+    def _middleware(self, fn):
+        def get_response(request):
+            fn(request)
+            return HttpResponse()
+        return ExperimentCookieMiddleware(get_response)
+
+    def test_no_request(self):
+        self.assertIsNone(self.persister.persist_test_group('exp', None, 'a'))
+        self.assertIsNone(self.persister.get_existing_test_group('exp', None))
+
+    def test_sets_single_cookie(self):
+        def persist(request):
+            self.persister.persist_test_group('exp1', request, 'a')
+            self.persister.persist_test_group('exp2', request, 'b')
+
+        response = self._middleware(persist)(self.factory.get('/'))
+        cookie = response.cookies[self.persister.cookie_name]
+        self.assertEqual(
+            {'exp1': 'a', 'exp2': 'b'},
+            self.persister.load(cookie.value)
+        )
+        self.assertTrue(cookie['httponly'])
+
+    def test_reads_cookie(self):
+        request = self.factory.get('/')
+        request.COOKIES[self.persister.cookie_name] = self.persister.dump({'exp1': 'a'})
+        groups = []
+
+        def read(request):
+            groups.append(self.persister.get_existing_test_group('exp1', request))
+            groups.append(self.persister.persist_test_group('exp1', request, 'b'))
+
+        response = self._middleware(read)(request)
+        self.assertEqual(['a', 'a'], groups)
+        # Nothing new was persisted, so the cookie isn't set again
+        self.assertNotIn(self.persister.cookie_name, response.cookies)
+
+    def test_ignores_tampered_cookie(self):
+        request = self.factory.get('/')
+        request.COOKIES[self.persister.cookie_name] = 'tampered'
+        groups = []
+
+        def read(request):
+            groups.append(self.persister.get_existing_test_group('exp1', request))
+
+        self._middleware(read)(request)
+        self.assertEqual([None], groups)
+
+    def test_clears_request_on_error(self):
+        def fail(request):
+            self.persister.persist_test_group('exp1', request, 'a')
+            raise RuntimeError()
+
+        with self.assertRaises(RuntimeError):
+            self._middleware(fail)(self.factory.get('/'))
+        self.assertIsNone(self.persister.get_existing_test_group('exp1', None))
+
+
+class ServerTimingMiddlewareTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.feats_app = apps.get_app_config('feats').feats_app
+        patcher = patch.object(self.feats_app, 'listeners', [])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.factory = RequestFactory()
+
+        @self.feats_app.boolean
+        def Enabled() -> bool:
+            return True
+        self.feature = Enabled
+
+    def test_registers_collector_once(self):
+        ServerTimingMiddleware(HttpResponse)
+        ServerTimingMiddleware(HttpResponse)
+        self.assertEqual(1, len(self.feats_app.listeners))
+        self.assertIsInstance(self.feats_app.listeners[0], CollectingListener)
+
+    def test_server_timing(self):
+        def get_response(request):
+            self.feature.is_enabled()
+            self.feature.is_enabled()
+            response = HttpResponse()
+            response['Server-Timing'] = 'db;dur=1'
+            return response
+
+        request = self.factory.get('/')
+        response = ServerTimingMiddleware(get_response)(request)
+        self.assertEqual(2, len(request.feats_evaluations))
+        # Descriptions are quoted and may contain commas
+        metrics = re.split(r', (?=[\w-]+;)', response['Server-Timing'])
+        self.assertEqual('db;dur=1', metrics[0])
+        self.assertRegex(
+            metrics[1],
+            r'^feats;dur=[0-9.]+;desc="2 evaluations, 2 storage round trips, 0 cache hits"$',
+        )
+        self.assertEqual(
+            ['feats-storage', 'feats-select', 'feats-exposure', 'feats-implementation'],
+            [metric.split(';')[0] for metric in metrics[2:]],
+        )
+
+    def test_no_evaluations(self):
+        response = ServerTimingMiddleware(lambda request: HttpResponse())(self.factory.get('/'))
+        self.assertEqual(
+            'feats;dur=0.000;desc="0 evaluations, 0 storage round trips, 0 cache hits"',
+            response['Server-Timing'],
+        )
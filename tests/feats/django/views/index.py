@@ -0,0 +1,90 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from django.apps import apps
+from django.test import RequestFactory
+
+import feats
+from feats.django.views.index import Index, matches, summarize
+from feats.selector import Static
+from feats.state import FeatureState
+from feats.storage import Memory, StoredState
+
+
+class SearchableFeature:
+    """
+    Describes a searchable feature
+    """
+    @feats.default
+    def foo(self, arg: str) -> str:
+        return "foo"
+
+    def bar(self, arg: str) -> str:
+        return "bar"
+
+
+class FeatureSummaryTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.app = feats.App(storage=Memory())
+        self.handle = self.app.feature(SearchableFeature)
+
+    def test_unconfigured(self):
+        summary = summarize(self.handle, None)
+        self.assertIsNone(summary.modified)
+        self.assertEqual(summary.selector_types, [])
+        self.assertTrue(matches(summary, 'searchablefeature'))
+        self.assertTrue(matches(summary, 'describes'))
+        self.assertFalse(matches(summary, 'static'))
+
+    def test_configured(self):
+        state = FeatureState(
+            segments=[],
+            selectors=[Static('one', 'foo'), Static('two', 'bar')],
+            selector_mapping={},
+            created_by='someone',
+        )
+        summary = summarize(self.handle, StoredState(state.serialize(self.app), 0, '1'))
+        self.assertEqual(summary.created_by, 'someone')
+        self.assertEqual(summary.selector_types, ['Static', 'Static'])
+        self.assertEqual(summary.modified.timestamp(), 0)
+        self.assertTrue(matches(summary, 'static'))
+
+
+class IndexTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.app = feats.App(storage=Memory())
+        for i in range(5):
+            cls = type(f'Feature{i}', (SearchableFeature,), {})
+            self.app.feature(cls)
+        patcher = patch.object(apps.get_app_config('feats'), '_feats_app', self.app)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.factory = RequestFactory()
+
+    def _context(self, **params):
+        view = Index(request=self.factory.get('/', params), args=(), kwargs={})
+        with patch.object(Index, 'paginate_by', 2):
+            return view.get_context_data()
+
+    def test_paginates(self):
+        context = self._context(page=3)
+        self.assertEqual(context['registered'], 5)
+        self.assertEqual(context['page'].paginator.num_pages, 3)
+        self.assertEqual(len(context['page'].object_list), 1)
+
+    def test_reads_states_in_bulk(self):
+        with patch('feats.django.views.index.latest_states', wraps=lambda storage, names: {
+            name: None for name in names
+        }) as mock:
+            context = self._context()
+        mock.assert_called_once()
+        self.assertEqual(len(mock.call_args[0][1]), 2)
+        self.assertEqual(len(context['page'].object_list), 2)
+
+    def test_search(self):
+        context = self._context(q='Feature3')
+        summaries = list(context['page'])
+        self.assertEqual(len(summaries), 1)
+        self.assertTrue(summaries[0].feature.name.endswith('Feature3'))
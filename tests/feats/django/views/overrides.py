@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+from unittest import TestCase
+from unittest.mock import patch
+
+from django.apps import apps
+from django.test import RequestFactory, override_settings
+from django.urls import include, path
+
+import feats
+from feats.django.views.overrides import Overrides
+from feats.storage import Memory
+
+urlpatterns = [
+    path('feats/', include('feats.django.urls')),
+]
+
+
+class Greeting:
+    @feats.default
+    def hello(self, name: str) -> str:
+        return "Hello"
+
+    def hi(self, name: str) -> str:
+        return "Hi"
+
+
+class OverridesTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.app = feats.App(storage=Memory())
+        self.greeting = self.app.feature(Greeting)
+        patcher = patch.object(apps.get_app_config('feats'), '_feats_app', self.app)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        urls = override_settings(ROOT_URLCONF=__name__)
+        urls.enable()
+        self.addCleanup(urls.disable)
+        self.factory = RequestFactory()
+
+    def _post(self, data):
+        request = self.factory.post('/', data)
+        request.user = SimpleNamespace(username='admin')
+        request._dont_enforce_csrf_checks = True
+        return Overrides.as_view()(request)
+
+    def test_set(self):
+        response = self._post({'key': self.greeting.name, 'implementation': 'hi'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.greeting.create('name'), 'Hi')
+
+    def test_invalid(self):
+        response = self._post({'key': self.greeting.name, 'implementation': 'bye'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(self.app.overrides), 0)
+
+    def test_clear(self):
+        self.app.set_override(self.greeting.name, 'hi', created_by='test')
+        response = self._post({'clear': self.greeting.name})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.greeting.create('name'), 'Hello')
@@ -0,0 +1,169 @@
+import json
+from unittest import TestCase
+from unittest.mock import patch
+
+from django.apps import apps
+from django.test import RequestFactory
+
+import feats
+from feats.django.views.preselect import Preselect, UsedImplementations
+from feats.persister import MemoryExperimentPersister
+from feats.selector import Experiment, Static
+from feats.state import FeatureState
+from feats.storage import Memory
+
+
+class StringSubject:
+    def subject(self, request):
+        return (request.GET.get('subject', 'subject'),)
+
+    def subject_key(self, request):
+        return self.subject(request)[0]
+
+
+class StringPreselect(StringSubject, Preselect):
+    pass
+
+
+class StringUsedImplementations(StringSubject, UsedImplementations):
+    pass
+
+
+class Greeting:
+    @feats.default
+    def hello(self, name: str) -> str:
+        return "Hello"
+
+    def hi(self, name: str) -> str:
+        return "Hi"
+
+
+class Farewell:
+    @feats.default
+    def goodbye(self, name: str) -> str:
+        return "Goodbye"
+
+    def bye(self, name: str) -> str:
+        return "Bye"
+
+
+class Count:
+    @feats.default
+    def one(self, number: int) -> int:
+        return 1
+
+
+class PreselectTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.app = feats.App(storage=Memory())
+        self.persister = self.app.persister(MemoryExperimentPersister(key=lambda value: value))
+        self.greeting = self.app.feature(Greeting)
+        self.farewell = self.app.feature(Farewell)
+        self.app.feature(Count)
+        patcher = patch.object(apps.get_app_config('feats'), '_feats_app', self.app)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.factory = RequestFactory()
+
+    def _configure(self, handle, selector):
+        handle.state = FeatureState(
+            segments=[],
+            selectors=[selector],
+            selector_mapping={(): selector},
+            created_by='test',
+        )
+
+
+class PreselectTests(PreselectTestCase):
+    def _get(self, **headers):
+        return StringPreselect.as_view()(self.factory.get('/', **headers))
+
+    def test_applicable_features(self):
+        self._configure(self.greeting, Static('static', 'hi'))
+        response = self._get()
+        self.assertEqual(response.status_code, 200)
+        content = json.loads(response.content)
+        self.assertEqual(content['implementations'], {
+            self.greeting.name: 'hi',
+            self.farewell.name: 'goodbye',
+        })
+        self.assertEqual(content['tokens'].keys(), content['implementations'].keys())
+
+    def test_does_not_persist_experiment_groups(self):
+        self._configure(self.greeting, Experiment('experiment', self.persister, {'hi': 1}))
+        self._get()
+        self.assertIsNone(self.persister.get_existing_test_group('experiment', 'subject'))
+
+    def test_not_modified(self):
+        etag = self._get()['ETag']
+        with self.subTest("unchanged"):
+            response = self._get(HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['ETag'], etag)
+
+        with self.subTest("reconfigured"):
+            self._configure(self.farewell, Static('static', 'bye'))
+            response = self._get(HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+
+    def test_overrides_change_etag(self):
+        etag = self._get()['ETag']
+        self.app.set_override(self.greeting.name, 'hi', created_by='test')
+        with self.subTest("set"):
+            response = self._get(HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.content)['implementations'][self.greeting.name], 'hi')
+            etag = response['ETag']
+
+        self.app.clear_override(self.greeting.name, created_by='test')
+        with self.subTest("cleared"):
+            response = self._get(HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.content)['implementations'][self.greeting.name], 'hello')
+
+    def test_etag_depends_on_subject(self):
+        first = StringPreselect.as_view()(self.factory.get('/', {'subject': 'first'}))
+        second = StringPreselect.as_view()(self.factory.get('/', {'subject': 'second'}))
+        self.assertNotEqual(first['ETag'], second['ETag'])
+
+
+class UsedImplementationsTests(PreselectTestCase):
+    def _post(self, data):
+        request = self.factory.post('/', data=json.dumps(data), content_type='application/json')
+        return StringUsedImplementations.as_view()(request)
+
+    def test_batch(self):
+        self._configure(self.greeting, Experiment('greeting', self.persister, {'hello': 1, 'hi': 1}))
+        self._configure(self.farewell, Experiment('farewell', self.persister, {'goodbye': 1, 'bye': 1}))
+        response = self._post({'implementations': {
+            self.greeting.name: 'hi',
+            self.farewell.name: 'goodbye',
+        }})
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.persister.get_existing_test_group('greeting', 'subject'), 'hi')
+        self.assertEqual(self.persister.get_existing_test_group('farewell', 'subject'), 'goodbye')
+
+    def test_tokens(self):
+        self._configure(self.greeting, Experiment('greeting', self.persister, {'hi': 1}))
+        preselected = json.loads(StringPreselect.as_view()(self.factory.get('/')).content)
+        response = self._post({'tokens': list(preselected['tokens'].values())})
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.persister.get_existing_test_group('greeting', 'subject'), 'hi')
+
+    def test_invalid_batch_is_rejected(self):
+        self._configure(self.greeting, Experiment('greeting', self.persister, {'hello': 1, 'hi': 1}))
+        cases = [
+            [],
+            {'implementations': ['hi']},
+            {'tokens': ['forged']},
+            {'implementations': {self.greeting.name: 'hi', 'unknown': 'hi'}},
+            {'implementations': {self.greeting.name: 'hi', self.farewell.name: 'unknown'}},
+        ]
+        for data in cases:
+            with self.subTest(data):
+                response = self._post(data)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('errors', json.loads(response.content))
+        self.assertIsNone(self.persister.get_existing_test_group('greeting', 'subject'))
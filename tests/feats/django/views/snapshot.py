@@ -0,0 +1,71 @@
+import json
+from unittest import TestCase
+from unittest.mock import patch
+
+from django.apps import apps
+from django.test import RequestFactory, override_settings
+
+import feats
+from feats.django.views.snapshot import Snapshot
+from feats.selector import Static
+from feats.state import FeatureState
+from feats.storage import Memory
+
+
+class Greeting:
+    @feats.default
+    def hello(self, name: str) -> str:
+        return "Hello"
+
+    def hi(self, name: str) -> str:
+        return "Hi"
+
+
+class SnapshotTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.app = feats.App(storage=Memory())
+        self.greeting = self.app.feature(Greeting)
+        patcher = patch.object(apps.get_app_config('feats'), '_feats_app', self.app)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.factory = RequestFactory()
+        token = override_settings(FEATS_SNAPSHOT_TOKEN='secret')
+        token.enable()
+        self.addCleanup(token.disable)
+        selector = Static('static', 'hi')
+        self.greeting.state = FeatureState(
+            segments=[],
+            selectors=[selector],
+            selector_mapping={(): selector},
+            created_by='test',
+        )
+
+    def _get(self, data=None, token='secret'):
+        request = self.factory.get('/', data or {}, HTTP_AUTHORIZATION='Bearer {}'.format(token))
+        return Snapshot.as_view()(request)
+
+    def test_full(self):
+        response = self._get()
+        self.assertEqual(response.status_code, 200)
+        content = json.loads(response.content)
+        self.assertFalse(content['delta'])
+        self.assertEqual(list(content['features']), [self.greeting.name])
+
+    def test_delta(self):
+        version = json.loads(self._get().content)['version']
+        content = json.loads(self._get({'since': repr(version + 1)}).content)
+        self.assertTrue(content['delta'])
+        self.assertEqual(content['features'], {})
+
+    def test_invalid_since(self):
+        self.assertEqual(self._get({'since': 'yesterday'}).status_code, 400)
+
+    def test_requires_token(self):
+        with self.subTest("wrong token"):
+            self.assertEqual(self._get(token='guess').status_code, 403)
+        with self.subTest("no token"):
+            response = Snapshot.as_view()(self.factory.get('/'))
+            self.assertEqual(response.status_code, 403)
+        with self.subTest("token not configured"), override_settings(FEATS_SNAPSHOT_TOKEN=None):
+            self.assertEqual(self._get(token='None').status_code, 403)
@@ -0,0 +1,213 @@
+import json
+import os
+import tempfile
+import threading
+from unittest import TestCase
+
+from feats.exposure import CallbackSink
+from feats.exposure import ExposureCount
+from feats.exposure import ExposureCounter
+from feats.exposure import ExposureEvent
+from feats.exposure import ExposureStream
+from feats.exposure import ExposureSink
+from feats.exposure import FileSink
+from feats.exposure import MemoryExposureCounter
+
+
+def make_event(i=0, implementation='impl', subject=None, timestamp=1.5):
+    return ExposureEvent(
+        feature='feature',
+        selector='selector',
+        implementation=implementation,
+        segment_values=('segment', str(i)),
+        timestamp=timestamp,
+        subject=subject,
+    )
+
+
+class ExposureEventTests(TestCase):
+    def test_serialize(self):
+        self.assertEqual(
+            {
+                'feature': 'feature',
+                'selector': 'selector',
+                'implementation': 'impl',
+                'segment_values': '["segment", "0"]',
+                'timestamp': '1.5',
+                'subject': '',
+            },
+            make_event().serialize(),
+        )
+        self.assertEqual('1', make_event(subject=1).serialize()['subject'])
+
+    def test_day(self):
+        self.assertEqual('1970-01-02', make_event(timestamp=24 * 60 * 60).day)
+
+
+class ExposureStreamTests(TestCase):
+    def make_stream(self, sinks, **kwargs):
+        stream = ExposureStream(sinks, exit_timeout=None, **kwargs)
+        self.addCleanup(stream.close, 5)
+        return stream
+
+    def test_invalid_settings(self):
+        with self.assertRaises(ValueError):
+            ExposureStream([], sample_rate=2, exit_timeout=None)
+        with self.assertRaises(ValueError):
+            ExposureStream([], overflow='block', exit_timeout=None)
+
+    def test_incomplete_sink(self):
+        class IncompleteSink(ExposureSink):
+            pass
+
+        class IncompleteCounter(ExposureCounter):
+            def write(self, events):
+                pass
+
+        with self.assertRaises(TypeError):
+            IncompleteSink()
+        with self.assertRaises(TypeError):
+            IncompleteCounter()
+
+    def test_batches(self):
+        batches = []
+        stream = self.make_stream([CallbackSink(batches.append)], batch_size=3, flush_interval=60)
+        for i in range(7):
+            stream.emit(make_event(i))
+        self.assertTrue(stream.flush(timeout=5))
+        self.assertEqual([make_event(i) for i in range(7)], [e for batch in batches for e in batch])
+        self.assertTrue(all(len(batch) <= 3 for batch in batches))
+        self.assertEqual(7, stream.info().flushed)
+
+    def test_sampling(self):
+        events = []
+        stream = self.make_stream([CallbackSink(events.extend)], sample_rate=0)
+        stream.emit(make_event())
+        self.assertTrue(stream.flush(timeout=5))
+        self.assertEqual([], events)
+        self.assertEqual(1, stream.info().sampled_out)
+
+    def test_sampled_out_exposures_skip_subject(self):
+        subjects = []
+        stream = self.make_stream([], subject=subjects.append, sample_rate=0)
+        stream.expose('feature', 'selector', 'impl', None, ('user',))
+        self.assertEqual([], subjects)
+        self.assertEqual(1, stream.info().sampled_out)
+
+    def test_overflow(self):
+        release = threading.Event()
+        events = []
+
+        def write(batch):
+            release.wait(5)
+            events.extend(batch)
+
+        for overflow, expected in [('drop_newest', [0, 1, 2]), ('drop_oldest', [3, 4, 5])]:
+            with self.subTest(overflow):
+                release.clear()
+                events.clear()
+                stream = self.make_stream(
+                    [CallbackSink(write)],
+                    maxsize=3,
+                    batch_size=1,
+                    flush_interval=60,
+                    overflow=overflow,
+                )
+                # Occupy the worker, so the following events stay buffered
+                stream.emit(make_event('blocked'))
+                while stream.info().flushed == 0 and stream._buffer:
+                    pass
+                for i in range(6):
+                    stream.emit(make_event(i))
+                release.set()
+                self.assertTrue(stream.flush(timeout=5))
+                self.assertEqual(
+                    [make_event(i) for i in expected],
+                    [e for e in events if e.segment_values[1] != 'blocked'],
+                )
+                self.assertEqual(3, stream.info().dropped)
+
+    def test_subject(self):
+        stream = self.make_stream([], subject=lambda user: user['id'])
+        self.assertEqual(1, stream.get_subject({'id': 1}))
+        self.assertIsNone(self.make_stream([]).get_subject({'id': 1}))
+
+    def test_failing_sink(self):
+        events = []
+
+        def fail(batch):
+            raise ValueError()
+
+        stream = self.make_stream([CallbackSink(fail), CallbackSink(events.extend)])
+        with self.assertLogs('feats.exposure'):
+            stream.emit(make_event())
+            self.assertTrue(stream.flush(timeout=5))
+        self.assertEqual([make_event()], events)
+        self.assertEqual(1, stream.info().failed)
+
+    def test_close(self):
+        events = []
+        stream = self.make_stream([CallbackSink(events.extend)], flush_interval=60)
+        stream.emit(make_event())
+        self.assertTrue(stream.close(timeout=5))
+        self.assertEqual([make_event()], events)
+        stream.emit(make_event())
+        self.assertEqual(1, stream.info().emitted)
+
+
+class MemoryExposureCounterTests(TestCase):
+    def test_counts(self):
+        counter = MemoryExposureCounter()
+        counter.write([
+            make_event(subject=1),
+            make_event(subject=1),
+            make_event(subject=2),
+            make_event(),
+            make_event(implementation='other', subject=1),
+            make_event(subject=3, timestamp=24 * 60 * 60),
+        ])
+        counter.write([make_event(subject=2), make_event(subject=4)])
+        self.assertEqual(
+            {
+                'impl': ExposureCount(subjects=3, exposures=6),
+                'other': ExposureCount(subjects=1, exposures=1),
+                'missing': ExposureCount(subjects=0, exposures=0),
+            },
+            counter.counts('feature', 'selector', ['impl', 'other', 'missing'], day='1970-01-01'),
+        )
+        self.assertEqual(
+            {'impl': ExposureCount(subjects=1, exposures=1)},
+            counter.counts('feature', 'selector', ['impl'], day='1970-01-02'),
+        )
+        self.assertEqual(
+            {'impl': ExposureCount(subjects=0, exposures=0)},
+            counter.counts('feature', 'selector', ['impl']),
+        )
+
+
+class FileSinkTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'exposures.log')
+
+    def test_write(self):
+        sink = FileSink(self.path)
+        self.addCleanup(sink.close)
+        sink.write([make_event(0), make_event(1)])
+        with open(self.path) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(['0', '1'], [line['segment_values'][1] for line in lines])
+
+    def test_rotate(self):
+        sink = FileSink(self.path, max_bytes=1, backup_count=2)
+        self.addCleanup(sink.close)
+        for i in range(4):
+            sink.write([make_event(i)])
+        self.assertFalse(os.path.exists(self.path))
+        self.assertTrue(os.path.exists(self.path + '.1'))
+        self.assertTrue(os.path.exists(self.path + '.2'))
+        self.assertFalse(os.path.exists(self.path + '.3'))
+        with open(self.path + '.1') as f:
+            self.assertEqual('3', json.loads(f.read())['segment_values'][1])
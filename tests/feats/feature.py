@@ -1,8 +1,18 @@
 from unittest import TestCase
 
 import feats
-from feats.app import App
-from feats.storage import Memory
+from feats.app import App, FeatureHandle
+from feats.errors import ConcurrentModification
+from feats.errors import InvalidPreselectionToken
+from feats.errors import StorageUnavailableException
+from feats.errors import UnknownPersisterName
+from feats.exposure import CallbackSink
+from feats.exposure import ExposureStream
+from feats.instrumentation import EvaluationListener
+from feats.persister import MemoryExperimentPersister
+from feats.preselection import PreselectionToken
+from feats.storage import Memory, MemoryList
+from feats.selector import Experiment
 from feats.selector import Static
 from feats.state import FeatureState
 
@@ -197,6 +207,13 @@ class OptionsSegment:
         return "reticulated string"
 
 
+class CachedSegment:
+    CACHE = feats.SegmentCache(key=lambda value: value, ttl=60)
+
+    def reticulate_string(self, value: str) -> str:
+        return "reticulated string"
+
+
 class InvalidBooleanFeatureAsClass:
     @feats.default
     def foo(self) -> bool:
@@ -284,6 +301,10 @@ class AppDefinitionTests(TestCase):
         segment = self.app.segment(OptionsSegment)
         self.assertEqual(segment.options, ['foo', 'bar'])
 
+    def test_segment_with_cache(self):
+        segment = self.app.segment(CachedSegment)
+        self.assertIs(segment.cache, CachedSegment.CACHE)
+
     def test_valid_boolean_feature(self):
         fn = ValidBooleanFeature
         handle = self.app.boolean(fn)
@@ -329,3 +350,536 @@ class GetApplicableFeaturesTests(TestCase):
         three = self.app.feature(ValidUnaryFeatures.Three)
 
         self.assertEqual([one, two, three], self.app.get_applicable_features([str]))
+
+    def test_reregistered_feature(self):
+        self.app.feature(ValidUnaryFeatures.One)
+        one = self.app.feature(ValidUnaryFeatures.One)
+        self.assertEqual([one], self.app.get_applicable_features([str]))
+
+
+class CountingFeature:
+    instances = 0
+
+    def __init__(self):
+        CountingFeature.instances += 1
+
+    @feats.default
+    def foo(self, arg: str) -> str:
+        return "foo"
+
+
+class LazyRegistrationTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.app = App(storage=Memory(), lazy=True)
+        CountingFeature.instances = 0
+
+    def test_handle_must_load(self):
+        with self.assertRaises(TypeError):
+            FeatureHandle(self.app, 'name', source=CountingFeature)
+
+    def test_introspected_on_first_use(self):
+        handle = self.app.feature(CountingFeature)
+        self.assertEqual(CountingFeature.instances, 0)
+        self.assertFalse(handle.loaded)
+        self.assertIs(self.app.features[self.app._name(CountingFeature)], handle)
+
+        self.assertEqual(handle.create('arg'), 'foo')
+        self.assertTrue(handle.loaded)
+        handle.create('arg')
+        self.assertEqual(CountingFeature.instances, 1)
+
+    def test_invalid_features_raise_on_use(self):
+        for definition in InvalidUnaryFeatures.__dict__.values():
+            if not isinstance(definition, type):
+                continue
+            with self.subTest(definition):
+                handle = self.app.feature(definition)
+                with self.assertRaises(ValueError):
+                    handle.create('arg')
+
+        with self.subTest("boolean"):
+            handle = self.app.boolean(InvalidBooleanFeatureBadReturnType)
+            with self.assertRaises(ValueError):
+                handle.is_enabled()
+
+    def test_validate(self):
+        one = self.app.feature(ValidUnaryFeatures.One)
+        boolean = self.app.boolean(ValidUnaryBooleanFeature)
+        self.app.validate()
+        self.assertTrue(one.loaded)
+        self.assertTrue(boolean.loaded)
+
+        self.app.feature(InvalidUnaryFeatures.NoDefault)
+        self.app.boolean(InvalidBooleanFeatureNoInputType)
+        with self.assertRaises(ValueError) as cm:
+            self.app.validate()
+        errors = cm.exception.args[0]
+        self.assertEqual(len(errors), 2)
+        self.assertIn(self.app._name(InvalidUnaryFeatures.NoDefault), errors[0])
+
+    def test_applicable_features(self):
+        one = self.app.feature(ValidUnaryFeatures.One)
+        self.app.feature(ValidNullaryFeatures.One)
+        self.assertEqual([one], self.app.get_applicable_features([str]))
+
+        with self.subTest("reregistered"):
+            two = self.app.feature(ValidUnaryFeatures.One)
+            self.assertEqual([two], self.app.get_applicable_features([str]))
+
+    def test_invalid_features_are_not_indexed(self):
+        one = self.app.feature(ValidUnaryFeatures.One)
+        invalid = self.app.feature(InvalidUnaryFeatures.NoDefault)
+        with self.assertLogs('feats.app'):
+            self.assertEqual([one], self.app.get_applicable_features([str]))
+        self.assertEqual([one], self.app.get_applicable_features([str]))
+        self.assertEqual([one], self.app.get_features_for('arg'))
+        with self.assertRaises(ValueError):
+            invalid.create('arg')
+        with self.assertRaises(ValueError):
+            self.app.validate()
+
+        with self.subTest("reregistered"):
+            self.app.feature(InvalidUnaryFeatures.NoDefault)
+
+
+class GetSegmentsForTypeTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.app = App(storage=Memory())
+
+    def test_segments_for_type(self):
+        one = self.app.segment(ValidSegments.One)
+        self.assertEqual({one.name: one}, self.app.get_segments_for_type(str))
+        self.assertEqual({}, self.app.get_segments_for_type(int))
+
+        with self.subTest("registering segments updates the results"):
+            two = self.app.segment(ValidSegments.Two)
+            self.assertEqual({two.name: two}, self.app.get_segments_for_type(int))
+            self.assertEqual(
+                {one.name: one, two.name: two},
+                self.app.get_segments_for_type(str)
+            )
+
+    def test_valid_segments(self):
+        segment = self.app.segment(ValidSegments.One)
+        handle = self.app.feature(ValidUnaryFeatures.One)
+        self.assertEqual({segment.name: segment}, handle.valid_segments())
+
+
+class PersisterTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.app = App(storage=Memory())
+
+    def test_register_persister(self):
+        persister = MemoryExperimentPersister()
+        self.assertIs(persister, self.app.persister(persister))
+        self.assertIs(persister, self.app.get_persister(self.app._name(persister)))
+
+    def test_invalid_persister(self):
+        with self.assertRaises(ValueError):
+            self.app.persister(object())
+
+    def test_unknown_persister(self):
+        with self.assertRaises(UnknownPersisterName):
+            self.app.get_persister('unknown.Persister')
+
+    def test_create_persists_experiment_group(self):
+        persister = self.app.persister(MemoryExperimentPersister())
+        handle = self.app.feature(ValidUnaryFeatures.Two)
+        selector = Experiment('experiment', persister, {'foo': 1, 'bar': 1})
+        handle.state = FeatureState(
+            segments=[],
+            selectors=[selector],
+            selector_mapping={(): selector},
+            created_by='test',
+        )
+        result = handle.create('arg')
+        self.assertEqual(result, persister.get_existing_test_group(selector.key, 'arg'))
+        for _ in range(10):
+            self.assertEqual(result, handle.create('arg'))
+
+
+class ExposureTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.events = []
+        self.exposures = ExposureStream(
+            [CallbackSink(self.events.extend)],
+            subject=lambda *args: args[0] if args else None,
+            exit_timeout=None,
+        )
+        self.addCleanup(self.exposures.close)
+        self.app = App(storage=Memory(), exposures=self.exposures)
+
+    def test_create_without_state(self):
+        handle = self.app.feature(ValidUnaryFeatures.Two)
+        self.assertEqual("foo", handle.create('arg'))
+        self.assertTrue(self.exposures.flush(timeout=5))
+        self.assertEqual(1, len(self.events))
+        event = self.events[0]
+        self.assertEqual(handle.name, event.feature)
+        self.assertEqual("Default", event.selector)
+        self.assertEqual("foo", event.implementation)
+        self.assertIsNone(event.segment_values)
+        self.assertEqual('arg', event.subject)
+
+    def test_create_with_segments(self):
+        segment = self.app.segment(ValidSegments.One)
+        handle = self.app.feature(ValidUnaryFeatures.Two)
+        selector = Static('static', 'bar')
+        handle.state = FeatureState(
+            segments=[segment],
+            selectors=[selector],
+            selector_mapping={("reticulated string",): selector},
+            created_by='test',
+        )
+        self.assertEqual("bar", handle.create('arg'))
+        handle.used_implementation('bar', 'arg')
+        self.assertTrue(self.exposures.flush(timeout=5))
+        self.assertEqual(
+            [('static', 'bar', ("reticulated string",))] * 2,
+            [(e.selector, e.implementation, e.segment_values) for e in self.events],
+        )
+
+    def test_unmapped_segment_values_use_default(self):
+        segment = self.app.segment(ValidSegments.One)
+        handle = self.app.feature(ValidUnaryFeatures.Two)
+        selector = Static('static', 'bar')
+        handle.state = FeatureState(
+            segments=[segment],
+            selectors=[selector],
+            selector_mapping={("other",): selector},
+            created_by='test',
+        )
+        self.assertEqual("foo", handle.create('arg'))
+        self.assertTrue(self.exposures.flush(timeout=5))
+        self.assertEqual("Default", self.events[0].selector)
+
+    def test_is_enabled(self):
+        handle = self.app.boolean(ValidBooleanFeature)
+        handle.is_enabled()
+        self.assertTrue(self.exposures.flush(timeout=5))
+        self.assertEqual(handle.name, self.events[0].feature)
+
+
+class CountingSegment:
+    calls = 0
+
+    def reticulate_string(self, value: str) -> str:
+        CountingSegment.calls += 1
+        return "reticulated string"
+
+
+class PreselectionTokenTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.app = App(storage=Memory())
+        self.persister = self.app.persister(MemoryExperimentPersister(key=lambda value: value))
+        self.segment = self.app.segment(CountingSegment)
+        self.handle = self.app.feature(ValidUnaryFeatures.Two)
+        self.experiment = Experiment('experiment', self.persister, {'bar': 1})
+        self.handle.state = FeatureState(
+            segments=[self.segment],
+            selectors=[Static('static', 'foo'), self.experiment],
+            selector_mapping={("reticulated string",): self.experiment},
+            created_by='test',
+        )
+        CountingSegment.calls = 0
+
+    def test_find_implementation(self):
+        name, token = self.handle.find_implementation('arg', with_token=True)
+        self.assertEqual(name, 'bar')
+        self.assertEqual(token, PreselectionToken(
+            self.handle.name, '1', 1, 'bar', ("reticulated string",)
+        ))
+        self.assertEqual(token, PreselectionToken.decode(token.encode()))
+
+    def test_used_implementation_does_not_segment(self):
+        _, token = self.handle.find_implementation('arg', with_token=True)
+        self.assertEqual(CountingSegment.calls, 1)
+        self.handle.used_implementation(token, 'arg')
+        self.assertEqual(CountingSegment.calls, 1)
+        self.assertEqual(self.persister.get_existing_test_group('experiment', 'arg'), 'bar')
+
+    def test_reconfigured_feature_is_evaluated_again(self):
+        _, token = self.handle.find_implementation('arg', with_token=True)
+        self.handle.state = self.handle.state.remove_selector(0, 'test')
+        self.handle.used_implementation(token, 'arg')
+        self.assertEqual(CountingSegment.calls, 2)
+        self.assertEqual(self.persister.get_existing_test_group('experiment', 'arg'), 'bar')
+
+    def test_default(self):
+        handle = self.app.feature(ValidUnaryFeatures.Three)
+        name, token = handle.find_implementation('arg', with_token=True)
+        self.assertEqual(token, PreselectionToken(handle.name, None, None, 'foo', None))
+        handle.used_implementation(token, 'arg')
+
+    def test_invalid_tokens(self):
+        _, token = self.handle.find_implementation('arg', with_token=True)
+        other = self.app.feature(ValidUnaryFeatures.Three)
+        with self.subTest("other feature"), self.assertRaises(InvalidPreselectionToken):
+            other.used_implementation(token, 'arg')
+        with self.subTest("malformed"), self.assertRaises(InvalidPreselectionToken):
+            PreselectionToken.decode('not a token')
+
+    def test_instrumented(self):
+        listener = self.app.listener(RecordingListener())
+        name, token = self.handle.find_implementation('arg', with_token=True)
+        self.handle.used_implementation(token, 'arg')
+        self.assertEqual(
+            [('find_implementation', 'experiment', 'bar'), ('used_implementation', 'experiment', 'bar')],
+            [(e.method, e.selector, e.implementation) for e in listener.evaluations],
+        )
+        self.assertNotIn('segment', listener.evaluations[1].timings)
+
+
+class RecordingStorage(dict):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def __missing__(self, name):
+        history = self[name] = MemoryList()
+        return history
+
+    def append_many(self, states):
+        self.batches.append(list(states))
+        for name, data in states.items():
+            self[name].append(data)
+
+
+class TransactionTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.storage = RecordingStorage()
+        self.app = App(storage=self.storage)
+        self.two = self.app.feature(ValidUnaryFeatures.Two)
+        self.three = self.app.feature(ValidUnaryFeatures.Three)
+
+    def _state(self, implementation):
+        selector = Static('static', implementation)
+        return FeatureState(
+            segments=[],
+            selectors=[selector],
+            selector_mapping={(): selector},
+            created_by='test',
+        )
+
+    def test_commits_states_together(self):
+        with self.app.transaction():
+            self.two.state = self._state('bar')
+            self.three.state = self._state('baz')
+            self.assertEqual(len(self.storage[self.two.name]), 0)
+            self.assertEqual(self.two.create('arg'), 'foo')
+            with self.subTest("reads its own states"):
+                self.assertEqual(self.two.state.selectors[0].value, 'bar')
+        self.assertEqual(self.storage.batches, [[self.two.name, self.three.name]])
+        self.assertEqual(self.two.create('arg'), 'bar')
+        self.assertEqual(self.three.create('arg'), 'baz')
+
+    def test_discards_states_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with self.app.transaction():
+                self.two.state = self._state('bar')
+                raise RuntimeError
+        self.assertEqual(self.storage.batches, [])
+        self.assertEqual(len(self.storage[self.two.name]), 0)
+        self.two.state = self._state('bar')
+        self.assertEqual(len(self.storage[self.two.name]), 1)
+
+    def test_nested(self):
+        with self.app.transaction() as outer:
+            self.two.state = self._state('bar')
+            with self.app.transaction() as inner:
+                self.three.state = self._state('baz')
+            self.assertIs(inner, outer)
+            self.assertEqual(self.storage.batches, [])
+        self.assertEqual(self.storage.batches, [[self.two.name, self.three.name]])
+
+    def test_without_append_many(self):
+        app = App(storage=Memory())
+        handle = app.feature(ValidUnaryFeatures.Two)
+        with app.transaction():
+            handle.state = self._state('bar')
+        self.assertEqual(handle.create('arg'), 'bar')
+
+
+class UpdateStateTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.app = App(storage=Memory())
+        self.handle = self.app.feature(ValidUnaryFeatures.Three)
+
+    def _state(self, *implementations):
+        selectors = [Static(implementation, implementation) for implementation in implementations]
+        return FeatureState(
+            segments=[],
+            selectors=selectors,
+            selector_mapping={(): selectors[-1]} if selectors else {},
+            created_by='test',
+        )
+
+    def _add(self, implementation, concurrent_writes=0):
+        """
+        Returns an update adding a selector, which stores another state the
+        first concurrent_writes times it's called, as a concurrent writer would
+        """
+        calls = []
+
+        def update(state):
+            calls.append(state)
+            if len(calls) <= concurrent_writes:
+                self.handle.state = state.add_selector(Static('concurrent', 'bar'), 'other')
+            return state.add_selector(Static(implementation, implementation), 'test')
+        update.calls = calls
+        return update
+
+    def test_update_state(self):
+        self.handle.update_state(lambda state: self._state('bar'))
+        update = self._add('baz')
+        state = self.handle.update_state(update)
+        self.assertEqual([selector.name for selector in state.selectors], ['bar', 'baz'])
+        self.assertEqual(self.handle.create('arg'), 'bar')
+        self.assertEqual(len(update.calls), 1)
+
+    def test_retries_concurrent_modification(self):
+        self.handle.state = self._state('bar')
+        update = self._add('baz', concurrent_writes=2)
+        self.handle.update_state(update)
+        self.assertEqual(len(update.calls), 3)
+        self.assertEqual(
+            [selector.name for selector in self.handle.state.selectors],
+            ['bar', 'concurrent', 'concurrent', 'baz'],
+        )
+
+    def test_gives_up(self):
+        self.handle.state = self._state('bar')
+        update = self._add('baz', concurrent_writes=10)
+        with self.assertRaises(ConcurrentModification):
+            self.handle.update_state(update, retries=2)
+        self.assertEqual(len(update.calls), 3)
+        self.assertNotIn('baz', [selector.name for selector in self.handle.state.selectors])
+
+    def test_update_returns_none(self):
+        self.assertIsNone(self.handle.update_state(lambda state: None))
+        self.assertIsNone(self.handle.state)
+
+    def test_in_transaction(self):
+        self.handle.state = self._state('bar')
+        with self.app.transaction():
+            self.handle.update_state(self._add('baz'))
+            self.assertEqual(len(self.app.storage[self.handle.name]), 1)
+        self.assertEqual(len(self.app.storage[self.handle.name]), 2)
+
+    def test_concurrent_modification_in_transaction(self):
+        other = self.app.feature(ValidUnaryFeatures.Two)
+        self.handle.state = self._state('bar')
+        with self.assertRaises(ConcurrentModification):
+            with self.app.transaction():
+                self.handle.update_state(self._add('baz'))
+                other.state = self._state('bar')
+                # Stored outside of the transaction by another writer
+                self.app.storage[self.handle.name].append(self._state('concurrent').serialize(self.app))
+        self.assertEqual(self.handle.state.selectors[0].name, 'concurrent')
+        self.assertIsNone(other.state)
+
+
+class RecordingListener(EvaluationListener):
+    def __init__(self):
+        self.evaluations = []
+
+    def on_evaluation(self, evaluation):
+        self.evaluations.append(evaluation)
+
+
+class UnavailableStorage(dict):
+    def __getitem__(self, key):
+        raise StorageUnavailableException()
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.app = App(storage=Memory())
+        self.listener = self.app.listener(RecordingListener())
+
+    def test_invalid_listener(self):
+        with self.assertRaises(ValueError):
+            self.app.listener(object())
+
+    def test_create_without_state(self):
+        handle = self.app.feature(ValidUnaryFeatures.Two)
+        handle.create('arg')
+        [evaluation] = self.listener.evaluations
+        self.assertEqual(handle.name, evaluation.feature)
+        self.assertEqual('create', evaluation.method)
+        self.assertEqual('Default', evaluation.selector)
+        self.assertEqual('foo', evaluation.implementation)
+        self.assertTrue(evaluation.fallback)
+        self.assertEqual(['storage', 'select', 'exposure', 'implementation'], list(evaluation.timings))
+        self.assertGreaterEqual(evaluation.duration, sum(evaluation.timings.values()))
+
+    def test_phases(self):
+        segment = self.app.segment(CachedSegment)
+        handle = self.app.feature(ValidUnaryFeatures.Two)
+        selector = Static('static', 'bar')
+        handle.state = FeatureState(
+            segments=[segment],
+            selectors=[selector],
+            selector_mapping={("reticulated string",): selector},
+            created_by='test',
+        )
+        handle.create('arg')
+        handle.create('arg')
+        handle.find_implementation('arg')
+        handle.used_implementation('bar', 'arg')
+        self.assertEqual(
+            ['create', 'create', 'find_implementation', 'used_implementation'],
+            [evaluation.method for evaluation in self.listener.evaluations],
+        )
+        self.assertEqual(
+            ['storage', 'deserialize', 'segment', 'select', 'exposure', 'implementation'],
+            list(self.listener.evaluations[0].timings),
+        )
+        self.assertEqual([0, 1, 1, 1], [e.cache_hits for e in self.listener.evaluations])
+        self.assertFalse(any(e.fallback for e in self.listener.evaluations))
+
+    def test_is_enabled(self):
+        handle = self.app.boolean(ValidBooleanFeature)
+        handle.is_enabled()
+        self.assertEqual(['is_enabled'], [e.method for e in self.listener.evaluations])
+
+    def test_storage_error(self):
+        app = App(storage=UnavailableStorage())
+        listener = app.listener(RecordingListener())
+        handle = app.feature(ValidUnaryFeatures.Two)
+        with self.assertRaises(StorageUnavailableException):
+            handle.create('arg')
+        [evaluation] = listener.evaluations
+        self.assertTrue(evaluation.storage_error)
+        self.assertIsNone(evaluation.implementation)
+
+    def test_incomplete_listener(self):
+        class IncompleteListener(EvaluationListener):
+            pass
+
+        with self.assertRaises(TypeError):
+            IncompleteListener()
+
+    def test_failing_listener(self):
+        class FailingListener(EvaluationListener):
+            def on_evaluation(self, evaluation):
+                raise ValueError()
+
+        self.app.listener(FailingListener())
+        handle = self.app.feature(ValidUnaryFeatures.Two)
+        with self.assertLogs('feats.app'):
+            self.assertEqual('foo', handle.create('arg'))
+
+    def test_no_listeners(self):
+        app = App(storage=Memory())
+        handle = app.feature(ValidUnaryFeatures.Two)
+        self.assertEqual('foo', handle.create('arg'))
+        self.assertEqual([], self.listener.evaluations)
@@ -0,0 +1,192 @@
+from unittest import TestCase
+
+from feats import instrumentation
+from feats.instrumentation import CollectingListener
+from feats.instrumentation import Evaluation
+from feats.instrumentation import Histogram
+from feats.instrumentation import HistogramListener
+from feats.instrumentation import ImplementationTimingListener
+from feats.instrumentation import TimingSummary
+from feats.instrumentation import render_prometheus
+from feats.instrumentation import summarize
+
+
+def make_evaluation(feature='feature', timings=None, implementation=None, **kwargs):
+    evaluation = Evaluation(feature, 'create')
+    evaluation.timings = timings or {}
+    evaluation.implementation = implementation
+    for key, value in kwargs.items():
+        setattr(evaluation, key, value)
+    return evaluation
+
+
+class EvaluationTests(TestCase):
+    def test_mark(self):
+        evaluation = Evaluation('feature', 'create')
+        evaluation.mark('storage')
+        evaluation.mark('select')
+        evaluation.mark('storage')
+        self.assertEqual(['storage', 'select'], list(evaluation.timings))
+        evaluation.finish()
+        self.assertGreaterEqual(evaluation.duration, sum(evaluation.timings.values()))
+
+    def test_nested_cache_hits(self):
+        outer = instrumentation.begin('outer', 'create')
+        instrumentation.record_cache_hit()
+        inner = instrumentation.begin('inner', 'create')
+        instrumentation.record_cache_hit()
+        instrumentation.end(inner)
+        instrumentation.record_cache_hit()
+        instrumentation.end(outer)
+        instrumentation.record_cache_hit()
+        self.assertEqual(2, outer.cache_hits)
+        self.assertEqual(1, inner.cache_hits)
+        self.assertFalse(outer.nested)
+        self.assertTrue(inner.nested)
+
+
+class CollectingListenerTests(TestCase):
+    def test_collect(self):
+        listener = CollectingListener()
+        first, second, third = [make_evaluation() for _ in range(3)]
+        listener.on_evaluation(first)
+        with listener.collect() as outer:
+            listener.on_evaluation(second)
+            with listener.collect() as inner:
+                listener.on_evaluation(third)
+        listener.on_evaluation(first)
+        self.assertEqual([second, third], outer)
+        self.assertEqual([third], inner)
+
+
+class SummarizeTests(TestCase):
+    def test_summarize(self):
+        evaluations = [
+            make_evaluation(timings={'storage': 1, 'implementation': 2}, duration=3, cache_hits=1),
+            make_evaluation(timings={'storage': 1}, duration=1, nested=True, fallback=True),
+            make_evaluation(timings={'select': 1}, duration=1, storage_error=True),
+        ]
+        summary = summarize(evaluations)
+        self.assertEqual(3, summary.count)
+        self.assertEqual(4, summary.duration)
+        self.assertEqual(2, summary.storage_round_trips)
+        self.assertEqual(1, summary.cache_hits)
+        self.assertEqual(1, summary.storage_errors)
+        self.assertEqual(1, summary.fallbacks)
+        self.assertEqual(
+            {'storage': 2, 'deserialize': 0, 'segment': 0, 'select': 1, 'exposure': 0, 'implementation': 2},
+            summary.phases,
+        )
+
+
+class HistogramTests(TestCase):
+    def test_observe(self):
+        histogram = Histogram([1, 0.1])
+        for value in [0.05, 0.1, 0.5, 2]:
+            histogram.observe(value)
+        self.assertEqual([(0.1, 2), (1, 3)], list(histogram.cumulative_counts()))
+        self.assertEqual(4, histogram.count)
+        self.assertAlmostEqual(2.65, histogram.sum)
+
+    def test_quantile(self):
+        histogram = Histogram([1, 2, 4])
+        self.assertIsNone(histogram.quantile(0.5))
+        for value in [0.5, 1.5, 1.5, 3]:
+            histogram.observe(value)
+        self.assertEqual(0.5, histogram.quantile(0.125))
+        self.assertEqual(1.5, histogram.quantile(0.5))
+        self.assertEqual(4, histogram.quantile(1))
+        histogram.observe(10)
+        self.assertEqual(4, histogram.quantile(1))
+
+    def test_merge(self):
+        histogram = Histogram([1, 2])
+        other = Histogram([1, 2])
+        histogram.observe(0.5)
+        other.observe(1.5)
+        other.observe(3)
+        histogram.merge(other)
+        self.assertEqual([1, 1], histogram.counts)
+        self.assertEqual(3, histogram.count)
+        self.assertEqual(5, histogram.sum)
+        with self.assertRaises(ValueError):
+            histogram.merge(Histogram([1]))
+
+
+class HistogramListenerTests(TestCase):
+    def test_aggregates(self):
+        listener = HistogramListener(buckets=[0.001, 0.01])
+        listener.on_evaluation(make_evaluation(timings={'storage': 0.005}, cache_hits=2))
+        listener.on_evaluation(make_evaluation(
+            timings={'storage': 0.0005, 'select': 0.0001},
+            storage_error=True,
+            fallback=True,
+        ))
+        self.assertEqual(2, listener.histograms[('feature', 'storage')].count)
+        self.assertEqual(1, listener.histograms[('feature', 'select')].count)
+        self.assertEqual(
+            {'evaluations': 2, 'cache_hits': 2, 'storage_errors': 1, 'fallbacks': 1},
+            listener.counters['feature'],
+        )
+        listener.clear()
+        self.assertEqual({}, listener.histograms)
+
+    def test_render_prometheus(self):
+        listener = HistogramListener(buckets=[0.001, 0.01])
+        listener.on_evaluation(make_evaluation(
+            feature='my."feature"',
+            timings={'select': 0.0005, 'storage': 0.005},
+            cache_hits=1,
+        ))
+        self.assertEqual(
+            '# HELP feats_phase_seconds Time spent in each phase of evaluating a feature.\n'
+            '# TYPE feats_phase_seconds histogram\n'
+            'feats_phase_seconds_bucket{feature="my.\\"feature\\"",phase="storage",le="0.001"} 0\n'
+            'feats_phase_seconds_bucket{feature="my.\\"feature\\"",phase="storage",le="0.01"} 1\n'
+            'feats_phase_seconds_bucket{feature="my.\\"feature\\"",phase="storage",le="+Inf"} 1\n'
+            'feats_phase_seconds_sum{feature="my.\\"feature\\"",phase="storage"} 0.005\n'
+            'feats_phase_seconds_count{feature="my.\\"feature\\"",phase="storage"} 1\n'
+            'feats_phase_seconds_bucket{feature="my.\\"feature\\"",phase="select",le="0.001"} 1\n'
+            'feats_phase_seconds_bucket{feature="my.\\"feature\\"",phase="select",le="0.01"} 1\n'
+            'feats_phase_seconds_bucket{feature="my.\\"feature\\"",phase="select",le="+Inf"} 1\n'
+            'feats_phase_seconds_sum{feature="my.\\"feature\\"",phase="select"} 0.0005\n'
+            'feats_phase_seconds_count{feature="my.\\"feature\\"",phase="select"} 1\n'
+            '# HELP feats_evaluations_total Features evaluated.\n'
+            '# TYPE feats_evaluations_total counter\n'
+            'feats_evaluations_total{feature="my.\\"feature\\""} 1\n'
+            '# HELP feats_cache_hits_total Segment values served from a memo or cache.\n'
+            '# TYPE feats_cache_hits_total counter\n'
+            'feats_cache_hits_total{feature="my.\\"feature\\""} 1\n'
+            '# HELP feats_storage_errors_total Errors fetching feature states from storage.\n'
+            '# TYPE feats_storage_errors_total counter\n'
+            'feats_storage_errors_total{feature="my.\\"feature\\""} 0\n'
+            '# HELP feats_fallbacks_total Evaluations which fell back to the default implementation.\n'
+            '# TYPE feats_fallbacks_total counter\n'
+            'feats_fallbacks_total{feature="my.\\"feature\\""} 0\n',
+            render_prometheus(listener),
+        )
+
+
+class ImplementationTimingListenerTests(TestCase):
+    def test_summary(self):
+        listener = ImplementationTimingListener(buckets=[0.001, 0.01])
+        for seconds in [0.0005, 0.0005, 0.005, 0.005]:
+            listener.on_evaluation(make_evaluation(
+                timings={'storage': 1, 'implementation': seconds},
+                implementation='foo',
+            ))
+        listener.on_evaluation(make_evaluation(timings={'select': 1}, implementation='bar'))
+        summary = listener.summary('feature', ['foo', 'bar'])
+        self.assertEqual(TimingSummary(count=0, p50=None, p95=None, p99=None), summary['bar'])
+        self.assertEqual(4, summary['foo'].count)
+        self.assertAlmostEqual(0.001, summary['foo'].p50)
+        self.assertAlmostEqual(0.0091, summary['foo'].p95)
+        self.assertAlmostEqual(0.00982, summary['foo'].p99)
+
+    def test_histogram_is_a_copy(self):
+        listener = ImplementationTimingListener()
+        listener.on_evaluation(make_evaluation(timings={'implementation': 1}, implementation='foo'))
+        listener.histogram('feature', 'foo').observe(1)
+        self.assertEqual(1, listener.histogram('feature', 'foo').count)
+        listener.clear()
+        self.assertEqual(0, listener.histogram('feature', 'foo').count)
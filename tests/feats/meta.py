@@ -53,9 +53,9 @@ class ImplementationTests(TestCase):
     def test_fully_specified(self):
         obj = FullySpecified()
         input_types = {
-            obj.nullary: [],
-            obj.unary: [str],
-            obj.binary: [str, int],
+            obj.nullary: (),
+            obj.unary: (str,),
+            obj.binary: (str, int),
         }
         output_types = {
             obj.nullary: str,
@@ -89,6 +89,11 @@ class ImplementationTests(TestCase):
             with self.subTest("binary"):
                 self.assertEqual(Implementation(obj.binary).fn("1", 2), 2.0)
 
+    def test_shared_input_types(self):
+        first = Implementation(FullySpecified().unary)
+        second = Implementation(FullySpecifiedFunc)
+        self.assertIs(first.input_types, second.input_types)
+
     def test_incomplete(self):
         obj = Incomplete()
         with self.subTest("no_return"), self.assertRaises(ValueError):
@@ -133,6 +138,7 @@ class DefinitionTests(TestCase):
 
             with self.subTest("undeclared"):
                 self.assertEqual(len(definition.annotations["undeclared"]), 0)
+                self.assertNotIn("undeclared", definition.annotations)
 
     def test_invalid_fns(self):
         for fn in (NoReturnTypeFunc, NoInputTypeFunc, PartialInputTypeFunc):
@@ -0,0 +1,171 @@
+from unittest import TestCase
+
+import feats
+from feats.app import App
+from feats.errors import StorageUnavailableException
+from feats.override import OVERRIDES_KEY, Overrides
+from feats.selector import Override, Static
+from feats.state import FeatureState
+from feats.storage import Memory, StoredState, latest_states
+
+
+class Greeting:
+    @feats.default
+    def hello(self, name: str) -> str:
+        return "Hello"
+
+    def hi(self, name: str) -> str:
+        return "Hi"
+
+
+class Farewell:
+    @feats.default
+    def goodbye(self, name: str) -> str:
+        return "Goodbye"
+
+    def hi(self, name: str) -> str:
+        return "Hi"
+
+
+class Count:
+    @feats.default
+    def one(self, name: str) -> int:
+        return 1
+
+
+class CountingStorage(dict):
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+
+    def __missing__(self, name):
+        history = self[name] = Memory()[name]
+        return history
+
+    def __getitem__(self, name):
+        self.reads += 1
+        return super().__getitem__(name)
+
+
+class UnavailableStorage(dict):
+    def __getitem__(self, name):
+        raise StorageUnavailableException()
+
+
+class OverridesTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.app = App(storage=Memory())
+        self.greeting = self.app.feature(Greeting)
+        self.count = self.app.feature(Count)
+        self.group = Greeting.__module__
+
+    def test_no_overrides(self):
+        self.assertIsNone(Overrides().get(self.greeting))
+
+    def test_feature(self):
+        overrides = Overrides({self.greeting.name: 'hi'})
+        override = overrides.get(self.greeting)
+        self.assertIsInstance(override, Override)
+        self.assertEqual(override.value, 'hi')
+        self.assertIsNone(overrides.get(self.count))
+        self.assertIs(overrides.get(self.greeting), override)
+
+    def test_group(self):
+        overrides = Overrides({self.group: 'hi'})
+        self.assertEqual(overrides.get(self.greeting).value, 'hi')
+        with self.subTest("features without the implementation aren't affected"):
+            self.assertIsNone(overrides.get(self.count))
+
+    def test_most_specific(self):
+        overrides = Overrides({self.group: 'hi', self.greeting.name: 'hello'})
+        self.assertEqual(overrides.get(self.greeting).value, 'hello')
+
+    def test_replace(self):
+        overrides = Overrides({self.greeting.name: 'hi'})
+        overrides.get(self.greeting)
+        overrides.replace({})
+        self.assertIsNone(overrides.get(self.greeting))
+
+    def test_load(self):
+        overrides = Overrides()
+        stored = self.app.storage[OVERRIDES_KEY]
+        self.app.set_override(self.greeting.name, 'hi', created_by='test')
+        latest = StoredState(stored.last(), stored.modified, stored.version)
+        self.assertTrue(overrides.load(latest))
+        self.assertFalse(overrides.load(latest))
+        self.assertEqual(overrides.as_dict(), {self.greeting.name: 'hi'})
+        self.assertTrue(overrides.load(None))
+        self.assertEqual(len(overrides), 0)
+
+
+class AppOverrideTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.storage = CountingStorage()
+        self.app = App(storage=self.storage)
+        self.greeting = self.app.feature(Greeting)
+        self.farewell = self.app.feature(Farewell)
+        self.count = self.app.feature(Count)
+        selector = Static('static', 'hello')
+        self.greeting.state = FeatureState(
+            segments=[],
+            selectors=[selector],
+            selector_mapping={(): selector},
+            created_by='test',
+        )
+
+    def test_set_override(self):
+        self.app.set_override(self.greeting.name, 'hi', created_by='test')
+        stored = latest_states(self.storage, [self.greeting.name])[self.greeting.name]
+        reads = self.storage.reads
+        self.assertEqual(self.greeting.create('name'), 'Hi')
+        self.assertEqual(self.greeting.find_implementation('name'), 'hi')
+        self.assertEqual(self.greeting.preselect_token(stored, 'name').implementation, 'hi')
+        self.greeting.used_implementation('hi', 'name')
+        self.assertEqual(self.storage.reads, reads)
+        self.assertEqual(self.farewell.create('name'), 'Goodbye')
+
+    def test_storage_unavailable(self):
+        self.app.set_override(self.greeting.name, 'hi', created_by='test')
+        self.app.storage = UnavailableStorage()
+        self.assertEqual(self.greeting.create('name'), 'Hi')
+        name, token = self.greeting.find_implementation('name', with_token=True)
+        self.assertEqual(name, 'hi')
+        self.greeting.used_implementation(token, 'name')
+
+    def test_group(self):
+        group = Greeting.__module__
+        self.app.set_override(group, 'hi', created_by='test')
+        self.assertEqual(self.greeting.create('name'), 'Hi')
+        self.assertEqual(self.farewell.create('name'), 'Hi')
+        self.assertEqual(self.count.create('name'), 1)
+
+    def test_clear_override(self):
+        self.app.set_override(self.greeting.name, 'hi', created_by='test')
+        self.app.clear_override(self.greeting.name, created_by='test')
+        self.assertEqual(self.greeting.create('name'), 'Hello')
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            self.app.set_override(self.greeting.name, 'bye', created_by='test')
+        with self.assertRaises(ValueError):
+            self.app.set_override('unknown', 'hi', created_by='test')
+        with self.assertRaises(ValueError):
+            self.app.set_override(Greeting.__module__, 'bye', created_by='test')
+        self.assertEqual(len(self.app.storage[OVERRIDES_KEY]), 0)
+
+    def test_sync_overrides(self):
+        worker = App(storage=self.storage)
+        greeting = worker.feature(Greeting)
+        self.assertFalse(worker.sync_overrides())
+
+        self.app.set_override(self.greeting.name, 'hi', created_by='test')
+        self.assertEqual(greeting.create('name'), 'Hello')
+        self.assertTrue(worker.sync_overrides())
+        self.assertEqual(greeting.create('name'), 'Hi')
+        self.assertFalse(worker.sync_overrides())
+
+        self.app.clear_override(self.greeting.name, created_by='test')
+        self.assertTrue(worker.sync_overrides())
+        self.assertEqual(greeting.create('name'), 'Hello')
@@ -0,0 +1,258 @@
+import threading
+from unittest import TestCase
+
+from feats.persister import DedupingPersister
+from feats.persister import MemoryExperimentPersister
+from feats.persister import WriteBehindPersister
+
+
+class MemoryExperimentPersisterTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.persister = MemoryExperimentPersister(key=lambda obj: obj.get('id'))
+
+    def test_persist_does_not_overwrite(self):
+        self.assertIsNone(self.persister.get_existing_test_group('exp', {'id': 1}))
+        self.assertEqual('a', self.persister.persist_test_group('exp', {'id': 1}, 'a'))
+        self.assertEqual('a', self.persister.persist_test_group('exp', {'id': 1}, 'b'))
+        self.assertEqual('a', self.persister.get_existing_test_group('exp', {'id': 1}))
+
+    def test_experiments_are_separate(self):
+        self.persister.persist_test_group('exp', {'id': 1}, 'a')
+        self.assertIsNone(self.persister.get_existing_test_group('other', {'id': 1}))
+
+    def test_get_or_persist(self):
+        self.assertEqual('a', self.persister.get_or_persist_test_group('exp', {'id': 1}, 'a'))
+        self.assertEqual('a', self.persister.get_or_persist_test_group('exp', {'id': 1}, 'b'))
+
+    def test_invalid_target(self):
+        self.assertIsNone(self.persister.persist_test_group('exp', {}, 'a'))
+        self.assertIsNone(self.persister.get_existing_test_group('exp', {}))
+
+
+class BlockingPersister(MemoryExperimentPersister):
+    """
+    Doesn't persist batches until released
+    """
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self.batches = []
+
+    def persist_test_groups(self, entries):
+        self.release.wait(5)
+        entries = list(entries)
+        self.batches.append(entries)
+        super().persist_test_groups(entries)
+
+
+class WriteBehindPersisterTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.inner = BlockingPersister()
+
+    def _persister(self, **kwargs):
+        persister = WriteBehindPersister(
+            self.inner,
+            key=lambda obj: obj,
+            exit_timeout=None,
+            **kwargs
+        )
+        # Cleanups run last in, first out
+        self.addCleanup(persister.close, 5)
+        self.addCleanup(self.inner.release.set)
+        return persister
+
+    def test_invalid_overflow(self):
+        with self.assertRaises(ValueError):
+            WriteBehindPersister(self.inner, key=str, overflow='explode', exit_timeout=None)
+
+    def test_read_your_writes(self):
+        persister = self._persister()
+        self.assertEqual('a', persister.persist_test_group('exp', 'obj', 'a'))
+        self.assertIsNone(self.inner.get_existing_test_group('exp', 'obj'))
+        self.assertEqual('a', persister.get_existing_test_group('exp', 'obj'))
+        # Pending writes aren't overwritten
+        self.assertEqual('a', persister.persist_test_group('exp', 'obj', 'b'))
+        self.assertEqual('a', persister.get_or_persist_test_group('exp', 'obj', 'b'))
+
+        self.inner.release.set()
+        self.assertTrue(persister.flush(5))
+        self.assertEqual('a', self.inner.get_existing_test_group('exp', 'obj'))
+        self.assertEqual('a', persister.get_existing_test_group('exp', 'obj'))
+        info = persister.info()
+        self.assertEqual(1, info.flushed)
+        self.assertEqual(1, info.coalesced)
+        self.assertEqual(0, info.pending)
+
+    def test_batches(self):
+        persister = self._persister(batch_size=2)
+        self.inner.release.set()
+        for i in range(5):
+            persister.persist_test_group('exp', i, 'a')
+        self.assertTrue(persister.flush(5))
+        self.assertEqual(5, sum(len(batch) for batch in self.inner.batches))
+        self.assertTrue(all(len(batch) <= 2 for batch in self.inner.batches))
+
+    def test_overflow_drop(self):
+        persister = self._persister(maxsize=1, batch_size=10, overflow='drop')
+        persister.persist_test_group('exp', 1, 'a')
+        persister.persist_test_group('exp', 2, 'a')
+        self.assertIsNone(persister.get_existing_test_group('exp', 2))
+        self.assertEqual(1, persister.info().overflowed)
+
+    def test_overflow_sync(self):
+        persister = self._persister(maxsize=1, batch_size=10, overflow='sync')
+        persister.persist_test_group('exp', 1, 'a')
+        persister.persist_test_group('exp', 2, 'b')
+        self.assertEqual('b', self.inner.get_existing_test_group('exp', 2))
+
+    def test_close_flushes(self):
+        persister = self._persister()
+        persister.persist_test_group('exp', 1, 'a')
+        self.inner.release.set()
+        self.assertTrue(persister.close(5))
+        self.assertEqual('a', self.inner.get_existing_test_group('exp', 1))
+
+        with self.subTest("writes after closing are synchronous"):
+            persister.persist_test_group('exp', 2, 'b')
+            self.assertEqual('b', self.inner.get_existing_test_group('exp', 2))
+
+    def test_flush_timeout(self):
+        persister = self._persister()
+        persister.persist_test_group('exp', 1, 'a')
+        self.assertFalse(persister.flush(0.01))
+
+    def test_invalid_target(self):
+        persister = WriteBehindPersister(self.inner, key=lambda obj: None, exit_timeout=None)
+        self.assertIsNone(persister.persist_test_group('exp', 1, 'a'))
+        self.assertIsNone(persister.get_existing_test_group('exp', 1))
+        self.assertIsNone(persister.get_or_persist_test_group('exp', 1, 'a'))
+
+    def test_get_or_persist_defers_write(self):
+        inner = CountingPersister()
+        persister = WriteBehindPersister(inner, key=lambda obj: obj, flush_interval=60, exit_timeout=None)
+        self.addCleanup(persister.close, 5)
+        self.assertEqual('a', persister.get_or_persist_test_group('exp', 1, 'a'))
+        self.assertEqual('a', persister.get_or_persist_test_group('exp', 1, 'b'))
+        self.assertEqual((1, 0), (inner.reads, inner.writes))
+
+        self.assertTrue(persister.flush(5))
+        self.assertEqual(1, inner.writes)
+        self.assertEqual('a', inner.get_existing_test_group('exp', 1))
+
+    def test_get_or_persist_keeps_existing_group(self):
+        inner = CountingPersister()
+        inner.persist_test_group('exp', 1, 'a')
+        persister = WriteBehindPersister(inner, key=lambda obj: obj, flush_interval=60, exit_timeout=None)
+        self.addCleanup(persister.close, 5)
+        self.assertEqual('a', persister.get_or_persist_test_group('exp', 1, 'b'))
+        self.assertEqual(0, persister.info().queued)
+
+        with self.subTest("groups read are cached"):
+            self.assertEqual('a', persister.get_or_persist_test_group('exp', 1, 'b'))
+            self.assertEqual(1, inner.reads)
+
+
+class CountingPersister(MemoryExperimentPersister):
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+        self.writes = 0
+
+    def get_existing_test_group(self, experiment, obj):
+        self.reads += 1
+        return super().get_existing_test_group(experiment, obj)
+
+    def persist_test_group(self, experiment, obj, group):
+        self.writes += 1
+        return super().persist_test_group(experiment, obj, group)
+
+    def get_or_persist_test_group(self, experiment, obj, group):
+        self.writes += 1
+        return MemoryExperimentPersister.persist_test_group(self, experiment, obj, group)
+
+
+class AlwaysContains:
+    def add(self, key):
+        pass
+
+    def __contains__(self, key):
+        return True
+
+
+class DedupingPersisterTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.inner = CountingPersister()
+
+    def test_invalid_arguments(self):
+        with self.subTest("filter"), self.assertRaises(ValueError):
+            DedupingPersister(self.inner, key=str, filter='unknown')
+        with self.subTest("false_positives"), self.assertRaises(ValueError):
+            DedupingPersister(self.inner, key=str, false_positives='unknown')
+
+    def test_lru_skips_repeat_exposures(self):
+        persister = DedupingPersister(self.inner, key=lambda obj: obj)
+        for _ in range(10):
+            self.assertEqual('a', persister.get_or_persist_test_group('exp', 1, 'a'))
+            self.assertEqual('a', persister.persist_test_group('exp', 1, 'b'))
+            self.assertEqual('a', persister.get_existing_test_group('exp', 1))
+        self.assertEqual(0, self.inner.reads)
+        self.assertEqual(1, self.inner.writes)
+        info = persister.info()
+        self.assertEqual(29, info.hits)
+        self.assertEqual(1, info.misses)
+        self.assertAlmostEqual(29 / 30, info.hit_rate)
+
+    def test_filters_are_per_experiment(self):
+        persister = DedupingPersister(self.inner, key=lambda obj: obj)
+        persister.persist_test_group('exp', 1, 'a')
+        self.assertEqual('b', persister.persist_test_group('other', 1, 'b'))
+        self.assertEqual(2, self.inner.writes)
+
+    def test_lru_remembers_reads(self):
+        self.inner.persist_test_group('exp', 1, 'a')
+        persister = DedupingPersister(self.inner, key=lambda obj: obj)
+        self.assertEqual('a', persister.get_existing_test_group('exp', 1))
+        self.assertEqual('a', persister.persist_test_group('exp', 1, 'b'))
+        self.assertEqual(2, self.inner.writes + self.inner.reads)
+
+    def test_bloom_skips_repeat_writes(self):
+        persister = DedupingPersister(self.inner, key=lambda obj: obj, filter='bloom')
+        for _ in range(10):
+            self.assertEqual('a', persister.persist_test_group('exp', 1, 'a'))
+            self.assertEqual('a', persister.get_or_persist_test_group('exp', 1, 'b'))
+        self.assertEqual(1, self.inner.writes)
+
+    def test_bloom_reads_repeat_exposures(self):
+        persister = DedupingPersister(
+            self.inner, key=lambda obj: obj, filter='bloom', false_positives='skip'
+        )
+        for _ in range(10):
+            self.assertEqual('a', persister.get_or_persist_test_group('exp', 1, 'a'))
+        self.assertEqual(1, self.inner.writes)
+        self.assertEqual(9, self.inner.reads)
+
+    def test_bloom_false_positives(self):
+        with self.subTest("skip"):
+            persister = DedupingPersister(
+                self.inner, key=lambda obj: obj, filter='bloom', false_positives='skip'
+            )
+            persister._filters['exp'] = AlwaysContains()
+            persister.persist_test_group('exp', 1, 'a')
+            self.assertIsNone(self.inner.get_existing_test_group('exp', 1))
+
+        with self.subTest("verify"):
+            persister = DedupingPersister(
+                self.inner, key=lambda obj: obj, filter='bloom', false_positives='verify'
+            )
+            persister._filters['exp'] = AlwaysContains()
+            self.assertEqual('a', persister.persist_test_group('exp', 1, 'a'))
+            self.assertEqual('a', self.inner.get_existing_test_group('exp', 1))
+
+    def test_invalid_target(self):
+        persister = DedupingPersister(self.inner, key=lambda obj: None)
+        self.assertIsNone(persister.persist_test_group('exp', 1, 'a'))
+        self.assertIsNone(persister.get_or_persist_test_group('exp', 1, 'a'))
+        self.assertEqual(0, self.inner.writes)
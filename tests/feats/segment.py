@@ -1,4 +1,7 @@
+from collections import namedtuple
+from feats.cache import SegmentCache
 from feats.segment import Segment
+from feats.segment import memoize_segments
 from unittest import TestCase
 from feats.meta import Definition
 
@@ -17,6 +20,15 @@ class StringIntSegment(StringSegment, IntSegment):
     pass
 
 
+class CountingSegment:
+    def __init__(self):
+        self.calls = 0
+
+    def string(self, value: str) -> str:
+        self.calls += 1
+        return value
+
+
 class AmbiguousSegment:
     def obj_1(self, value: object) -> str:
         return "obj_1"
@@ -54,3 +66,111 @@ class SegmentTests(TestCase):
 
         with self.subTest("invalid input"), self.assertRaises(ValueError):
             segment.segment(object())
+
+    def test_subclass_input(self):
+        obj = StringIntSegment()
+        segment = Segment('segment.name', Definition.from_object(obj))
+
+        class MyStr(str):
+            pass
+
+        with self.subTest("subclass is dispatched by mro"):
+            self.assertEqual("string", segment.segment(MyStr("hi")))
+            self.assertEqual(segment.find_implementation(MyStr).name, "string")
+
+        with self.subTest("dynamically created subclasses"):
+            for i in range(100):
+                cls = type('Dynamic{}'.format(i), (int,), {})
+                self.assertEqual("int", segment.segment(cls(i)))
+
+        with self.subTest("unknown classes are remembered as unmatched"):
+            self.assertIsNone(segment.find_implementation(float))
+            self.assertIsNone(segment.find_implementation(float))
+
+
+class MemoizeSegmentsTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.obj = CountingSegment()
+        self.segment = Segment('segment.name', Definition.from_object(self.obj))
+
+    def test_without_memo(self):
+        self.segment.segment("hi")
+        self.segment.segment("hi")
+        self.assertEqual(self.obj.calls, 2)
+
+    def test_memoizes_within_context(self):
+        value = "hi"
+        with memoize_segments():
+            self.assertEqual("hi", self.segment.segment(value))
+            self.assertEqual("hi", self.segment.segment(value))
+        self.assertEqual(self.obj.calls, 1)
+
+    def test_memo_is_per_segment(self):
+        other_obj = CountingSegment()
+        other = Segment('other.name', Definition.from_object(other_obj))
+        value = "hi"
+        with memoize_segments():
+            self.segment.segment(value)
+            other.segment(value)
+        self.assertEqual(self.obj.calls, 1)
+        self.assertEqual(other_obj.calls, 1)
+
+    def test_memo_cleared_after_context(self):
+        value = "hi"
+        with memoize_segments():
+            self.segment.segment(value)
+        with memoize_segments():
+            self.segment.segment(value)
+        self.assertEqual(self.obj.calls, 2)
+
+    def test_nested_contexts_share_memo(self):
+        value = "hi"
+        with memoize_segments():
+            self.segment.segment(value)
+            with memoize_segments():
+                self.segment.segment(value)
+            self.segment.segment(value)
+        self.assertEqual(self.obj.calls, 1)
+
+
+User = namedtuple('User', ['id', 'name'])
+
+
+class CountingUserSegment:
+    def __init__(self):
+        self.calls = 0
+
+    def user(self, user: User) -> str:
+        self.calls += 1
+        return user.name
+
+
+class SegmentCacheTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.obj = CountingUserSegment()
+        self.cache = SegmentCache(key=lambda user: user.id, ttl=60)
+        self.segment = Segment(
+            'segment.name',
+            Definition.from_object(self.obj),
+            cache=self.cache,
+        )
+
+    def test_caches_by_key(self):
+        self.assertEqual("a", self.segment.segment(User(1, "a")))
+        # A different object with the same key is served from the cache
+        self.assertEqual("a", self.segment.segment(User(1, "b")))
+        self.assertEqual("c", self.segment.segment(User(2, "c")))
+        self.assertEqual(self.obj.calls, 2)
+        info = self.cache.info()
+        self.assertEqual(info.hits, 1)
+        self.assertEqual(info.misses, 2)
+
+    def test_none_key_is_not_cached(self):
+        cache = SegmentCache(key=lambda user: None, ttl=60)
+        segment = Segment('segment.name', Definition.from_object(self.obj), cache=cache)
+        segment.segment(User(1, "a"))
+        segment.segment(User(1, "a"))
+        self.assertEqual(self.obj.calls, 2)
+        self.assertEqual(len(cache), 0)
@@ -1,7 +1,12 @@
 from collections import namedtuple
 from unittest import TestCase
+from feats.app import App
+from feats.persister import MemoryExperimentPersister
+from feats.selector import DeterministicExperiment
+from feats.selector import Experiment
 from feats.selector import Static
 from feats.selector import Rollout
+from feats.storage import Memory
 
 
 class MockSegment:
@@ -95,3 +100,158 @@ class RolloutTests(TestCase):
         for key in self.keys[9:]:
             with self.subTest(key):
                 self.assertEqual('9', selector.select(key))
+
+
+class ExperimentTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.persister = MemoryExperimentPersister()
+        self.selector = Experiment(
+            'MyExperiment',
+            self.persister,
+            {'a': 1, 'b': 1},
+            key='my-experiment',
+        )
+
+    def test_invalid_weights(self):
+        with self.subTest("no weights"), self.assertRaises(ValueError):
+            Experiment('MyExperiment', self.persister, {})
+        with self.subTest("zero weights"), self.assertRaises(ValueError):
+            Experiment('MyExperiment', self.persister, {'a': 0})
+
+    def test_key_defaults_to_name(self):
+        selector = Experiment('MyExperiment', self.persister, {'a': 1})
+        self.assertEqual('MyExperiment', selector.key)
+
+    def test_select_does_not_persist(self):
+        self.assertIn(self.selector.select('obj'), ['a', 'b'])
+        self.assertIsNone(self.persister.get_existing_test_group('my-experiment', 'obj'))
+
+    def test_select_returns_existing_group(self):
+        self.persister.persist_test_group('my-experiment', 'obj', 'b')
+        for _ in range(10):
+            self.assertEqual('b', self.selector.select('obj'))
+            self.assertEqual('b', self.selector.select_and_use('obj'))
+
+    def test_select_and_use_persists(self):
+        group = self.selector.select_and_use('obj')
+        self.assertEqual(group, self.persister.get_existing_test_group('my-experiment', 'obj'))
+        for _ in range(10):
+            self.assertEqual(group, self.selector.select('obj'))
+
+    def test_used_implementation_persists(self):
+        self.selector.used_implementation('a', 'obj')
+        self.assertEqual('a', self.selector.select('obj'))
+
+    def test_invalid_target_uses_random_group(self):
+        persister = MemoryExperimentPersister(key=lambda obj: None)
+        selector = Experiment('MyExperiment', persister, {'a': 1})
+        self.assertEqual('a', selector.select_and_use('obj'))
+
+    def test_serialization(self):
+        app = App(storage=Memory())
+        app.persister(self.persister)
+        data = self.selector.serialize_data(app)
+        self.assertEqual(data, {
+            'name': 'MyExperiment',
+            'persister': app._name(self.persister),
+            'weights': {'a': 1, 'b': 1},
+            'key': 'my-experiment',
+        })
+        selector = Experiment.from_data(app, data)
+        self.assertIs(selector.persister, self.persister)
+        self.assertEqual(selector.weights, self.selector.weights)
+        self.assertEqual(selector.key, self.selector.key)
+
+
+class DeterministicExperimentTests(TestCase):
+    def _selector(self, **kwargs):
+        return DeterministicExperiment(**{
+            'name': 'MyExperiment',
+            'segment': MockSegment(),
+            'weights': {'a': 1, 'b': 1},
+            'salt': 'salt',
+            **kwargs
+        })
+
+    def test_invalid_arguments(self):
+        with self.subTest("no weights"), self.assertRaises(ValueError):
+            self._selector(weights={})
+        with self.subTest("zero weights"), self.assertRaises(ValueError):
+            self._selector(weights={'a': 0})
+        with self.subTest("pin without persister"), self.assertRaises(ValueError):
+            self._selector(pin=True)
+
+    def test_deterministic(self):
+        selector = self._selector()
+        other = self._selector()
+        for key in map(str, range(100)):
+            with self.subTest(key):
+                self.assertEqual(selector.select(key), other.select(key))
+                self.assertEqual(selector.select(key), selector.assign(key))
+                self.assertEqual(selector.select(key), selector.select_and_use(key))
+
+    def test_weights(self):
+        selector = self._selector(weights={'a': 1, 'b': 3})
+        groups = [selector.assign(str(i)) for i in range(4000)]
+        self.assertAlmostEqual(groups.count('b') / 4000, 0.75, delta=0.05)
+
+        with self.subTest("zero weight is never assigned"):
+            selector = self._selector(weights={'a': 0, 'b': 1})
+            self.assertNotIn('a', [selector.assign(str(i)) for i in range(100)])
+
+    def test_salts_are_independent(self):
+        selector = self._selector()
+        other = self._selector(salt='other')
+        same = sum(
+            1 for i in range(1000)
+            if selector.assign(str(i)) == other.assign(str(i))
+        )
+        self.assertAlmostEqual(same / 1000, 0.5, delta=0.1)
+
+    def test_persister_overrides(self):
+        persister = MemoryExperimentPersister()
+        selector = self._selector(persister=persister)
+        group = selector.assign('key')
+        other = 'a' if group == 'b' else 'b'
+        persister.persist_test_group('salt', 'key', other)
+        self.assertEqual(other, selector.select('key'))
+
+        with self.subTest("unpinned exposures are not persisted"):
+            selector.select_and_use('other-key')
+            self.assertIsNone(persister.get_existing_test_group('salt', 'other-key'))
+
+    def test_pin(self):
+        persister = MemoryExperimentPersister()
+        selector = self._selector(persister=persister, pin=True)
+        group = selector.select_and_use('key')
+        self.assertEqual(group, persister.get_existing_test_group('salt', 'key'))
+
+        with self.subTest("weight changes don't move pinned objects"):
+            other = 'a' if group == 'b' else 'b'
+            changed = self._selector(persister=persister, pin=True, weights={other: 1})
+            self.assertEqual(group, changed.select('key'))
+
+    def test_serialization(self):
+        app = App(storage=Memory())
+
+        @app.segment
+        class Segment:
+            def string(self, value: str) -> str:
+                return value
+
+        persister = app.persister(MemoryExperimentPersister())
+        cases = [
+            {'persister': None, 'pin': False},
+            {'persister': persister, 'pin': True},
+        ]
+        for case in cases:
+            with self.subTest(**case):
+                selector = self._selector(segment=Segment, **case)
+                data = selector.serialize_data(app)
+                deserialized = DeterministicExperiment.from_data(app, data)
+                self.assertIs(Segment, deserialized.segment)
+                self.assertIs(case['persister'], deserialized.persister)
+                self.assertEqual(selector.salt, deserialized.salt)
+                self.assertEqual(selector.weights, deserialized.weights)
+                self.assertEqual(selector.pin, deserialized.pin)
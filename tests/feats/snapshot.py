@@ -0,0 +1,188 @@
+import json
+from collections import defaultdict
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import TestCase
+from urllib.parse import parse_qs, urlparse
+
+import feats
+from feats.app import App
+from feats.selector import Static
+from feats.snapshot import Snapshot, SnapshotClient, build_snapshot
+from feats.state import FeatureState
+from feats.storage import Memory, MemoryList
+
+
+class Greeting:
+    @feats.default
+    def hello(self, name: str) -> str:
+        return "Hello"
+
+    def hi(self, name: str) -> str:
+        return "Hi"
+
+
+class Farewell:
+    @feats.default
+    def goodbye(self, name: str) -> str:
+        return "Goodbye"
+
+    def bye(self, name: str) -> str:
+        return "Bye"
+
+
+def configure(handle, implementation):
+    selector = Static('static', implementation)
+    handle.state = FeatureState(
+        segments=[],
+        selectors=[selector],
+        selector_mapping={(): selector},
+        created_by='test',
+    )
+
+
+class SnapshotTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.server = App(storage=Memory())
+        self.greeting = self.server.feature(Greeting)
+        self.farewell = self.server.feature(Farewell)
+
+
+class BuildSnapshotTests(SnapshotTestCase):
+    def test_full(self):
+        configure(self.greeting, 'hi')
+        snapshot = build_snapshot(self.server)
+        self.assertFalse(snapshot['delta'])
+        self.assertEqual(list(snapshot['features']), [self.greeting.name])
+        self.assertEqual(snapshot['version'], snapshot['features'][self.greeting.name]['modified'])
+        json.dumps(snapshot)
+
+    def test_delta(self):
+        configure(self.greeting, 'hi')
+        version = build_snapshot(self.server)['version']
+        self.assertEqual(build_snapshot(self.server, version)['features'].keys(), {self.greeting.name})
+
+        configure(self.farewell, 'bye')
+        delta = build_snapshot(self.server, version)
+        self.assertTrue(delta['delta'])
+        self.assertIn(self.farewell.name, delta['features'])
+        self.assertGreaterEqual(delta['version'], version)
+
+        self.assertEqual(build_snapshot(self.server, delta['version'])['features'].keys(), {self.farewell.name})
+
+
+class InterleavingStorage(defaultdict):
+    """
+    Appends the writes to the histories of the features they're for when the
+    history of the feature named second is read, i.e between reads
+    """
+    def __init__(self, second):
+        super().__init__(MemoryList)
+        self.second = second
+        self.writes = {}
+
+    def __getitem__(self, name):
+        if name == self.second:
+            writes, self.writes = self.writes, {}
+            for written, data in writes.items():
+                super().__getitem__(written).append(data)
+        return super().__getitem__(name)
+
+
+class InterleavedWriteTests(TestCase):
+    def test_write_between_reads(self):
+        app = App(storage=Memory())
+        greeting = app.feature(Greeting)
+        farewell = app.feature(Farewell)
+        storage = app.storage = InterleavingStorage(farewell.name)
+        configure(greeting, 'hello')
+        configure(farewell, 'goodbye')
+        before = storage[greeting.name].last()
+
+        selector = Static('static', 'hi')
+        hi = FeatureState([], [selector], {(): selector}, 'test').serialize(app)
+        selector = Static('static', 'bye')
+        bye = FeatureState([], [selector], {(): selector}, 'test').serialize(app)
+        storage.writes = {greeting.name: hi, farewell.name: bye}
+
+        snapshot = build_snapshot(app)
+        self.assertEqual(snapshot['features'][greeting.name]['data'], before)
+        self.assertEqual(snapshot['features'][farewell.name]['data'], bye)
+
+        delta = build_snapshot(app, snapshot['version'])
+        self.assertEqual(delta['features'][greeting.name]['data'], hi)
+
+
+class SnapshotClientTests(SnapshotTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client_app = App(storage=Snapshot())
+        self.client_greeting = self.client_app.feature(Greeting)
+        self.client = SnapshotClient(self.client_app, 'http://unused')
+
+    def test_apply(self):
+        self.assertEqual(self.client_greeting.create('name'), 'Hello')
+        configure(self.greeting, 'hi')
+        changed = self.client.apply(build_snapshot(self.server))
+        self.assertEqual(changed, [self.greeting.name])
+        self.assertEqual(self.client_greeting.create('name'), 'Hi')
+
+        with self.subTest("unchanged"):
+            self.assertEqual(self.client.apply(build_snapshot(self.server)), [])
+
+    def test_apply_to_other_storage(self):
+        app = App(storage=Memory())
+        handle = app.feature(Greeting)
+        client = SnapshotClient(app, 'http://unused')
+        configure(self.greeting, 'hi')
+        client.apply(build_snapshot(self.server))
+        self.assertEqual(handle.create('name'), 'Hi')
+
+        with self.subTest("restarted client doesn't append the same state"):
+            SnapshotClient(app, 'http://unused').apply(build_snapshot(self.server))
+            self.assertEqual(len(app.storage[handle.name]), 1)
+
+    def test_overrides(self):
+        self.server.set_override(self.greeting.name, 'hi', created_by='test')
+        self.client.apply(build_snapshot(self.server))
+        self.assertEqual(self.client_greeting.create('name'), 'Hi')
+        self.server.clear_override(self.greeting.name, created_by='test')
+        self.client.apply(build_snapshot(self.server, self.client.version))
+        self.assertEqual(self.client_greeting.create('name'), 'Hello')
+
+    def test_sync_over_http(self):
+        server = self.server
+        requests = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                since = float(query['since'][0]) if 'since' in query else None
+                requests.append(since)
+                body = json.dumps(build_snapshot(server, since)).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        httpd = HTTPServer(('127.0.0.1', 0), Handler)
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(httpd.server_close)
+        self.addCleanup(httpd.shutdown)
+
+        client = SnapshotClient(self.client_app, 'http://127.0.0.1:{}/'.format(httpd.server_port))
+        configure(self.greeting, 'hi')
+        self.assertEqual(client.sync(), [self.greeting.name])
+        self.assertEqual(self.client_greeting.create('name'), 'Hi')
+        configure(self.greeting, 'hello')
+        self.assertEqual(client.sync(), [self.greeting.name])
+        self.assertEqual(self.client_greeting.create('name'), 'Hello')
+        self.assertIsNone(requests[0])
+        self.assertIsNotNone(requests[1])
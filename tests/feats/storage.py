@@ -1,5 +1,8 @@
+import threading
+import time
 from unittest import TestCase
-from feats.storage import Memory
+from feats.errors import ConcurrentModification
+from feats.storage import Memory, StoredState, compare_and_append, compare_and_append_many, latest_states
 
 
 class MemoryStorageTests(TestCase):
@@ -46,3 +49,93 @@ class MemoryStorageTests(TestCase):
         last = stream[0]
         self.assertEqual(self.sample_data, last)
         self.assertIsNot(self.sample_data, last)
+
+
+class LatestStatesTests(TestCase):
+    def test_latest_states(self):
+        storage = Memory()
+        before = time.time()
+        storage['configured'].append({'first': 'state'})
+        storage['configured'].append({'latest': 'state'})
+        states = latest_states(storage, ['configured', 'unconfigured'])
+        self.assertIsNone(states['unconfigured'])
+        self.assertEqual(states['configured'].data, {'latest': 'state'})
+        self.assertGreaterEqual(states['configured'].modified, before)
+        self.assertEqual(states['configured'].version, '2')
+
+    def test_bulk_storage(self):
+        class BulkStorage(dict):
+            def latest_states(self, names):
+                return {name: StoredState({}, None, None) for name in names}
+
+        states = latest_states(BulkStorage(), ['feature'])
+        self.assertEqual(states, {'feature': StoredState({}, None, None)})
+
+
+class CompareAndAppendTests(TestCase):
+    def test_memory(self):
+        storage = Memory()
+        compare_and_append(storage, 'feature', {'first': 'state'}, None)
+        with self.assertRaises(ConcurrentModification):
+            compare_and_append(storage, 'feature', {'stale': 'state'}, None)
+        compare_and_append(storage, 'feature', {'second': 'state'}, '1')
+        with self.assertRaises(ConcurrentModification):
+            compare_and_append(storage, 'feature', {'stale': 'state'}, '1')
+        self.assertEqual(list(storage['feature']), [{'first': 'state'}, {'second': 'state'}])
+
+    def test_memory_append_waits_for_append_if(self):
+        storage = Memory()
+        history = storage['feature']
+        self.assertIsNot(history._lock, storage['other']._lock)
+
+        with history._lock:
+            # As held by append_if between its check and its append
+            writer = threading.Thread(target=history.append, args=({'concurrent': 'state'},))
+            writer.start()
+            writer.join(0.05)
+            self.assertTrue(writer.is_alive())
+            self.assertEqual(len(history), 0)
+        writer.join()
+        self.assertEqual(len(history), 1)
+
+    def test_without_append_if(self):
+        class VersionedList(list):
+            def last(self):
+                return self[-1]
+
+            @property
+            def version(self):
+                return str(len(self))
+
+        storage = {'feature': VersionedList()}
+        compare_and_append(storage, 'feature', {'first': 'state'}, None)
+        with self.assertRaises(ConcurrentModification):
+            compare_and_append(storage, 'feature', {'stale': 'state'}, None)
+        compare_and_append(storage, 'feature', {'second': 'state'}, '1')
+        self.assertEqual(storage['feature'], [{'first': 'state'}, {'second': 'state'}])
+
+
+class CompareAndAppendManyTests(TestCase):
+    def test_memory(self):
+        storage = Memory()
+        storage['checked'].append({'first': 'state'})
+        states = {'checked': {'second': 'state'}, 'unchecked': {'first': 'state'}}
+        with self.assertRaises(ConcurrentModification):
+            compare_and_append_many(storage, states, {'checked': None})
+        self.assertEqual(len(storage['checked']), 1)
+        self.assertEqual(len(storage['unchecked']), 0)
+
+        compare_and_append_many(storage, states, {'checked': '1'})
+        self.assertEqual(storage['checked'].last(), {'second': 'state'})
+        self.assertEqual(storage['unchecked'].last(), {'first': 'state'})
+
+    def test_bulk_storage(self):
+        class BulkStorage(dict):
+            def append_many_if(self, states, expected_versions):
+                self.update(states)
+                self.expected_versions = expected_versions
+
+        storage = BulkStorage()
+        compare_and_append_many(storage, {'feature': {}}, {'feature': None})
+        self.assertEqual(storage, {'feature': {}})
+        self.assertEqual(storage.expected_versions, {'feature': None})
@@ -0,0 +1,78 @@
+import os
+import threading
+from unittest import TestCase
+from unittest.mock import patch
+
+from feats.worker import Poller
+from feats.worker import Worker
+
+
+class WorkerTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        self.forks = 0
+
+    def _worker(self):
+        def on_fork():
+            self.forks += 1
+        return Worker(lambda: self.release.wait(5), 'feats-test', on_fork=on_fork)
+
+    def test_starts_once_per_process(self):
+        worker = self._worker()
+        self.assertFalse(worker.started())
+        self.assertTrue(worker.join(0))
+
+        worker.start()
+        thread = worker._thread
+        worker.start()
+        self.assertIs(thread, worker._thread)
+        self.assertTrue(worker.is_alive())
+        self.assertEqual(0, self.forks)
+
+        self.assertFalse(worker.join(0.01))
+        self.release.set()
+        self.assertTrue(worker.join(5))
+        self.assertFalse(worker.is_alive())
+
+    def test_restarts_after_fork(self):
+        worker = self._worker()
+        worker.start()
+        parent = worker._thread
+
+        with patch('feats.worker.os.getpid', return_value=os.getpid() + 1):
+            self.assertFalse(worker.started())
+            self.assertFalse(worker.is_alive())
+            worker.start()
+            self.assertEqual(1, self.forks)
+            self.assertIsNot(parent, worker._thread)
+            self.assertTrue(worker.is_alive())
+
+
+class FailingPoller(Poller):
+    def __init__(self):
+        super().__init__(interval=0.001)
+        self.polled = threading.Event()
+
+    def poll(self):
+        self.polled.set()
+        raise ValueError()
+
+
+class PollerTests(TestCase):
+    def test_poller_must_poll(self):
+        with self.assertRaises(TypeError):
+            Poller(1)
+
+    def test_failures_are_logged(self):
+        poller = FailingPoller()
+        self.addCleanup(poller.stop, 5)
+        with self.assertLogs('feats.worker'):
+            poller.start()
+            self.assertTrue(poller.polled.wait(5))
+            poller.polled.clear()
+            # Polling continues after a failure
+            self.assertTrue(poller.polled.wait(5))
+        poller.stop(5)
+        self.assertFalse(poller._poll_thread.is_alive())